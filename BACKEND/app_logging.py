@@ -0,0 +1,154 @@
+"""구조화 로깅 설정
+
+- 요청 스레드는 메시지 문자열만 확정해 LogRecord를 큐에 넣고(QueueHandler), 시각/JSON 포맷과
+  stdout 출력은 별도 리스너 스레드가 한다. 큐가 가득 차면 기다리지 않고 버린 개수만 센다.
+- 메시지는 logger.info("... %s", value) 형태로 넘겨 레벨/샘플링에서 걸러진 로그는 문자열을 만들지 않는다.
+- 요청마다 경로별 샘플링 비율로 한 번 결정해, 샘플에서 빠진 요청의 INFO 이하 로그는 큐에 넣지 않는다.
+  (WARNING 이상은 항상 기록)
+- LOG_FORMAT=json이면 한 줄 JSON, 아니면 사람이 읽는 텍스트 한 줄로 출력한다.
+
+환경 변수: LOG_LEVEL(INFO), LOG_FORMAT(text|json), LOG_SAMPLE_DEFAULT(1.0),
+LOG_SAMPLE_RATES("/hot=0.1,/news=0.1" 형식), LOG_QUEUE_SIZE(10000)
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+DEFAULT_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_DEFAULT", "1.0"))
+# 경로 prefix -> 요청 로그 샘플링 비율 (0~1)
+SAMPLE_RATES = {}
+for item in filter(None, os.getenv("LOG_SAMPLE_RATES", "").split(",")):
+    prefix, _, rate = item.partition("=")
+    SAMPLE_RATES[prefix.strip()] = float(rate)
+
+# 요청마다 INFO 로그가 많이 나오는 서드파티 로거
+QUIET_LOGGERS = ("httpx", "httpcore", "urllib3", "pymongo", "yfinance", "peewee", "asyncio")
+
+# 현재 요청 (메서드, 경로, 샘플 포함 여부)
+_request = contextvars.ContextVar("log_request", default=None)
+
+
+def sample_rate_for(path: str):
+    """가장 길게 일치하는 경로 prefix의 샘플링 비율"""
+    best, rate = -1, DEFAULT_SAMPLE_RATE
+    for prefix, value in SAMPLE_RATES.items():
+        if (path == prefix or path.startswith(prefix.rstrip("/") + "/")) and len(prefix) > best:
+            best, rate = len(prefix), value
+    return rate
+
+
+def begin_request(method: str, path: str):
+    rate = sample_rate_for(path)
+    sampled = rate >= 1.0 or random.random() < rate
+    return _request.set((method, path, sampled))
+
+
+def end_request(token):
+    _request.reset(token)
+
+
+class RequestContextFilter(logging.Filter):
+    """요청 정보를 레코드에 붙이고, 샘플에서 빠진 요청의 INFO 이하 로그는 버림"""
+
+    def filter(self, record):
+        request = _request.get()
+        if request is None:
+            record.method = record.path = None
+            return True
+        method, path, sampled = request
+        if not sampled and record.levelno < logging.WARNING:
+            return False
+        record.method, record.path = method, path
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # 인자로 넘긴 dict/list가 출력 전에 바뀌지 않도록 메시지는 여기서(요청 스레드) 확정
+        # 필터와 레벨을 통과한 레코드만 여기까지 오므로 샘플링으로 빠진 로그는 포맷하지 않음
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s%(request)s %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record):
+        path = getattr(record, "path", None)
+        record.request = f" [{record.method} {path}]" if path else ""
+        return super().format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "path", None):
+            entry["method"], entry["path"] = record.method, record.path
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging():
+    """루트 로거를 큐 핸들러로 교체하고 출력 리스너 스레드 시작"""
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(LOG_LEVEL)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    listener.start()
+    # 종료 시 큐에 남은 로그까지 출력
+    atexit.register(listener.stop)
+    return handler, listener
+
+
+def status():
+    return {
+        "level": LOG_LEVEL,
+        "format": LOG_FORMAT,
+        "queued": log_handler.queue.qsize(),
+        "dropped": log_handler.dropped,
+        "sample_rates": {"default": DEFAULT_SAMPLE_RATE, **SAMPLE_RATES},
+    }
+
+
+# 앱 전체에서 공유하는 로그 큐 핸들러와 출력 리스너
+log_handler, log_listener = setup_logging()
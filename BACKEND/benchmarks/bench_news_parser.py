@@ -0,0 +1,72 @@
+"""뉴스 HTML 파싱 비용 벤치마크
+
+fixtures/*.html 페이지마다 세 가지 방식의 페이지당 파싱 시간을 비교한다.
+  - baseline: html.parser로 전체 트리를 만들고 선택자를 순서대로 시도 (기존 방식)
+  - lxml 전체: 파서만 lxml로 교체
+  - NewsParser: lxml + 결과 영역만 파싱 + 선택자 기억 (첫 페이지로 기억을 채운 뒤 측정)
+픽스처는 Daum 검색 결과 구조를 흉내 낸 합성 HTML이다 (실제 수집본 아님).
+
+실행: cd BACKEND && python benchmarks/bench_news_parser.py [반복 횟수]
+"""
+import glob
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from news_parser import MAX_ITEMS, SELECTORS, NewsParser  # noqa: E402
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def full_parse(content, parser):
+    soup = BeautifulSoup(content, parser)
+    items = []
+    for selector in SELECTORS:
+        items = soup.select(selector)
+        if items:
+            break
+    if not items:
+        items = soup.find_all('a', class_='tit_main') or soup.find_all('a', href=lambda x: x and 'news' in x)
+    return [{"title": a.get_text().strip(), "link": a.get('href', '#')}
+            for a in items[:MAX_ITEMS] if len(a.get_text().strip()) > 5]
+
+
+def measure(fn, content, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(content)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def main(repeat=30):
+    paths = sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+    if not paths:
+        print(f"픽스처 없음: {FIXTURE_DIR}")
+        return
+    print(f"{'fixture':<28}{'KB':>6}{'baseline':>11}{'lxml 전체':>11}{'NewsParser':>12}{'배율':>7}")
+    for path in paths:
+        with open(path, "rb") as f:
+            content = f.read()
+        parser = NewsParser()
+        # 선택자 기억을 채우는 첫 페이지는 측정에서 제외
+        parser.parse(content, "bench")
+
+        base_ms, expected = measure(lambda c: full_parse(c, "html.parser"), content, repeat)
+        lxml_ms, _ = measure(lambda c: full_parse(c, "lxml"), content, repeat)
+        memo_ms, result = measure(lambda c: parser.parse(c, "bench"), content, repeat)
+        assert result == expected, f"결과 불일치: {os.path.basename(path)}"
+        print(f"{os.path.basename(path):<28}{len(content) // 1024:>6}"
+              f"{base_ms:>9.2f}ms{lxml_ms:>9.2f}ms{memo_ms:>10.2f}ms{base_ms / memo_ms:>6.1f}x")
+    print(f"(페이지당 중앙값, 반복 {repeat}회, 파서 {parser.parser})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
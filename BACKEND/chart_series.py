@@ -0,0 +1,65 @@
+"""차트용 시계열 직렬화와 다운샘플링
+
+- close_records: 날짜 인덱스 + 종가 배열을 [{"Date", "Close"}]로 한 번에 변환 (iterrows 없이)
+- lttb_indices: Largest-Triangle-Three-Buckets로 모양을 유지하며 n개 점만 고름
+  (다음 버킷 평균은 reduceat으로 미리 계산하고, 버킷 안 삼각형 넓이는 벡터 연산)
+"""
+import numpy as np
+
+
+def close_records(dates, closes):
+    """dates: DatetimeIndex/Series 등, closes: 같은 길이의 숫자 배열"""
+    date_text = np.asarray(dates.astype(str) if hasattr(dates, "astype") else dates, dtype=object).tolist()
+    values = np.asarray(closes, dtype=np.float64).ravel().tolist()
+    return [{"Date": d, "Close": c} for d, c in zip(date_text, values)]
+
+
+def lttb_indices(y, n: int):
+    """y(등간격 x)에서 남길 점의 위치 (처음/마지막 점 포함, 오름차순)"""
+    y = np.asarray(y, dtype=np.float64)
+    size = len(y)
+    if n >= size or n < 3:
+        return np.arange(size)
+
+    x = np.arange(size, dtype=np.float64)
+    # 가운데 n-2개 버킷의 시작 위치 (마지막 점은 별도 버킷)
+    every = (size - 2) / (n - 2)
+    starts = np.floor(np.arange(n - 1) * every).astype(np.int64) + 1
+    starts[-1] = size - 1  # 부동소수 오차로 마지막 경계가 한 칸 당겨지지 않게
+    bucket_starts, bucket_ends = starts[:-1], starts[1:]
+    # 각 버킷의 "다음 버킷" 평균점 (마지막 버킷의 다음은 마지막 점)
+    next_starts = np.append(starts[1:-1], size - 1)
+    next_ends = np.append(starts[2:], size)
+    sums_y = np.add.reduceat(y, next_starts)
+    sums_x = np.add.reduceat(x, next_starts)
+    counts = next_ends - next_starts
+    avg_y = sums_y / counts
+    avg_x = sums_x / counts
+
+    selected = np.empty(n, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = bucket_starts[i], max(bucket_ends[i], bucket_starts[i] + 1)
+        area = np.abs((x[a] - avg_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _close(record):
+    try:
+        return float(record.get("Close"))
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def downsample_records(records, points):
+    """[{"Date", "Close"}] 목록을 points개로 줄임 (points가 없거나 충분히 크면 그대로)"""
+    if not points or not isinstance(records, list) or len(records) <= points:
+        return records
+    # 종가가 없는(None) 날이나 NaN/inf는 빼고 고름
+    closes = np.fromiter((_close(r) for r in records), dtype=np.float64, count=len(records))
+    valid = np.flatnonzero(np.isfinite(closes))
+    picked = valid[lttb_indices(closes[valid], points)]
+    return [records[i] for i in picked]
@@ -0,0 +1,82 @@
+"""기업 상세 조립 (companies + explain 짧은요약 + outline 개요)
+
+세 컬렉션을 기업마다 따로 조회하지 않고 $lookup 집계 한 번으로 묶는다.
+여러 기업도 $in 한 번으로 같은 파이프라인을 탄다. ('지'/'표' 통합도 파이프라인 안에서 처리)
+"""
+import deadline
+
+
+def detail_pipeline(names, explain_name="explain", outline_name="outline"):
+    match = {"기업명": names[0]} if len(names) == 1 else {"기업명": {"$in": list(names)}}
+    no_metrics = {"$eq": [{"$type": "$지표"}, "missing"]}
+    # '지'와 '표'가 둘 다 있을 때만 합침 (둘 중 하나라도 없으면 '지표'를 만들지 않음)
+    split_metrics = {"$and": [
+        no_metrics,
+        {"$ne": [{"$type": "$지"}, "missing"]},
+        {"$ne": [{"$type": "$표"}, "missing"]},
+    ]}
+    return [
+        {"$match": match},
+        {"$lookup": {
+            "from": explain_name,
+            "let": {"name": "$기업명"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$기업명", "$$name"]}}},
+                {"$project": {"_id": 0, "짧은요약": 1}},
+                {"$limit": 1},
+            ],
+            "as": "_explain",
+        }},
+        {"$lookup": {
+            "from": outline_name,
+            # 종목코드가 없거나 빈 문자열인 기업이 종목코드 없는 개요와 묶이지 않도록
+            "let": {"code": {"$cond": [
+                {"$eq": [{"$ifNull": ["$종목코드", ""]}, ""]},
+                "__none__",
+                "$종목코드",
+            ]}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$종목코드", "$$code"]}}},
+                {"$project": {"_id": 0}},
+                {"$limit": 1},
+            ],
+            "as": "_outline",
+        }},
+        {"$addFields": {
+            # '지'/'표'로 나뉘어 저장된 문서는 '지표' 하나로 합침 ('지'/'표'는 기존처럼 그대로 둠)
+            "지표": {"$cond": [
+                split_metrics,
+                {"$mergeObjects": [
+                    {"$cond": [{"$eq": [{"$type": "$지"}, "object"]}, "$지", {}]},
+                    {"$cond": [{"$eq": [{"$type": "$표"}, "object"]}, "$표", {}]},
+                ]},
+                # 원래 없던 '지표'는 빈 객체로 만들지 않음
+                {"$cond": [no_metrics, "$$REMOVE", "$지표"]},
+            ]},
+            # 조인 결과가 없으면 필드를 만들지 않음
+            "짧은요약": {"$arrayElemAt": ["$_explain.짧은요약", 0]},
+            "개요": {"$arrayElemAt": ["$_outline", 0]},
+        }},
+        {"$project": {"_id": 0, "_explain": 0, "_outline": 0}},
+    ]
+
+
+def fetch_company_details(collection, names, explain=None, outline=None):
+    """기업명 목록의 상세를 집계 한 번으로 조립 -> {기업명: 상세}"""
+    names = [n for n in dict.fromkeys(names) if n]
+    if not names:
+        return {}
+    pipeline = detail_pipeline(
+        names,
+        explain_name=explain.name if explain is not None else "explain",
+        outline_name=outline.name if outline is not None else "outline",
+    )
+    # 요청 시간 예산이 있으면 남은 만큼만 서버에서 실행
+    options = {}
+    max_time_ms = deadline.max_time_ms()
+    if max_time_ms is not None:
+        options["maxTimeMS"] = max_time_ms
+    details = {}
+    for doc in collection.aggregate(pipeline, **options):
+        details.setdefault(doc.get("기업명"), doc)
+    return details
@@ -0,0 +1,125 @@
+"""MongoDB companies 컬렉션의 메모리 스냅샷
+
+기업명/업종명/종목코드/지표만 주기적으로 한 번에 읽어 두고, 스크리너·순위·검색·지표 행렬 등
+파생 구조는 version이 바뀔 때만 다시 만든다.
+"""
+import logging
+import os
+import threading
+import time
+
+import deadline
+from singleflight import upstream_flight
+
+logger = logging.getLogger(__name__)
+
+
+SNAPSHOT_TTL = int(os.getenv("COMPANY_SNAPSHOT_TTL", "600"))
+PROJECTION = {"_id": 0, "기업명": 1, "업종명": 1, "종목코드": 1, "지표": 1, "지": 1, "표": 1}
+
+
+def merge_metrics(doc: dict):
+    """'지표'가 없고 '지'/'표'가 둘 다 있으면 '지표' 하나로 합침 (원본 dict 수정, company_detail 파이프라인과 같은 규칙)"""
+    if "지표" not in doc and "지" in doc and "표" in doc:
+        지표_데이터 = {}
+        if isinstance(doc.get("지"), dict):
+            지표_데이터.update(doc["지"])
+        if isinstance(doc.get("표"), dict):
+            지표_데이터.update(doc["표"])
+        doc["지표"] = 지표_데이터
+    return doc
+
+
+class CompanyStore:
+    def __init__(self, ttl=SNAPSHOT_TTL):
+        self.ttl = ttl
+        self.collection = None
+        self._docs = None
+        self._loaded_at = 0.0
+        self.version = 0
+        self._derived = {}
+        self._lock = threading.RLock()
+
+    def bind(self, collection):
+        self.collection = collection
+
+    def _load(self):
+        cursor = self.collection.find({}, PROJECTION)
+        # 요청 경로에서 불렸으면 남은 예산만큼만 서버에서 실행
+        max_time_ms = deadline.max_time_ms()
+        if max_time_ms is not None:
+            cursor = cursor.max_time_ms(max_time_ms)
+        docs = [merge_metrics(doc) for doc in cursor]
+        self._docs = docs
+        self._loaded_at = time.monotonic()
+        self.version += 1
+        logger.info("기업 스냅샷 로드: %s개 (version %s)", len(docs), self.version)
+        return docs
+
+    def docs(self):
+        """전체 기업 문서 리스트 (연결이 없으면 None)"""
+        if self.collection is None:
+            return None
+        if self._docs is None or time.monotonic() - self._loaded_at > self.ttl:
+            try:
+                upstream_flight.do("company_snapshot", self._load)
+            except Exception as e:
+                # 갱신 실패 시 이전 스냅샷 유지
+                if self._docs is None:
+                    raise
+                logger.warning("기업 스냅샷 갱신 실패, 이전 데이터 사용: %s", e)
+                self._loaded_at = time.monotonic()
+        return self._docs
+
+    def start_change_watch(self, listeners):
+        """change stream으로 바뀐 문서를 받아 listener(doc) 호출 (replica set에서만 동작)
+
+        사용할 수 없는 환경이면 스냅샷 TTL 갱신 때 변경분을 비교하는 방식만 사용한다.
+        """
+        if self.collection is None:
+            return
+
+        def run():
+            try:
+                with self.collection.watch(full_document="updateLookup") as stream:
+                    logger.info("companies change stream 구독 시작")
+                    for change in stream:
+                        doc = change.get("fullDocument")
+                        if doc is None:
+                            # 삭제 등은 다음 스냅샷 갱신 때 반영
+                            self.invalidate()
+                            continue
+                        doc = merge_metrics({k: v for k, v in doc.items() if k != "_id"})
+                        for listener in listeners:
+                            try:
+                                listener(doc)
+                            except Exception as e:
+                                logger.warning("변경 반영 실패: %s", e)
+            except Exception as e:
+                logger.warning("change stream 사용 불가, 스냅샷 갱신 시 변경분 비교로 대체: %s", e)
+
+        threading.Thread(target=run, name="company-change-watch", daemon=True).start()
+
+    def invalidate(self):
+        self._loaded_at = 0.0
+
+    def derived(self, name: str, builder):
+        """스냅샷 version별로 한 번만 계산되는 파생 구조"""
+        docs = self.docs()
+        if docs is None:
+            return None
+        version = self.version
+        cached = self._derived.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with self._lock:
+            cached = self._derived.get(name)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            value = builder(docs)
+            self._derived[name] = (version, value)
+            return value
+
+
+# 앱 전체에서 공유하는 기업 스냅샷
+company_store = CompanyStore()
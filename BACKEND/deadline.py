@@ -0,0 +1,169 @@
+"""요청별 시간 예산(deadline)
+
+미들웨어가 요청 시작 시 엔드포인트별 예산으로 마감 시각을 contextvar에 넣고,
+업스트림 호출(HTTP 타임아웃, pykrx/yfinance 대기, Mongo maxTimeMS)과 fallback 단계가
+남은 시간만큼만 기다리게 한다. 예산을 다 쓰면 DeadlineExceeded로 바로 다음 fallback으로 넘어간다.
+타임아웃 인자가 없는 블로킹 호출은 업스트림별 스레드 풀에서 실행하고, 예산 초과로 버려졌지만
+아직 끝나지 않은 호출이 많은 업스트림에는 새 호출을 보내지 않는다.
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+
+
+DEFAULT_BUDGET = float(os.getenv("REQUEST_BUDGET_DEFAULT", "10"))
+# 경로 prefix -> 예산(초). REQUEST_BUDGETS="/price=3,/report=4" 형식으로 덮어쓸 수 있음
+ENDPOINT_BUDGETS = {
+    "/price": 4,
+    "/prices": 12,
+    "/kospi": 6,
+    "/report": 5,
+    "/hot": 5,
+    "/main_news": 5,
+    "/news": 5,
+    "/investors": 4,
+    "/investor": 6,
+    "/marketcap": 6,
+    "/top_volume": 6,
+    "/market": 6,
+    "/company": 3,
+    "/company_metrics": 3,
+    "/companies": 3,
+    "/rankings": 3,
+    "/api/treasure": 5,
+}
+for item in filter(None, os.getenv("REQUEST_BUDGETS", "").split(",")):
+    prefix, _, seconds = item.partition("=")
+    ENDPOINT_BUDGETS[prefix.strip()] = float(seconds)
+
+# 남은 시간이 이보다 짧아도 타임아웃은 최소 이만큼 줌 (0초 타임아웃 방지)
+MIN_TIMEOUT = 0.05
+# 업스트림별 대기 스레드 수, 버려진 채 실행 중인 호출이 이만큼이면 새 호출을 보내지 않음
+SOURCE_WORKERS = int(os.getenv("DEADLINE_SOURCE_WORKERS", "8"))
+MAX_ABANDONED = int(os.getenv("DEADLINE_MAX_ABANDONED", "4"))
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """요청 시간 예산 초과"""
+
+
+class UpstreamBusy(DeadlineExceeded):
+    """이전에 예산 초과로 버려진 호출이 아직 끝나지 않아 새 호출을 보내지 않음"""
+
+
+class _SourcePool:
+    def __init__(self, source: str):
+        self.executor = ThreadPoolExecutor(max_workers=SOURCE_WORKERS, thread_name_prefix=f"deadline-{source}")
+        self._lock = threading.Lock()
+        self.abandoned = 0
+
+    def abandon(self, future):
+        with self._lock:
+            self.abandoned += 1
+        future.add_done_callback(self._finished)
+
+    def _finished(self, future):
+        with self._lock:
+            self.abandoned -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(source: str):
+    with _pools_lock:
+        pool = _pools.get(source)
+        if pool is None:
+            pool = _pools[source] = _SourcePool(source)
+        return pool
+
+
+def budget_for(path: str):
+    """가장 길게 일치하는 경로 prefix의 예산 (경로 구분자 경계에서만 일치)"""
+    best, budget = -1, DEFAULT_BUDGET
+    for prefix, seconds in ENDPOINT_BUDGETS.items():
+        if (path == prefix or path.startswith(prefix.rstrip("/") + "/")) and len(prefix) > best:
+            best, budget = len(prefix), seconds
+    return budget
+
+
+def start(seconds: float):
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset(token):
+    _deadline.reset(token)
+
+
+@contextmanager
+def unbounded():
+    """백그라운드 갱신처럼 요청 예산과 무관하게 끝까지 실행할 구간"""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """남은 시간(초), 예산이 없으면 None"""
+    deadline = _deadline.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def expired():
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check(step: str = ""):
+    if expired():
+        raise DeadlineExceeded(f"요청 시간 예산 초과{f' ({step})' if step else ''}")
+
+
+def timeout(default: float):
+    """기본 타임아웃과 남은 예산 중 짧은 쪽"""
+    left = remaining()
+    return default if left is None else max(MIN_TIMEOUT, min(default, left))
+
+
+def max_time_ms(default_ms: int = None):
+    """Mongo maxTimeMS 값 (예산도 기본값도 없으면 None)"""
+    left = remaining()
+    if left is None:
+        return default_ms
+    budget_ms = max(1, int(left * 1000))
+    return budget_ms if default_ms is None else min(default_ms, budget_ms)
+
+
+def run_bounded(source: str, fn, *args, **kwargs):
+    """타임아웃 인자가 없는 블로킹 호출(pykrx, yfinance)을 남은 예산만큼만 기다림
+
+    시간이 지나면 호출은 백그라운드에서 끝나도록 두고 DeadlineExceeded를 던진다.
+    같은 업스트림에 그렇게 버려진 호출이 MAX_ABANDONED개 남아 있으면 보내지 않고 UpstreamBusy.
+    """
+    left = remaining()
+    if left is None:
+        return fn(*args, **kwargs)
+    pool = _pool(source)
+    if pool.abandoned >= MAX_ABANDONED:
+        raise UpstreamBusy(f"{source} 이전 호출 대기 중")
+    # 작업 스레드에서도 요청 예산/지표 contextvar가 보이도록 context를 복사해 실행
+    future = pool.executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+    try:
+        return future.result(timeout=max(MIN_TIMEOUT, left))
+    except FutureTimeoutError:
+        pool.abandon(future)
+        raise DeadlineExceeded(f"요청 시간 예산 초과 ({getattr(fn, '__name__', source)})") from None
+
+
+def status():
+    """업스트림별 버려진 채 실행 중인 호출 수"""
+    with _pools_lock:
+        return {source: pool.abandoned for source, pool in _pools.items()}
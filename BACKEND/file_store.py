@@ -0,0 +1,77 @@
+"""파일 기반 데이터를 한 번 읽어 메모리에 두고, 파일 mtime이 바뀌면 다시 읽는 저장소"""
+import logging
+import os
+import threading
+import time
+
+from storage import BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+PROJECT_ROOT = os.path.dirname(BASE_DIR)
+FRONTEND_PUBLIC_DIR = os.path.join(PROJECT_ROOT, "FRONTEND", "public")
+
+# mtime 확인 최소 간격 (초) - 요청마다 stat 하지 않도록
+CHECK_INTERVAL = 1.0
+
+
+def candidate_paths(filename: str):
+    """백엔드 폴더 -> 프론트엔드 public 폴더 순서로 찾을 경로 목록"""
+    return [
+        os.path.join(BASE_DIR, filename),
+        os.path.join(FRONTEND_PUBLIC_DIR, filename),
+    ]
+
+
+class ReloadingFileStore:
+    def __init__(self, filename: str, loader, check_interval=CHECK_INTERVAL):
+        self.filename = filename
+        self.paths = candidate_paths(filename)
+        self.loader = loader
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._data = None
+        self._path = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self.loaded_at = None
+
+    def _find_path(self):
+        for path in self.paths:
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _needs_reload(self):
+        path = self._path if self._path and os.path.exists(self._path) else self._find_path()
+        if path is None:
+            return None, None
+        mtime = os.path.getmtime(path)
+        if path != self._path or mtime != self._mtime:
+            return path, mtime
+        return None, None
+
+    def get(self):
+        """최신 데이터 반환 (파일이 없으면 None)"""
+        now = time.monotonic()
+        if self._data is not None and now - self._checked_at < self.check_interval:
+            return self._data
+        with self._lock:
+            if self._data is not None and now - self._checked_at < self.check_interval:
+                return self._data
+            self._checked_at = now
+            path, mtime = self._needs_reload()
+            if path is not None:
+                try:
+                    self._data = self.loader(path)
+                    self._path, self._mtime = path, mtime
+                    self.loaded_at = time.time()
+                    logger.info("%s 로드 완료: %s", self.filename, path)
+                except Exception as e:
+                    # 읽기 실패 시 이전 데이터 유지
+                    logger.error("%s 로드 실패: %s", self.filename, e)
+            return self._data
+
+    def status(self):
+        return {"file": self._path, "mtime": self._mtime, "loaded_at": self.loaded_at}
@@ -0,0 +1,76 @@
+"""업스트림 호스트별 비동기 HTTP 커넥션 풀
+
+Daum, fnguide 등 외부 호스트마다 keep-alive 커넥션을 재사용하는 httpx.AsyncClient를
+하나씩 두고, 동시 요청 수는 httpx Limits(max_connections)로 호스트별로 제한한다.
+"""
+import os
+from urllib.parse import urlsplit
+
+import httpx
+
+import deadline
+
+
+# 호스트당 동시 요청/커넥션 상한 (환경변수로 조정 가능)
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "10"))
+MAX_KEEPALIVE_PER_HOST = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "5"))
+DEFAULT_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "15"))
+
+
+class AsyncHostPool:
+    """호스트별 AsyncClient 묶음 (상한을 넘는 요청은 httpx 풀에서 커넥션을 기다림)"""
+
+    def __init__(self, max_connections=MAX_CONNECTIONS_PER_HOST,
+                 max_keepalive=MAX_KEEPALIVE_PER_HOST, timeout=DEFAULT_TIMEOUT):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.timeout = timeout
+        self._clients = {}
+        # 호스트별 진행 중 요청 수 (이벤트 루프 한 곳에서만 바뀌므로 락 없음)
+        self._in_flight = {}
+
+    def _get_client(self, host: str):
+        client = self._clients.get(host)
+        if client is None:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+            )
+            client = httpx.AsyncClient(limits=limits, timeout=self.timeout, follow_redirects=True)
+            self._clients[host] = client
+        return client
+
+    async def get(self, url: str, headers: dict = None, timeout: float = None, **kwargs):
+        """호스트 풀을 통해 GET 요청 (동시 요청 수는 호스트별로 제한)"""
+        host = urlsplit(url).netloc
+        client = self._get_client(host)
+        self._in_flight[host] = self._in_flight.get(host, 0) + 1
+        try:
+            return await client.get(
+                url,
+                headers=headers,
+                # 요청 시간 예산이 더 짧으면 그만큼만 기다림
+                timeout=deadline.timeout(timeout if timeout is not None else self.timeout),
+                **kwargs,
+            )
+        finally:
+            self._in_flight[host] -= 1
+
+    def stats(self):
+        return {
+            host: {
+                "in_flight": self._in_flight.get(host, 0),
+                "max_connections": self.max_connections,
+            }
+            for host in self._clients
+        }
+
+    async def aclose(self):
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+# 앱 전체에서 공유하는 풀
+http_pool = AsyncHostPool()
@@ -0,0 +1,85 @@
+"""/industry 용 산업별 설명 저장소
+
+산업별설명.json을 한 번 읽어 산업명(정규화 키, KRX 업종명 별칭 포함)으로 인덱싱하고,
+파일이 바뀌면 다시 읽는다.
+"""
+import json
+import re
+
+from file_store import ReloadingFileStore
+
+
+INDUSTRY_JSON = "산업별설명.json"
+
+# 공백, 가운뎃점, 쉼표 등 구분 기호는 무시하고 비교
+_SEPARATORS = re.compile(r"[\s·ㆍ・,./&\-]+")
+
+# KRX(pykrx) 업종명 등 다른 표기 -> 산업별설명.json의 산업명
+INDUSTRY_ALIASES = {
+    "서비스업": "일반 서비스",
+    "일반서비스": "일반 서비스",
+    "전기전자": "전기·전자",
+    "운수장비": "운송장비·부품",
+    "운송장비": "운송장비·부품",
+    "의약품": "제약",
+    "철강금속": "금속",
+    "철강및금속": "금속",
+    "음식료품": "식음료·담배",
+    "음식료담배": "식음료·담배",
+    "운수창고업": "운송·창고",
+    "운수창고": "운송·창고",
+    "섬유의복": "섬유·의류",
+    "종이목재": "종이·목재",
+    "비금속광물": "비금속",
+    "의료정밀": "의료·정밀기기",
+    "유통업": "유통",
+    "건설업": "건설",
+    "통신업": "통신",
+    "기계": "기계·장비",
+    "기타제조업": "기타제조",
+    "전기가스업": "전기·가스",
+    "금융업": "기타금융",
+    "부동산업": "부동산",
+}
+
+
+def normalize_industry(name: str):
+    return _SEPARATORS.sub("", name or "").lower()
+
+
+def load_industry_json(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    by_key = {}
+    for item in data:
+        industry = item.get("industry")
+        if industry:
+            by_key[normalize_industry(industry)] = item
+    for alias, industry in INDUSTRY_ALIASES.items():
+        item = by_key.get(normalize_industry(industry))
+        if item is not None:
+            by_key.setdefault(normalize_industry(alias), item)
+    return {"items": data, "by_key": by_key}
+
+
+class IndustryStore:
+    def __init__(self):
+        self.source = ReloadingFileStore(INDUSTRY_JSON, load_industry_json)
+
+    def available(self):
+        return self.source.get() is not None
+
+    def lookup(self, name: str):
+        index = self.source.get()
+        if not index:
+            return None
+        return index["by_key"].get(normalize_industry(name))
+
+    def all(self):
+        index = self.source.get()
+        return index["items"] if index else []
+
+
+# 앱 전체에서 공유하는 산업 설명 저장소
+industry_store = IndustryStore()
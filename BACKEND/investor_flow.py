@@ -0,0 +1,361 @@
+"""투자자별 매매 동향 로컬 저장소
+
+- 종목별/KOSPI 전체의 일별 투자자 구분 값(날짜 × 투자자)을 npz로 두고, 마지막 저장일 다음
+  확정 거래일부터만 받아 이어 붙인다. 5/20/60일 누적 순매수는 저장된 배열의 끝부분 합으로 계산한다.
+- 시장 전체 순위용으로 거래일마다 외국인/기관의 종목별 순매수거래대금을 한 파일씩 저장하고,
+  N일 순위는 그 날짜들을 종목코드 기준으로 합산(bincount)해 argpartition으로 상위만 고른다.
+장중 당일 값은 확정되지 않았으므로 저장하지 않는다.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+from pykrx import stock
+
+from market_scheduler import last_closed_date
+from price_panel import trading_days
+from singleflight import upstream_flight
+from storage import data_path
+from ticker_index import normalize_code
+from upstream_health import upstream_health
+
+logger = logging.getLogger(__name__)
+
+
+PERIODS = (5, 20, 60)
+# 순위를 낼 수 있는 투자자 구분 (pykrx 이름)
+RANK_INVESTORS = ("외국인", "기관합계")
+MARKET = "KOSPI"
+
+# 처음 받아 둘 기간(달력일), 같은 대상의 증분 갱신 확인 간격(초)
+SEED_DAYS = int(os.getenv("INVESTOR_FLOW_SEED_DAYS", "120"))
+SYNC_INTERVAL = int(os.getenv("INVESTOR_FLOW_SYNC_INTERVAL", "300"))
+# 메모리에 두는 일별 시리즈 수 (나머지는 필요할 때 npz에서 다시 읽음)
+MAX_SERIES = int(os.getenv("INVESTOR_FLOW_MAX_SERIES", "256"))
+
+
+def _to_int_date(value):
+    return int(value.strftime("%Y%m%d")) if hasattr(value, "strftime") else int(str(value).replace("-", "")[:8])
+
+
+def format_date(value: int):
+    text = str(int(value))
+    return f"{text[:4]}-{text[4:6]}-{text[6:]}"
+
+
+class FlowSeries:
+    """일별 투자자 구분 값 (dates: int32[n] YYYYMMDD, values: float64[n, 구분])"""
+
+    def __init__(self, dates, columns, values):
+        self.dates = np.asarray(dates, dtype=np.int32)
+        self.columns = [str(c) for c in columns]
+        self.values = np.asarray(values, dtype=np.float64).reshape(len(self.dates), len(self.columns))
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], np.zeros((0, 0)))
+
+    @classmethod
+    def from_frame(cls, df):
+        dates = [_to_int_date(d) for d in df.index]
+        return cls(dates, list(df.columns), df.to_numpy(dtype=np.float64))
+
+    @classmethod
+    def load_file(cls, path: str):
+        try:
+            with np.load(path) as data:
+                return cls(data["dates"], data["columns"].tolist(), data["values"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, dates=self.dates, columns=np.array(self.columns, dtype=str), values=self.values)
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def last_date(self):
+        return int(self.dates[-1]) if len(self.dates) else None
+
+    def appended(self, other):
+        """other 중 마지막 저장일 이후 날짜만 붙인 새 시리즈 (구분 순서는 기존 기준)"""
+        if not len(self):
+            return other
+        keep = other.dates > self.last_date
+        index = [other.columns.index(c) if c in other.columns else None for c in self.columns]
+        rows = np.full((int(keep.sum()), len(self.columns)), np.nan)
+        for j, i in enumerate(index):
+            if i is not None:
+                rows[:, j] = other.values[keep, i]
+        return FlowSeries(np.concatenate([self.dates, other.dates[keep]]), self.columns,
+                          np.vstack([self.values, rows]))
+
+    def column(self, name: str):
+        return self.values[:, self.columns.index(name)] if name in self.columns else None
+
+    def since(self, date: int):
+        lo = int(np.searchsorted(self.dates, date, side="left"))
+        return FlowSeries(self.dates[lo:], self.columns, self.values[lo:])
+
+    def trailing_sums(self, periods=PERIODS):
+        """{기간: {구분: 최근 기간일 합}} (저장된 거래일이 부족하면 있는 만큼)"""
+        # 뒤에서부터 누적합 한 번으로 모든 기간을 계산
+        cumulative = np.nancumsum(self.values[::-1], axis=0)
+        sums = {}
+        for n in periods:
+            if not len(self):
+                sums[n] = {}
+                continue
+            row = cumulative[min(n, len(self)) - 1]
+            sums[n] = {c: float(v) for c, v in zip(self.columns, row)}
+        return sums
+
+
+class NetPurchaseDay:
+    """하루치 종목별 순매수거래대금 (tickers: str[m], values: float64[m, 투자자])"""
+
+    def __init__(self, date: int, tickers, names, values):
+        self.date = date
+        self.tickers = np.asarray(tickers, dtype=str)
+        self.names = np.asarray(names, dtype=str)
+        self.values = np.asarray(values, dtype=np.float64).reshape(len(self.tickers), len(RANK_INVESTORS))
+
+    @classmethod
+    def load(cls, date: int, market: str = MARKET):
+        """외국인/기관합계 각각 한 번씩 (시장 전체 종목)"""
+        frames = []
+        for investor in RANK_INVESTORS:
+            df = upstream_health.call("pykrx", stock.get_market_net_purchases_of_equities_by_ticker,
+                                      str(date), str(date), market, investor)
+            if df is None:
+                return None
+            frames.append(df)
+        tickers = sorted(set().union(*(df.index for df in frames)))
+        names = {}
+        values = np.zeros((len(tickers), len(RANK_INVESTORS)))
+        for j, df in enumerate(frames):
+            if df.empty:
+                continue
+            names.update(df["종목명"].to_dict())
+            values[:, j] = df["순매수거래대금"].reindex(tickers).fillna(0).to_numpy(dtype=np.float64)
+        return cls(date, tickers, [names.get(t, "") for t in tickers], values)
+
+    @classmethod
+    def load_file(cls, path: str, date: int):
+        try:
+            with np.load(path) as data:
+                return cls(date, data["tickers"], data["names"], data["values"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, tickers=self.tickers, names=self.names, values=self.values)
+        os.replace(tmp_path, path)
+
+
+class InvestorFlowStore:
+    def __init__(self):
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._series_lock = threading.Lock()
+        self._series = OrderedDict()
+        self._checked_at = {}
+        self._days = {}
+        self.synced_at = None
+
+    def _lock(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    # ---- 일별 시리즈 (종목 / 시장 전체) ----
+    def path(self, key: str):
+        return data_path("investor_flow", f"{key}.npz")
+
+    def load(self, key: str):
+        with self._series_lock:
+            series = self._series.get(key)
+            if series is not None:
+                self._series.move_to_end(key)
+                return series
+        series = FlowSeries.load_file(self.path(key)) or FlowSeries.empty()
+        self._remember(key, series)
+        return series
+
+    def _remember(self, key: str, series):
+        with self._series_lock:
+            self._series[key] = series
+            self._series.move_to_end(key)
+            while len(self._series) > MAX_SERIES:
+                self._series.popitem(last=False)
+
+    def _sync(self, key: str, fetch):
+        with self._lock(key):
+            stored = self.load(key)
+            last = stored.last_date
+            target = last_closed_date()
+            if last is not None and last >= target:
+                return 0
+            if last is None:
+                start = (datetime.now() - timedelta(days=SEED_DAYS)).strftime("%Y%m%d")
+            else:
+                start = (datetime.strptime(str(last), "%Y%m%d") + timedelta(days=1)).strftime("%Y%m%d")
+            df = upstream_health.call("pykrx", fetch, start, str(target))
+            if df is None or df.empty:
+                return 0
+            fetched = FlowSeries.from_frame(df)
+            # 확정된 날짜만
+            closed = fetched.dates <= target
+            fetched = FlowSeries(fetched.dates[closed], fetched.columns, fetched.values[closed])
+            series = stored.appended(fetched)
+            added = len(series) - len(stored)
+            if added:
+                series.save(self.path(key))
+                self._remember(key, series)
+                logger.info("%s 투자자 동향 %s일 추가 (%s~)", key, added, format_date(series.dates[-added]))
+            return added
+
+    def ensure(self, key: str, fetch):
+        """마지막 확인 후 SYNC_INTERVAL이 지났으면 빠진 거래일만 받아 추가"""
+        checked = self._checked_at.get(key, 0.0)
+        if time.monotonic() - checked >= SYNC_INTERVAL:
+            try:
+                upstream_flight.do(("investor_flow", key), self._sync, key, fetch)
+            except Exception as e:
+                logger.warning("%s 투자자 동향 증분 갱신 실패, 저장된 데이터 사용: %s", key, e)
+            self._checked_at[key] = time.monotonic()
+        return self.load(key)
+
+    def ticker(self, ticker: str):
+        """종목별 일별 순매수 (기관합계, 기타법인, 개인, 외국인합계, 전체)"""
+        # 저장 파일 이름이 되므로 6자리 종목코드만
+        if normalize_code(ticker) != ticker:
+            raise ValueError(f"종목코드 형식 오류: {ticker}")
+        return self.ensure(ticker, lambda start, end: stock.get_market_trading_value_by_date(start, end, ticker))
+
+    def market(self, on: str):
+        """KOSPI 전체 일별 투자자 구분 값 (on: 매수/매도, 기관합계/기타법인/개인/외국인합계/전체)"""
+        return self.ensure(
+            f"{MARKET}_{on}_total",
+            lambda start, end: stock.get_market_trading_value_by_date(start, end, MARKET, on=on),
+        )
+
+    def market_by_investor(self, since: int):
+        """since 이후 투자자 구분별 매도/매수/순매수 합계 ([{"투자자구분", "매도", "매수", "순매수"}])"""
+        buy, sell = self.market("매수").since(since), self.market("매도").since(since)
+        if not len(buy) or not len(sell):
+            return []
+        buy_sums = dict(zip(buy.columns, np.nansum(buy.values, axis=0).tolist()))
+        sell_sums = dict(zip(sell.columns, np.nansum(sell.values, axis=0).tolist()))
+        return [{
+            "투자자구분": name,
+            "매도": sell_sums[name],
+            "매수": buy_sums[name],
+            "순매수": buy_sums[name] - sell_sums[name],
+        } for name in buy.columns if name in sell_sums]
+
+    # ---- 시장 전체 순매수 순위 ----
+    def _day_path(self, date: int):
+        return data_path("investor_flow", "net", f"{MARKET}_{date}.npz")
+
+    def stored_day(self, date: int):
+        """메모리나 디스크에 있는 하루치만 (업스트림 호출 없음)"""
+        day = self._days.get(date)
+        if day is not None:
+            return day
+        path = self._day_path(date)
+        day = NetPurchaseDay.load_file(path, date) if os.path.exists(path) else None
+        if day is not None:
+            self._days[date] = day
+        return day
+
+    def day(self, date: int):
+        """하루치 (없으면 업스트림에서 받아 저장, 스케줄러용)"""
+        day = self.stored_day(date)
+        if day is None:
+            day = NetPurchaseDay.load(date)
+            if day is None:
+                return None
+            day.save(self._day_path(date))
+            self._days[date] = day
+        return day
+
+    def recent_dates(self, count: int = max(PERIODS)):
+        """마지막 확정 거래일까지 최근 count개 거래일 (오래된 순)"""
+        end = last_closed_date()
+        start = (datetime.strptime(str(end), "%Y%m%d") - timedelta(days=count * 2 + 10)).strftime("%Y%m%d")
+        return [int(d) for d in trading_days(start, str(end))][-count:]
+
+    def sync_days(self, count: int = max(PERIODS)):
+        """최근 count개 거래일 중 아직 없는 날짜만 받아 저장"""
+        dates = self.recent_dates(count)
+        added = 0
+        for date in dates:
+            if date in self._days or os.path.exists(self._day_path(date)):
+                continue
+            try:
+                if self.day(date) is not None:
+                    added += 1
+            except Exception as e:
+                logger.warning("순매수 일별 데이터 실패 (%s): %s", date, e)
+                break
+        # 순위 기간 밖으로 밀려난 날짜는 메모리에서 정리
+        for date in ([d for d in self._days if d < dates[0]] if dates else []):
+            self._days.pop(date)
+        if added:
+            logger.info("시장 순매수 일별 데이터 %s일 추가", added)
+        return dates
+
+    def rankings(self, investor: str, days: int, n: int = 20, order: str = "desc"):
+        """최근 days 거래일 누적 순매수거래대금 상위/하위 n개 종목
+
+        요청 경로에서는 업스트림을 부르지 않고 저장된 날짜만 합산한다 (빠진 날짜는 스케줄러 sync_days가 채움).
+        """
+        column = RANK_INVESTORS.index(investor)
+        dates = self.recent_dates(days)
+        loaded = [d for d in (self.stored_day(date) for date in dates) if d is not None]
+        if not loaded:
+            return {"dates": [], "available_days": 0, "items": []}
+        # 날마다 종목 구성이 조금씩 다르므로 종목코드 합집합 기준으로 합산
+        tickers, inverse = np.unique(np.concatenate([d.tickers for d in loaded]), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate([d.values[:, column] for d in loaded]),
+                             minlength=len(tickers))
+        names = dict(zip(np.concatenate([d.tickers for d in loaded]).tolist(),
+                         np.concatenate([d.names for d in loaded]).tolist()))
+        n = min(n, len(tickers))
+        keys = totals if order == "desc" else -totals
+        top = np.argpartition(-keys, n - 1)[:n] if n < len(tickers) else np.arange(len(tickers))
+        top = top[np.argsort(-keys[top], kind="stable")]
+        return {
+            "dates": [format_date(loaded[0].date), format_date(loaded[-1].date)],
+            # days보다 작으면 아직 채워지지 않은 날짜를 뺀 부분 합계
+            "available_days": len(loaded),
+            "items": [{
+                "순위": rank,
+                "종목코드": str(tickers[i]),
+                "기업명": names.get(str(tickers[i]), ""),
+                "순매수거래대금": float(totals[i]),
+            } for rank, i in enumerate(top, start=1)],
+        }
+
+    # ---- 스케줄러 작업 ----
+    def sync_market(self):
+        """KOSPI 전체 시리즈와 순위용 일별 데이터를 마지막 확정 거래일까지 맞춤"""
+        buy, sell = self.market("매수"), self.market("매도")
+        dates = self.sync_days()
+        self.synced_at = datetime.now().isoformat()
+        return {
+            "market_last_date": buy.last_date if buy.last_date == sell.last_date else None,
+            "ranking_days": len(dates),
+        }
+
+
+# 앱 전체에서 공유하는 투자자 동향 저장소
+investor_flow_store = InvestorFlowStore()
@@ -1,23 +1,110 @@
+import app_logging
 from fastapi import FastAPI, Request,HTTPException,Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from bs4 import BeautifulSoup
 import yfinance as yf
 import time
 import pandas as pd
 from datetime import datetime, timedelta
-import requests
 from pymongo import MongoClient
 from pykrx.stock import get_market_trading_volume_by_date
-import json
 import os
-from pykrx.stock import get_market_trading_value_by_investor
 from pykrx import stock
+import asyncio
+import functools
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import List
+from http_pool import http_pool
+from response_cache import response_cache
+from singleflight import upstream_flight
+from market_scheduler import last_closed_date, market_scheduler, market_snapshots
+from ticker_index import normalize_code, ticker_index
+from market_snapshot import METRIC_ALIASES, market_snapshot_store
+from sales_store import sales_store
+from industry_store import industry_store
+from company_store import company_store
+from rankings import rankings_engine
+from name_search import NameSearchIndex
+from company_detail import fetch_company_details
+from metric_matrix import MetricMatrix
+from report_store import report_store
+from news_parser import news_parser
+from news_index import news_index
+from investor_flow import PERIODS as INVESTOR_PERIODS, RANK_INVESTORS, investor_flow_store
+from price_store import format_date, parse_date, price_store
+from chart_series import close_records, downsample_records
+from upstream_health import upstream_health
+import deadline
+from deadline import DeadlineExceeded
+from metrics import finish_request, http_in_flight, metrics as metrics_registry, observe_request, start_request
+from price_panel import MAX_DAYS as PANEL_MAX_DAYS, MAX_TICKERS as PANEL_MAX_TICKERS, load_close_panel
+from mongo_indexes import ensure_indexes
+from query_monitor import query_monitor
+from screener import METRICS as SCREEN_METRICS, YEARS as SCREEN_YEARS, ScreenerSnapshot, build_treasure_rows
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 파일 기반 데이터 미리 로드
+    await asyncio.to_thread(sales_store.warm_up)
+    await asyncio.to_thread(industry_store.available)
+    # 조회 형태별 MongoDB 인덱스 보장
+    await asyncio.to_thread(provision_mongo_indexes)
+    # 기업 문서 변경을 순위 엔진에 바로 반영 (change stream 지원 시)
+    company_store.start_change_watch([rankings_engine.apply])
+    # 시장 데이터 사전 갱신 스케줄러 시작
+    market_scheduler.start()
+    # KOSPI 전 종목 리포트 백그라운드 수집
+    report_store.start(lambda: [f"A{code}" for code in ticker_index.codes("KOSPI")])
+    # 뉴스 키워드 인덱스 수집 (기본 키워드 + 시가총액 상위 기업)
+    news_index.start(marketcap_top_names)
+    yield
+    await news_index.stop()
+    await report_store.stop()
+    await market_scheduler.stop()
+    # 종료 시 업스트림 커넥션 풀 정리
+    await http_pool.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
+# CORS 미들웨어는 아래에서 설정
 
-app = FastAPI()
+# 요청마다 엔드포인트별 시간 예산을 설정 (업스트림 타임아웃, Mongo maxTimeMS, fallback 단계에 전파)
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    # 요청 시간 예산 + 경로별 지연/업스트림 시간 계측 + 로그 요청 정보/샘플링
+    token = deadline.start(deadline.budget_for(request.url.path))
+    log_token = app_logging.begin_request(request.method, request.url.path)
+    timings_token = start_request()
+    started = time.perf_counter()
+    status = 500
+    http_in_flight.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        http_in_flight.dec()
+        # 경로 템플릿(/price/{ticker})으로 묶어 라벨 수가 늘지 않게
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        observe_request(request.method, route_path, status, elapsed, finish_request(timings_token))
+        app_logging.end_request(log_token)
+        deadline.reset(token)
+
+
+# 예산을 다 쓰고도 대체 응답이 없는 경우
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    logger.warning("시간 예산 초과: %s (%s)", request.url.path, exc)
+    return JSONResponse(content={"error": "응답 시간 초과, 잠시 후 다시 시도해주세요."}, status_code=504)
 
-# CORS 미들웨어는 아래에서 설정
 
 # CORS 설정 - 배포 환경에 맞게 수정
 app.add_middleware(
@@ -29,34 +116,36 @@ app.add_middleware(
 )
 
 # MongoDB 연결 - 환경변수 사용
-print(f"🔍 환경변수 확인:")
-print(f"🔍 MONGODB_URI: {os.getenv('MONGODB_URI', 'NOT_SET')}")
-print(f"🔍 MONGODB_URL: {os.getenv('MONGODB_URL', 'NOT_SET')}")
-print(f"🔍 RAILWAY_ENVIRONMENT: {os.getenv('RAILWAY_ENVIRONMENT', 'NOT_SET')}")
+logger.debug("환경변수 확인:")
+logger.debug("MONGODB_URI: %s", os.getenv('MONGODB_URI', 'NOT_SET'))
+logger.debug("MONGODB_URL: %s", os.getenv('MONGODB_URL', 'NOT_SET'))
+logger.debug("RAILWAY_ENVIRONMENT: %s", os.getenv('RAILWAY_ENVIRONMENT', 'NOT_SET'))
 
 # MongoDB URL 우선순위: MONGODB_URL > MONGODB_URI > 기본값
 MONGODB_URL = os.getenv("MONGODB_URL") or os.getenv("MONGODB_URI") or "mongodb://localhost:27017/finance_data"
-print(f"🔍 최종 MongoDB URL: {MONGODB_URL[:30]}...")  # 처음 30자만 출력
+logger.debug("최종 MongoDB URL: %s...", MONGODB_URL[:30])  # 처음 30자만 출력
 
 # 클라우드 환경에서는 MongoDB 연결 실패 시에도 서버가 정상 작동하도록 설정
 client = None
 collection = None
 
 try:
-    client = MongoClient(MONGODB_URL, serverSelectionTimeoutMS=10000)
+    # query_monitor: 쿼리 형태별 지연/반환 문서 수 집계, 느린 쿼리 explain
+    client = MongoClient(MONGODB_URL, serverSelectionTimeoutMS=10000, event_listeners=[query_monitor])
+    query_monitor.bind(client)
     # 연결 테스트
     client.admin.command('ping')
-    print("✅ MongoDB 연결 성공")
+    logger.info("MongoDB 연결 성공")
     collection = client["finance_data"]["companies"]
     
     # 연결 테스트 - 실제 데이터 조회
     test_docs = list(collection.find({}, {"_id": 0, "기업명": 1}).limit(1))
-    print(f"✅ MongoDB 데이터 조회 테스트 성공: {len(test_docs)}개 문서")
+    logger.info("MongoDB 데이터 조회 테스트 성공: %s개 문서", len(test_docs))
     
 except Exception as e:
-    print(f"❌ MongoDB 연결 실패: {e}")
-    print(f"❌ MongoDB URL: {MONGODB_URL}")
-    print("🔄 Fallback 모드로 전환 - 서버는 정상 작동하지만 일부 기능 제한")
+    logger.error("MongoDB 연결 실패: %s", e)
+    logger.error("MongoDB URL: %s", MONGODB_URL)
+    logger.info("Fallback 모드로 전환 - 서버는 정상 작동하지만 일부 기능 제한")
     client = None
     collection = None
 
@@ -66,62 +155,6 @@ DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 
 # OPTIONS 요청은 FastAPI CORS 미들웨어가 자동 처리
 
-# 뉴스 스크래핑 헬퍼 함수
-def scrape_news_with_requests(url: str, keyword: str = ""):
-    """requests와 BeautifulSoup을 사용한 뉴스 스크래핑"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'ko-KR,ko;q=0.8,en-US;q=0.5,en;q=0.3',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-        
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        news_list = []
-        # 여러 선택자 시도
-        selectors = [
-            'a.tit_main',
-            '.tit_main',
-            '.news_tit',
-            '.news_area .news_tit',
-            '.item-title > strong > a',
-            '#dnsColl .item-title strong a'
-        ]
-        
-        news_items = []
-        for selector in selectors:
-            news_items = soup.select(selector)
-            if news_items:
-                print(f"✅ 선택자 {selector}로 {len(news_items)}개 뉴스 발견")
-                break
-        
-        if not news_items:
-            # 다른 방법으로 시도
-            news_items = soup.find_all('a', class_='tit_main')
-            if not news_items:
-                news_items = soup.find_all('a', href=lambda x: x and 'news' in x)
-        
-        for item in news_items[:5]:
-            try:
-                title = item.get_text().strip()
-                link = item.get('href', '#')
-                if title and len(title) > 5:
-                    news_list.append({"title": title, "link": link})
-            except:
-                continue
-        
-        return news_list
-        
-    except Exception as e:
-        print(f"❌ 뉴스 스크래핑 실패: {e}")
-        return []
-
 # MongoDB 컬렉션 설정 (연결 실패 시 None 처리)
 if client:
     try:
@@ -131,13 +164,13 @@ if client:
         outline = db['outline']
         industry = db['industry_metrics']
         kospi_cache = db['kospi_cache']  # KOSPI 데이터 캐싱용
-        print(f"✅ MongoDB 컬렉션 설정 완료")
-        print(f"✅ collection: {collection}")
-        print(f"✅ explain: {explain}")
-        print(f"✅ outline: {outline}")
-        print(f"✅ kospi_cache: {kospi_cache}")
+        logger.info("MongoDB 컬렉션 설정 완료")
+        logger.info("collection: %s", collection)
+        logger.info("explain: %s", explain)
+        logger.info("outline: %s", outline)
+        logger.info("kospi_cache: %s", kospi_cache)
     except Exception as e:
-        print(f"❌ MongoDB 컬렉션 설정 실패: {e}")
+        logger.error("MongoDB 컬렉션 설정 실패: %s", e)
         db = None
         collection = None
         explain = None
@@ -145,7 +178,7 @@ if client:
         industry = None
         kospi_cache = None
 else:
-    print("❌ MongoDB 클라이언트가 None입니다")
+    logger.error("MongoDB 클라이언트가 None입니다")
     db = None
     collection = None
     explain = None
@@ -153,6 +186,24 @@ else:
     industry = None
     kospi_cache = None
 
+# 기업 스냅샷은 companies(users) 컬렉션 기준
+company_store.bind(collection)
+
+# 시작 시 인덱스 생성 결과 (/admin/queries에서 확인)
+index_status = []
+
+
+def provision_mongo_indexes():
+    global index_status
+    if client is None:
+        return
+    index_status = ensure_indexes({
+        "companies": collection,
+        "explain": explain,
+        "outline": outline,
+        "kospi_cache": kospi_cache,
+    })
+
 #백엔드 메인페이지
 @app.get("/")
 async def index():
@@ -168,10 +219,67 @@ async def health_check():
     return {
         "status": "healthy",
         "mongodb": "connected" if client else "disconnected",
+        "prefetch": market_snapshots.status(),
+        "reports": report_store.status(),
+        "news": news_index.status(),
+        "news_parser": news_parser.status(),
+        "logging": app_logging.status(),
         "timestamp": datetime.now().isoformat()
     }
 
 
+# 업스트림(pykrx, yfinance, fnguide, Daum)별 서킷 상태와 최근 오류
+@app.get("/admin/upstreams")
+async def upstream_status():
+    return upstream_health.status()
+
+
+# Prometheus 텍스트 형식 지표 (경로별 지연, 업스트림 호출, 캐시 적중률, 처리 중 요청)
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@metrics_registry.collector
+def cache_and_upstream_collector():
+    cache = response_cache.stats()
+    lookups = [
+        ({"namespace": namespace, "result": result}, counts[key])
+        for namespace, counts in response_cache.namespace_stats().items()
+        for result, key in (("hit", "hits"), ("stale", "stale_hits"), ("miss", "misses"))
+    ]
+    ratios = []
+    for namespace, counts in response_cache.namespace_stats().items():
+        total = counts["hits"] + counts["stale_hits"] + counts["misses"]
+        if total:
+            ratios.append(({"namespace": namespace}, (counts["hits"] + counts["stale_hits"]) / total))
+    breakers = upstream_health.status()
+    flight = upstream_flight.stats()
+    return [
+        ("response_cache_lookups_total", "counter", "응답 캐시 조회 수", lookups),
+        ("response_cache_hit_ratio", "gauge", "응답 캐시 적중률 (stale 포함)", ratios),
+        ("response_cache_entries", "gauge", "응답 캐시 항목 수", [({}, cache["entries"])]),
+        ("response_cache_bytes", "gauge", "응답 캐시 추정 크기", [({}, cache["bytes"])]),
+        ("response_cache_evictions_total", "counter", "용량 초과로 밀려난 항목 수", [({}, cache["evictions"])]),
+        ("upstream_circuit_open", "gauge", "업스트림 서킷 차단 여부",
+         [({"source": name}, int(b["state"] != "closed")) for name, b in breakers.items()]),
+        ("upstream_abandoned_calls", "gauge", "예산 초과로 버려졌지만 아직 실행 중인 업스트림 호출",
+         [({"source": name}, b["abandoned"]) for name, b in breakers.items()]),
+        ("singleflight_in_flight", "gauge", "진행 중인 공유 업스트림 호출", [({}, flight["in_flight"])]),
+        ("singleflight_calls_total", "counter", "single-flight 호출 수",
+         [({"result": "executed"}, flight["executed"]), ({"result": "shared"}, flight["shared"])]),
+    ]
+
+
+# MongoDB 인덱스 상태와 쿼리 형태별 계측 (지연, 검사/반환 문서 수, 느린 쿼리 실행 계획)
+@app.get("/admin/queries")
+async def mongo_query_report():
+    return {
+        "mongodb": "connected" if client else "disconnected",
+        "indexes": index_status,
+        **query_monitor.report(),
+    }
+
 #기업 상세페이지 기업개요, 기업 설명
 @app.get("/company/{name}")
 def get_full_company_data(name: str):
@@ -179,74 +287,34 @@ def get_full_company_data(name: str):
         # URL 디코딩 처리 (한글 인코딩 문제 해결)
         import urllib.parse
         decoded_name = urllib.parse.unquote(name)
-        print(f"🔍 기업 검색 요청: {decoded_name}")
-        print(f"🔍 원본 name: {name}")
-        
+        logger.debug("기업 검색 요청: %s", decoded_name)
+
         if collection is None:
-            print("❌ collection이 None입니다")
-            print("❌ MongoDB 연결 상태를 확인하세요")
+            logger.error("collection이 None입니다")
             raise HTTPException(status_code=503, detail="데이터베이스 연결 실패")
-        
-        print(f"🔍 MongoDB collection 사용 가능")
-        
-        # 기업명으로 검색
-        base = collection.find_one({"기업명": decoded_name}, {"_id": 0})
-        print(f"🔍 검색 결과: {base is not None}")
-        
+
+        # companies + explain + outline을 집계 한 번으로 조립
+        details = fetch_company_details(collection, [decoded_name], explain, outline)
+        base = details.get(decoded_name)
+
         if not base:
-            # 다른 방법으로 검색 시도
-            print(f"🔍 다른 방법으로 검색 시도...")
-            base = collection.find_one({"기업명": {"$regex": decoded_name, "$options": "i"}}, {"_id": 0})
-            print(f"🔍 정규식 검색 결과: {base is not None}")
-            
+            # 이름 검색 인덱스로 가장 가까운 기업명을 찾아 다시 조회
+            matched_name = company_name_index().best_match(decoded_name)
+            logger.debug("이름 검색 인덱스 결과: %s", matched_name)
+            if matched_name and matched_name != decoded_name:
+                base = fetch_company_details(collection, [matched_name], explain, outline).get(matched_name)
+
         if not base:
-            print(f"❌ 기업을 찾을 수 없음: {decoded_name}")
+            logger.warning("기업을 찾을 수 없음: %s", decoded_name)
             raise HTTPException(status_code=404, detail="기업을 찾을 수 없습니다.")
 
-        print(f"✅ 기업 데이터 찾음: {base.get('기업명', 'Unknown')}")
-        
-        # 지표 필드 확인 및 수정
-        if "지표" in base:
-            print(f"✅ 지표 필드 존재: {len(base['지표'])}개 키")
-            print(f"🔍 지표 키들: {list(base['지표'].keys())[:10]}...")  # 처음 10개만
-        elif "지" in base and "표" in base:
-            print(f"🔍 지와 표 필드가 분리되어 있음. 통합 중...")
-            # 지와 표 필드를 합쳐서 지표로 만들기
-            지표_데이터 = {}
-            if isinstance(base.get("지"), dict):
-                지표_데이터.update(base["지"])
-            if isinstance(base.get("표"), dict):
-                지표_데이터.update(base["표"])
-            base["지표"] = 지표_데이터
-            print(f"✅ 지표 필드 통합 완료: {len(지표_데이터)}개 키")
-        else:
-            print(f"❌ 지표 관련 필드 없음. 사용 가능한 키들: {list(base.keys())}")
-
-        # 1. 짧은요약 (explain 컬렉션)
-        if explain is not None:
-            explain_doc = explain.find_one({"기업명": decoded_name}, {"_id": 0, "짧은요약": 1})
-            if explain_doc:
-                base["짧은요약"] = explain_doc.get("짧은요약")
-                print(f"✅ 짧은요약 추가됨")
-
-        # 2. outline 정보 (outline 컬렉션)
-        if outline is not None:
-            code = base.get("종목코드")
-            if code:
-                outline_doc = outline.find_one({"종목코드": code}, {"_id": 0})
-                if outline_doc:
-                    base["개요"] = outline_doc
-                    print(f"✅ 개요 정보 추가됨")
-
-        print(f"✅ 최종 데이터 반환: {len(str(base))} 문자")
+        logger.debug("기업 데이터 찾음: %s", base.get('기업명', 'Unknown'))
         return base
-        
+
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ 기업 데이터 조회 오류: {e}")
-        import traceback
-        print(f"❌ 상세 오류: {traceback.format_exc()}")
+        logger.exception("기업 데이터 조회 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")
 
 #기업 재무재표
@@ -254,7 +322,7 @@ def get_full_company_data(name: str):
 def get_all_company_names():
     if collection is None:
         # MongoDB 연결 실패 시 fallback 데이터 반환
-        print("MongoDB 연결 실패, fallback 데이터 반환")
+        logger.warning("MongoDB 연결 실패, fallback 데이터 반환")
         return [
             "삼성전자", "SK하이닉스", "LG화학", "현대차", "네이버",
             "카카오", "LG전자", "POSCO", "기아", "KB금융",
@@ -263,7 +331,7 @@ def get_all_company_names():
         ]
     
     try:
-        cursor = collection.find({}, {"_id": 0, "기업명": 1})
+        cursor = collection.find({}, {"_id": 0, "기업명": 1}, max_time_ms=deadline.max_time_ms())
         names = [doc["기업명"] for doc in cursor if "기업명" in doc]
         if not names:
             # 데이터가 없을 때도 fallback 데이터 반환
@@ -273,7 +341,7 @@ def get_all_company_names():
             ]
         return names
     except Exception as e:
-        print(f"기업명 조회 오류: {e}")
+        logger.error("기업명 조회 오류: %s", e)
         # 오류 발생 시에도 fallback 데이터 반환
         return [
             "삼성전자", "SK하이닉스", "LG화학", "현대차", "네이버",
@@ -281,15 +349,77 @@ def get_all_company_names():
         ]
 
 
+# 기업명 검색 인덱스 (기업 스냅샷 version별로 한 번 구축, DB가 없으면 fallback 기업명 사용)
+_fallback_name_index = None
+
+
+def company_name_index():
+    global _fallback_name_index
+    index = company_store.derived("name_index", lambda docs: NameSearchIndex(doc.get("기업명") for doc in docs))
+    if index is None:
+        if _fallback_name_index is None:
+            _fallback_name_index = NameSearchIndex(get_all_company_names())
+        index = _fallback_name_index
+    return index
+
+
+# 기업명 자동완성 검색 (정확/접두/부분/초성/별칭/오타 허용)
+@app.get("/companies/search")
+def search_companies(
+    q: str = Query(..., min_length=1, description="검색어 (예: 삼성, ㅅㅅㅈㅈ, 네이버)"),
+    limit: int = Query(10, ge=1, le=50),
+):
+    try:
+        return company_name_index().search(q, limit=limit)
+    except Exception as e:
+        logger.error("기업명 검색 오류: %s", e)
+        return JSONResponse(content={"error": f"기업명 검색 실패: {str(e)}"}, status_code=500)
+
+
+# 여러 기업 상세를 한 번에 (비교 페이지용, 집계 한 번)
+MAX_BATCH_COMPANIES = 50
+
+
+@app.get("/companies/batch")
+def get_company_details_batch(names: str = Query(..., description="쉼표로 구분한 기업명 목록")):
+    requested = [n.strip() for n in names.split(",") if n.strip()]
+    if not requested:
+        raise HTTPException(status_code=400, detail="기업명을 하나 이상 입력하세요.")
+    if len(requested) > MAX_BATCH_COMPANIES:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {MAX_BATCH_COMPANIES}개 기업까지 조회할 수 있습니다.")
+    if collection is None:
+        raise HTTPException(status_code=503, detail="데이터베이스 연결 실패")
+
+    try:
+        # 정확한 기업명이 아니면 이름 검색 인덱스로 정식 기업명으로 바꿔서 한 번에 조회
+        index = company_name_index()
+        resolved = {}
+        for requested_name in requested:
+            resolved[requested_name] = index.best_match(requested_name) or requested_name
+        details = fetch_company_details(collection, resolved.values(), explain, outline)
+
+        items, missing = [], []
+        for requested_name, company_name in resolved.items():
+            detail = details.get(company_name)
+            if detail is None:
+                missing.append(requested_name)
+            else:
+                items.append(detail)
+        return {"items": items, "missing": missing}
+    except Exception as e:
+        logger.error("기업 일괄 조회 오류: %s", e)
+        raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")
+
+
 # 메인페이지 코스피 키워드 뉴스 리스트
 @app.get("/hot/")
 async def hot_news():
     try:
-        url = "https://search.daum.net/nate?w=news&nil_search=btn&DA=PGD&enc=utf8&cluster=y&cluster_page=1&q=코스피"
-        news_list = scrape_news_with_requests(url, "코스피")
-        
+        # 백그라운드로 수집된 뉴스 인덱스에서 조회
+        news_list = news_index.lookup("코스피", limit=5)
+
         if news_list:
-            print(f"✅ 코스피 뉴스 스크래핑 성공: {len(news_list)}개")
+            logger.debug("코스피 뉴스 인덱스 조회: %s개", len(news_list))
             return JSONResponse(content=news_list)
         else:
             # fallback 데이터
@@ -302,18 +432,17 @@ async def hot_news():
             ])
             
     except Exception as e:
-        print(f"❌ 핫뉴스 오류: {str(e)}")
+        logger.error("핫뉴스 오류: %s", e)
         return JSONResponse(content={"error": f"핫뉴스 조회 실패: {str(e)}"}, status_code=500)
 
 # 메인페이지 실적 발표 키워드 리스트
 @app.get("/main_news/")
 async def main_news():
     try:
-        url = "https://search.daum.net/nate?w=news&nil_search=btn&DA=PGD&enc=utf8&cluster=y&cluster_page=1&q=실적 발표"
-        news_list = scrape_news_with_requests(url, "실적 발표")
-        
+        news_list = news_index.lookup("실적 발표", limit=5)
+
         if news_list:
-            print(f"✅ 실적뉴스 스크래핑 성공: {len(news_list)}개")
+            logger.debug("실적뉴스 인덱스 조회: %s개", len(news_list))
             return JSONResponse(content=news_list)
         else:
             # fallback 데이터
@@ -326,7 +455,7 @@ async def main_news():
             ])
             
     except Exception as e:
-        print(f"❌ 실적뉴스 오류: {str(e)}")
+        logger.error("실적뉴스 오류: %s", e)
         return JSONResponse(content={"error": f"실적뉴스 조회 실패: {str(e)}"}, status_code=500)
 
 
@@ -338,12 +467,14 @@ async def search_news(request: Request):
         return JSONResponse(content={"error": "keyword 파라미터가 필요합니다"}, status_code=400)
 
     try:
-        search_url = f'https://search.daum.net/nate?w=news&nil_search=btn&DA=PGD&enc=utf8&cluster=y&cluster_page=1&q={keyword}'
-        news_list = scrape_news_with_requests(search_url, keyword)
-        
+        # 처음 요청된 기업도 추적 목록에 올려 다음 수집부터 채워지게 하고,
+        # 지금은 다른 키워드로 수집된 기사 중 제목에 기업명이 들어간 것을 반환
+        news_index.track(keyword)
+        news_list = news_index.lookup(keyword, limit=10)  # 최대 10개
+
         if news_list:
-            print(f"✅ '{keyword}' 뉴스 스크래핑 성공: {len(news_list)}개")
-            return JSONResponse(content=news_list[:10])  # 최대 10개
+            logger.debug("'%s' 뉴스 인덱스 조회: %s개", keyword, len(news_list))
+            return JSONResponse(content=news_list)
         else:
             # fallback 데이터
             return JSONResponse(content=[
@@ -355,86 +486,150 @@ async def search_news(request: Request):
             ])
             
     except Exception as e:
-        print(f"❌ '{keyword}' 뉴스 오류: {str(e)}")
+        logger.error("'%s' 뉴스 오류: %s", keyword, e)
         return JSONResponse(content={"error": f"뉴스 조회 실패: {str(e)}"}, status_code=500)
 
 
+# 주가 이력 조회 (pykrx -> yfinance 순서, 실패 시 None)
+@response_cache.cached("price", ttl=600, stale_ttl=6 * 3600)
+def load_price_history(ticker: str):
+    # 1단계: pykrx로 한국 주식 데이터 가져오기
+    if ticker.endswith('.KS') or len(ticker) == 6:
+        # 한국 주식 코드 정리 (005930.KS -> 005930)
+        if ticker.endswith('.KS'):
+            ticker = ticker.replace('.KS', '')
+
+        # pykrx로 최근 1년 데이터 가져오기
+        end_date = datetime.now().strftime("%Y%m%d")
+        start_date = (datetime.now() - timedelta(days=365)).strftime("%Y%m%d")
+
+        try:
+            df = upstream_health.call("pykrx", stock.get_market_ohlcv_by_date, start_date, end_date, ticker)
+            if not df.empty:
+                # 종가만 [{"Date", "Close"}]로 변환
+                result = close_records(df.index, df['종가'])
+                logger.debug("pykrx로 %s 주가 데이터 성공: %s개", ticker, len(result))
+                return result
+        except Exception as e:
+            logger.warning("pykrx 실패: %s", e)
+
+    # 2단계: yfinance로 시도 (해외 주식용)
+    try:
+        df = upstream_health.call("yfinance", yf_download, ticker, period="3y", interval="1d")
+        if not df.empty:
+            result = close_records(df.index, df['Close'])
+            logger.debug("yfinance로 %s 주가 데이터 성공: %s개", ticker, len(result))
+            return result
+    except Exception as e:
+        logger.warning("yfinance 실패: %s", e)
+
+    return None
+
+
 # 기업상세페이지 해당 기업 주가 시세
 @app.get("/price/{ticker}")
-def get_price_data(ticker: str):
+def get_price_data(
+    ticker: str,
+    start: str = Query(None, description="시작일 (YYYY-MM-DD 또는 YYYYMMDD, 기본: 1년 전)"),
+    end: str = Query(None, description="종료일 (YYYY-MM-DD 또는 YYYYMMDD, 기본: 오늘)"),
+    points: int = Query(None, ge=3, description="차트 점 개수 (LTTB 다운샘플링)"),
+):
     try:
         # ticker가 None이거나 빈 문자열인 경우 처리
         if not ticker:
             return {"error": "ticker 파라미터가 필요합니다"}
-        
-        # 1단계: pykrx로 한국 주식 데이터 가져오기
-        if ticker.endswith('.KS') or len(ticker) == 6:
-            # 한국 주식 코드 정리 (005930.KS -> 005930)
-            if ticker.endswith('.KS'):
-                ticker = ticker.replace('.KS', '')
-            
-            # pykrx로 최근 1년 데이터 가져오기
-            from pykrx import stock
-            from datetime import datetime, timedelta
-            
-            end_date = datetime.now().strftime("%Y%m%d")
-            start_date = (datetime.now() - timedelta(days=365)).strftime("%Y%m%d")
-            
-            try:
-                df = stock.get_market_ohlcv_by_date(start_date, end_date, ticker)
-                if not df.empty:
-                    # Close 컬럼만 추출하고 Date를 문자열로 변환
-                    df = df[['종가']].reset_index()
-                    df.columns = ['Date', 'Close']
-                    df['Date'] = df['Date'].astype(str)
-                    df['Close'] = df['Close'].astype(float)
-                    
-                    result = df.to_dict(orient="records")
-                    print(f"✅ pykrx로 {ticker} 주가 데이터 성공: {len(result)}개")
-                    return result
-            except Exception as e:
-                print(f"⚠️ pykrx 실패: {e}")
-        
-        # 2단계: yfinance로 시도 (해외 주식용)
+
         try:
-            df = yf.download(ticker, period="3y", interval="1d")
-            if not df.empty:
-                df = df[['Close']].reset_index()
-                df['Date'] = df['Date'].astype(str)
-                result = [{"Date": row['Date'], "Close": float(row['Close'])} for _, row in df.iterrows()]
-                print(f"✅ yfinance로 {ticker} 주가 데이터 성공: {len(result)}개")
-                return result
-        except Exception as e:
-            print(f"⚠️ yfinance 실패: {e}")
-        
+            start_date = parse_date(start) or int((datetime.now() - timedelta(days=365)).strftime("%Y%m%d"))
+            end_date = parse_date(end)
+        except ValueError as e:
+            return {"error": str(e)}
+
+        # 종목명/A코드/.KS 형태도 6자리 종목코드로 변환 (해외 심볼은 그대로)
+        ticker = ticker_index.resolve(ticker) or ticker
+
+        # 국내 종목은 로컬 일봉 저장소에서 구간 조회 (빠진 거래일만 증분으로 받아 둠)
+        if normalize_code(ticker) == ticker:
+            result = price_store.closes(ticker, start_date, end_date)
+            if result:
+                return downsample_records(result, points)
+
+        result = load_price_history(ticker)
+        if result:
+            start_text = format_date(start_date)
+            end_text = format_date(end_date) if end_date else None
+            result = [row for row in result
+                      if row["Date"][:10] >= start_text and (end_text is None or row["Date"][:10] <= end_text)]
+            return downsample_records(result, points)
+
         # 3단계: fallback 데이터
-        print(f"⚠️ {ticker} 주가 데이터 없음, 가상 데이터 생성")
-        from datetime import datetime, timedelta
+        logger.warning("%s 주가 데이터 없음, 가상 데이터 생성", ticker)
         import random
-        
+
         result = []
         base_price = 70000 if '005930' in ticker else 50000  # 삼성전자는 7만원대
-        
+
         for i in range(30, 0, -1):
             date = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
             change = random.uniform(-2000, 2000)
             base_price += change
             result.append({"Date": date, "Close": round(base_price, 2)})
-        
+
         return result
 
     except Exception as e:
-        print(f"❌ 주가 데이터 오류: {e}")
+        logger.error("주가 데이터 오류: %s", e)
         return {"error": str(e)}
 
 
+# 관심종목/비교 화면용 여러 종목 종가 (날짜 축 정렬, 시장 전체 일별 스냅샷으로 조립)
+@app.get("/prices")
+def get_prices(
+    tickers: str = Query(..., description="쉼표로 구분한 종목코드 또는 종목명"),
+    start: str = Query(None, description="시작일 (YYYY-MM-DD 또는 YYYYMMDD, 기본: 90일 전)"),
+    end: str = Query(None, description="종료일 (YYYY-MM-DD 또는 YYYYMMDD, 기본: 오늘)"),
+):
+    requested = [t.strip() for t in tickers.split(",") if t.strip()]
+    if not requested:
+        raise HTTPException(status_code=400, detail="종목을 하나 이상 입력하세요.")
+    if len(requested) > PANEL_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {PANEL_MAX_TICKERS}개 종목까지 조회할 수 있습니다.")
+    try:
+        end_date = parse_date(end) or int(datetime.now().strftime("%Y%m%d"))
+        start_date = parse_date(start) or int((datetime.now() - timedelta(days=90)).strftime("%Y%m%d"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    span = datetime.strptime(str(end_date), "%Y%m%d") - datetime.strptime(str(start_date), "%Y%m%d")
+    if span.days < 0 or span.days > PANEL_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"조회 기간은 0~{PANEL_MAX_DAYS}일이어야 합니다.")
+
+    codes, unknown = [], []
+    for value in requested:
+        code = ticker_index.resolve(value)
+        if code:
+            codes.append(code)
+        else:
+            unknown.append(value)
+    codes = list(dict.fromkeys(codes))
+
+    try:
+        result = dict(load_close_panel(tuple(codes), str(start_date), str(end_date))) if codes else {
+            "dates": [], "tickers": [], "names": {}, "series": {}, "missing_dates": [],
+        }
+        result["unknown"] = unknown
+        return JSONResponse(content=result)
+    except Exception as e:
+        logger.error("여러 종목 주가 조회 오류: %s", e)
+        return JSONResponse(content={"error": f"주가 조회 실패: {str(e)}"}, status_code=500)
+
+
 def extract_data_from_text(soup, code: str):
     """텍스트에서 데이터 추출 (JavaScript 동적 로드 대응)"""
-    print(f"🔍 extract_data_from_text 호출됨, 코드: {code}")
+    logger.debug("extract_data_from_text 호출됨, 코드: %s", code)
     
     # 코드에 따른 기업 데이터 반환
     if code == "A012330":  # 현대모비스
-        print("✅ 현대모비스 데이터 반환")
+        logger.debug("현대모비스 데이터 반환")
         reports = [
             {
                 "date": "2025/09/02",
@@ -464,11 +659,11 @@ def extract_data_from_text(soup, code: str):
                 "analyst": "교보증권 김광식"
             }
         ]
-        print(f"✅ 현대모비스 {len(reports)}개 리포트 반환")
+        logger.debug("현대모비스 %s개 리포트 반환", len(reports))
         return reports
     
     elif code == "A005930":  # 삼성전자
-        print("✅ 삼성전자 데이터 반환")
+        logger.debug("삼성전자 데이터 반환")
         reports = [
             {
                 "date": "2025/01/15",
@@ -498,94 +693,40 @@ def extract_data_from_text(soup, code: str):
                 "analyst": "NH투자증권 이정호"
             }
         ]
-        print(f"✅ 삼성전자 {len(reports)}개 리포트 반환")
+        logger.debug("삼성전자 %s개 리포트 반환", len(reports))
         return reports
     
-    print("⚠️ 해당 코드에 대한 데이터 없음")
+    logger.debug("해당 코드에 대한 데이터 없음")
     return []
 
 # 기업상세페이지 종목분석 리포트
 @app.get("/report/")
 def get_report_summary(code: str = Query(..., description="종목 코드 (예: A005930)")):
     try:
-        # fnguide.com JSON API 직접 호출
-        url = f"https://comp.fnguide.com/SVO2/json/data/01_06/04_{code}.json"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36',
-            'Accept': 'application/json, text/javascript, */*; q=0.01',
-            'Accept-Language': 'ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Accept-Encoding': 'gzip, deflate, br, zstd',
-            'Referer': f'https://comp.fnguide.com/SVO2/ASP/SVD_Consensus.asp?pGB=1&gicode={code}',
-            'X-Requested-With': 'XMLHttpRequest',
-            'Cache-Control': 'no-cache',
-            'Pragma': 'no-cache'
-        }
-        
-        print(f"🔍 리포트 API 호출: {url}")
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # UTF-8 BOM 문제 해결
-        try:
-            data = response.json()
-        except requests.exceptions.JSONDecodeError as e:
-            if "UTF-8 BOM" in str(e):
-                print("⚠️ UTF-8 BOM 감지, 수동으로 처리")
-                # BOM 제거 후 JSON 파싱
-                text = response.text
-                if text.startswith('\ufeff'):
-                    text = text[1:]  # BOM 제거
-                data = json.loads(text)
-            else:
-                raise e
-        
-        print(f"✅ JSON API 응답 성공: {len(data.get('comp', []))}개 리포트")
-        
-        # JSON 데이터를 우리 형식으로 변환
-        reports = []
-        for item in data.get('comp', [])[:5]:  # 최대 5개
-            try:
-                # 날짜 형식 변환 (20250825 -> 2025/08/25)
-                date_str = item.get('BULLET_DT', '')
-                if len(date_str) == 8:
-                    formatted_date = f"{date_str[:4]}/{date_str[4:6]}/{date_str[6:8]}"
-                else:
-                    formatted_date = item.get('BULLET_MMDD', '')
-                
-                # 목표주가와 종가 정리 (공백 제거)
-                target_price = item.get('TARGET_PRC', '').strip()
-                closing_price = item.get('CLS_PRC', '').strip()
-                
-                report = {
-                    "date": formatted_date,
-                    "title": item.get('TITLE', ''),
-                    "summary": item.get('SYNOPSIS', ''),
-                    "opinion": item.get('RECOMMEND', ''),
-                    "target_price": target_price,
-                    "closing_price": closing_price,
-                    "analyst": f"{item.get('OFFER_INST_NM', '')} {item.get('NICK_NM', '')}".strip()
-                }
-                
-                reports.append(report)
-                print(f"✅ 리포트 파싱: {report['title'][:30]}...")
-                
-            except Exception as e:
-                print(f"⚠️ 리포트 파싱 오류: {e}")
-                continue
-        
+        # 종목명이나 6자리 코드로 들어와도 fnguide 형식(A005930)으로 맞춤
+        resolved = ticker_index.resolve(code)
+        if resolved:
+            code = f"A{resolved}"
+
+        # 로컬 저장소에서 바로 반환 (오래된 종목은 뒤에서 갱신)
+        entry = report_store.get(code)
+        if entry is not None:
+            if report_store.is_stale(entry):
+                report_store.refresh_in_background(code)
+            reports = entry["reports"]
+        else:
+            # 아직 수집 전인 종목만 남은 예산 안에서 직접 조회
+            reports = report_store.refresh(code)
+
         if reports:
-            print(f"✅ 최종 리포트 데이터: {len(reports)}개")
+            logger.debug("최종 리포트 데이터: %s개", len(reports))
             return reports
         else:
-            print("⚠️ 파싱된 리포트 없음, fallback 데이터 사용")
+            logger.warning("파싱된 리포트 없음, fallback 데이터 사용")
             return get_fallback_report_data(code)
             
     except Exception as e:
-        print(f"❌ 리포트 API 호출 실패: {e}")
-        import traceback
-        print(f"❌ 상세 오류: {traceback.format_exc()}")
+        logger.exception("리포트 API 호출 실패: %s", e)
         return get_fallback_report_data(code)
 
 
@@ -653,189 +794,158 @@ def get_fallback_report_data(code: str):
 
 
 
+# pykrx로 최근 1년 KOSPI 종가 조회 후 MongoDB 캐시에 저장 (실패 시 None)
+def load_kospi_from_pykrx():
+    today = datetime.today().date()
+    try:
+        # 최근 1년간 KOSPI 데이터 가져오기
+        end_date = today.strftime("%Y%m%d")
+        start_date = (today - timedelta(days=365)).strftime("%Y%m%d")
+
+        logger.debug("pykrx로 KOSPI 데이터 요청: %s ~ %s", start_date, end_date)
+        # 동시 요청은 하나의 pykrx 호출 결과를 공유
+        df = upstream_flight.do(
+            ("kospi_index", start_date, end_date),
+            upstream_health.call, "pykrx", stock.get_index_ohlcv_by_date, start_date, end_date, "1001"  # 1001 = KOSPI
+        )
+
+        if df.empty:
+            logger.warning("pykrx에서 빈 데이터 반환")
+            return None
+
+        logger.info("pykrx로 KOSPI 데이터 성공: %s개", len(df))
+        # 종가만 [{"Date", "Close"}]로 변환
+        result_data = close_records(df.index, df['종가'])
+
+        # 성공한 데이터를 MongoDB에 캐시 저장
+        if kospi_cache is not None:
+            try:
+                cache_doc = {
+                    "type": "kospi_data",
+                    "timestamp": datetime.now(),
+                    "data": result_data,
+                    "data_count": len(result_data),
+                    "source": "pykrx"
+                }
+                kospi_cache.replace_one(
+                    {"type": "kospi_data"}, 
+                    cache_doc, 
+                    upsert=True
+                )
+                logger.info("KOSPI 데이터 캐시 저장 완료: %s개", len(result_data))
+            except Exception as e:
+                logger.warning("캐시 저장 실패: %s", e)
+
+        return result_data
+
+    except Exception as e:
+        logger.error("pykrx KOSPI 데이터 실패: %s", e)
+        return None
+
+
+# requirements의 yfinance 0.2.x는 download() 결과를 모듈 전역(shared._DFS/_ERRORS)에 모았다가 꺼내고
+# 호출마다 비우며, Ticker.history()도 실패 시 같은 전역에 쓴다. 여러 스레드(hedged 후보, 동시 요청)에서
+# 동시에 부르면 서로의 결과를 덮어쓰므로 yfinance 호출은 threads=False로 락 안에서 하나씩만 실행 (락 대기도 요청 예산 안에서)
+YF_LOCK = threading.Lock()
+
+
+def yf_locked(fn, *args, **kwargs):
+    left = deadline.remaining()
+    if not YF_LOCK.acquire(timeout=-1 if left is None else left):
+        raise DeadlineExceeded("요청 시간 예산 초과 (yfinance 대기)")
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        YF_LOCK.release()
+
+
+def yf_download(*args, **kwargs):
+    return yf_locked(yf.download, *args, threads=False, **kwargs)
+
+
 # 메인페이지 코스피 지수
-@app.get("/kospi/")
-def get_kospi_data():
+def download_close_history(symbol: str, **options):
+    """yfinance 일봉 (빈 결과도 실패로 보고 서킷 브레이커에 반영)"""
+    df = yf_download(symbol, auto_adjust=True, progress=False, **options)
+    if df is None or df.empty:
+        raise ValueError(f"{symbol} 빈 데이터")
+    return df
+
+
+def ticker_close_history(symbol: str):
+    df = yf_locked(yf.Ticker(symbol).history, period="1y", interval="1d", auto_adjust=True)
+    if df is None or df.empty:
+        raise ValueError(f"{symbol} 빈 데이터")
+    return df
+
+
+# KOSPI yfinance 후보 (우선순위 순). 기간만 다른 같은 심볼 요청은 함께 실패하므로 심볼/방식별로 하나씩
+# 후보는 YF_LOCK으로 차례로 실행되므로 hedged는 앞 후보가 stagger초 넘게 걸릴 때 다음 후보를 줄 세워 두는 정도
+KOSPI_YF_CANDIDATES = [
+    ("^KS11 download", "yfinance", functools.partial(download_close_history, period="1y", interval="1d", group_by="ticker"), ("^KS11",)),
+    ("KS11 download", "yfinance", functools.partial(download_close_history, period="1y", interval="1d", group_by="ticker"), ("KS11",)),
+    ("^KS11 history", "yfinance", ticker_close_history, ("^KS11",)),
+]
+KOSPI_ETF_CANDIDATES = [
+    (symbol, "yfinance", functools.partial(download_close_history, period="1y", interval="1d"), (symbol,))
+    for symbol in ["EWY", "FXI", "EWJ"]
+]
+
+
+# KOSPI 지수 종가 시계열 (스냅샷 -> Mongo 캐시 -> pykrx -> yfinance -> 오래된 캐시 -> 가상 데이터)
+def load_kospi_series():
     try:
+        # 0단계: 스케줄러가 미리 갱신해 둔 스냅샷
+        snapshot = market_snapshots.get("kospi")
+        if snapshot:
+            return snapshot
+
         # 오늘 날짜 계산
         today = datetime.today().date()
         
         # 1단계: MongoDB 캐시 확인
         if kospi_cache is not None:
             try:
-                cached_data = kospi_cache.find_one({"type": "kospi_data"})
+                cached_data = kospi_cache.find_one({"type": "kospi_data"}, max_time_ms=deadline.max_time_ms(2000))
                 if cached_data:
                     cache_time = cached_data.get("timestamp", datetime.min)
                     # 6시간 이내 데이터면 캐시 사용 (pykrx는 더 자주 업데이트 가능)
                     if (datetime.now() - cache_time).total_seconds() < 6 * 3600:
-                        print(f"✅ 캐시된 KOSPI 데이터 사용 (캐시 시간: {cache_time})")
-                        return JSONResponse(content=cached_data.get("data", []))
+                        logger.debug("캐시된 KOSPI 데이터 사용 (캐시 시간: %s)", cache_time)
+                        return cached_data.get("data", [])
                     else:
-                        print(f"⚠️ 캐시된 데이터가 오래됨 ({(datetime.now() - cache_time).total_seconds()/3600:.1f}시간 전)")
+                        logger.warning("캐시된 데이터가 오래됨 (%.1f시간 전)", (datetime.now() - cache_time).total_seconds()/3600)
             except Exception as e:
-                print(f"⚠️ 캐시 확인 중 오류: {e}")
+                logger.warning("캐시 확인 중 오류: %s", e)
         
         # 2단계: pykrx로 KOSPI 데이터 가져오기
-        try:
-            from pykrx import stock
-            
-            # 최근 1년간 KOSPI 데이터 가져오기
-            end_date = today.strftime("%Y%m%d")
-            start_date = (today - timedelta(days=365)).strftime("%Y%m%d")
-            
-            print(f"pykrx로 KOSPI 데이터 요청: {start_date} ~ {end_date}")
-            df = stock.get_index_ohlcv_by_date(start_date, end_date, "1001")  # 1001 = KOSPI
-            
-            if not df.empty:
-                print(f"✅ pykrx로 KOSPI 데이터 성공: {len(df)}개")
-                # 종가 컬럼만 추출하고 Date를 문자열로 변환
-                df = df[['종가']].reset_index()
-                df.columns = ['Date', 'Close']
-                df['Date'] = df['Date'].astype(str)
-                df['Close'] = df['Close'].astype(float)
-                
-                result_data = df.to_dict(orient="records")
-                
-                # 3단계: 성공한 데이터를 MongoDB에 캐시 저장
-                if kospi_cache is not None:
-                    try:
-                        cache_doc = {
-                            "type": "kospi_data",
-                            "timestamp": datetime.now(),
-                            "data": result_data,
-                            "data_count": len(result_data),
-                            "source": "pykrx"
-                        }
-                        kospi_cache.replace_one(
-                            {"type": "kospi_data"}, 
-                            cache_doc, 
-                            upsert=True
-                        )
-                        print(f"✅ KOSPI 데이터 캐시 저장 완료: {len(result_data)}개")
-                    except Exception as e:
-                        print(f"⚠️ 캐시 저장 실패: {e}")
-
-                return JSONResponse(content=result_data)
-            else:
-                print("⚠️ pykrx에서 빈 데이터 반환")
-                
-        except Exception as e:
-            print(f"❌ pykrx KOSPI 데이터 실패: {e}")
-        
-        # 3단계: yfinance 백업 (pykrx 실패 시)
-        print("⚠️ pykrx 실패, yfinance 백업 시도...")
-        df = None
-        
-        # yfinance 설정들
-        symbols_and_configs = [
-            ("^KS11", {"period": "1y", "interval": "1d"}),
-            ("KS11", {"period": "1y", "interval": "1d"}),
-            ("^KS11", {"period": "6mo", "interval": "1d"}),
-            ("^KS11", {"period": "3mo", "interval": "1d"}),
-            ("^KS11", {"period": "1mo", "interval": "1d"}),
-            ("^KS11", {"start": "2023-01-01", "end": today.strftime("%Y-%m-%d")}),
-            ("^KS11", {"start": "2024-01-01", "end": today.strftime("%Y-%m-%d")}),
-            ("KS11", {"start": "2023-01-01", "end": today.strftime("%Y-%m-%d")}),
-        ]
-        
-        for symbol, config in symbols_and_configs:
-            try:
-                print(f"yfinance 시도: {symbol}, 설정: {config}")
-                
-                # 방법 1: yf.download 사용 (period 또는 start/end 구분)
-                if "period" in config:
-                    df = yf.download(
-                        symbol, 
-                        period=config["period"], 
-                        interval=config["interval"], 
-                        auto_adjust=True, 
-                        progress=False,
-                        threads=False,
-                        group_by="ticker"
-                    )
-                elif "start" in config and "end" in config:
-                    df = yf.download(
-                        symbol, 
-                        start=config["start"], 
-                        end=config["end"],
-                        interval=config.get("interval", "1d"), 
-                        auto_adjust=True, 
-                        progress=False,
-                        threads=False,
-                        group_by="ticker"
-                    )
-                else:
-                    print(f"⚠️ 잘못된 설정: {config}")
-                    continue
-                
-                print(f"데이터프레임 정보: shape={df.shape}, empty={df.empty}")
-                if not df.empty:
-                    print(f"✅ yf.download 성공: {symbol}, 데이터 개수: {len(df)}")
-                    print(f"컬럼: {df.columns.tolist()}")
-                    print(f"첫 5행:\n{df.head()}")
-                    break
-                else:
-                    print(f"⚠️ 빈 데이터프레임: {symbol}")
-                    
-            except Exception as e:
-                print(f"❌ yf.download 실패: {symbol} - {type(e).__name__}: {e}")
-                import traceback
-                print(f"상세 오류: {traceback.format_exc()}")
-                continue
-        
-        # 2단계: Ticker 객체로 시도
-        if df is None or df.empty:
-            for symbol in ["^KS11", "KS11"]:
-                try:
-                    print(f"Ticker 객체 시도: {symbol}")
-                    ticker = yf.Ticker(symbol)
-                    
-                    # Ticker.history만 사용 (download 메서드는 없음)
-                    try:
-                        df = ticker.history(period="1y", interval="1d", auto_adjust=True)
-                        if not df.empty:
-                            print(f"✅ Ticker.history 성공: {symbol}")
-                    except Exception as e:
-                        print(f"❌ Ticker.history 실패: {e}")
-                        continue
-                    
-                    if df is not None and not df.empty:
-                        break
-                        
-                except Exception as e:
-                    print(f"❌ Ticker 객체 생성 실패: {symbol} - {e}")
-                    continue
-        
-        # 3단계: 대안 데이터 소스 시도
-        if df is None or df.empty:
-            print("⚠️ yfinance 실패, 대안 데이터 소스 시도...")
-            
-            # 대안 1: 다른 심볼들 시도
-            alternative_symbols = ["EWY", "FXI", "EWJ"]  # 한국, 중국, 일본 ETF
-            for alt_symbol in alternative_symbols:
-                try:
-                    print(f"대안 심볼 시도: {alt_symbol}")
-                    df = yf.download(alt_symbol, period="1y", interval="1d", auto_adjust=True, progress=False)
-                    if not df.empty:
-                        print(f"✅ 대안 심볼 성공: {alt_symbol}")
-                        break
-                except Exception as e:
-                    print(f"❌ 대안 심볼 실패: {alt_symbol} - {e}")
-                    continue
-        
+        result_data = load_kospi_from_pykrx()
+        if result_data:
+            return result_data
+        
+        # 3단계: yfinance 백업 (pykrx 실패 시) - 후보를 시차를 두고 병렬로 보내 먼저 성공한 결과 사용
+        logger.warning("pykrx 실패, yfinance 백업 시도...")
+        label, df = upstream_health.hedged(KOSPI_YF_CANDIDATES, stagger=1.5, timeout=15)
+        if df is None:
+            # 지수 심볼이 모두 실패하면 대안 ETF (한국, 중국, 일본)
+            logger.warning("yfinance 지수 실패, 대안 데이터 소스 시도...")
+            label, df = upstream_health.hedged(KOSPI_ETF_CANDIDATES, stagger=1.5, timeout=15)
+        if df is not None:
+            logger.info("yfinance 백업 성공: %s, 데이터 개수: %s", label, len(df))
+
         # 4단계: 캐시된 데이터가 있으면 사용 (오래된 데이터라도)
         if df is None or df.empty:
             if kospi_cache is not None:
                 try:
-                    cached_data = kospi_cache.find_one({"type": "kospi_data"})
+                    cached_data = kospi_cache.find_one({"type": "kospi_data"}, max_time_ms=deadline.max_time_ms(2000))
                     if cached_data and cached_data.get("data"):
-                        print(f"⚠️ yfinance 실패, 오래된 캐시 데이터 사용")
-                        return JSONResponse(content=cached_data.get("data", []))
+                        logger.warning("yfinance 실패, 오래된 캐시 데이터 사용")
+                        return cached_data.get("data", [])
                 except Exception as e:
-                    print(f"⚠️ 캐시 데이터 조회 실패: {e}")
+                    logger.warning("캐시 데이터 조회 실패: %s", e)
             
             # 5단계: 최종 fallback - 가상 데이터 생성
-            print("⚠️ 모든 데이터 소스 실패, 가상 데이터 생성")
+            logger.warning("모든 데이터 소스 실패, 가상 데이터 생성")
             import random
             base_price = 2500
             dates = []
@@ -868,11 +978,11 @@ def get_kospi_data():
                         cache_doc, 
                         upsert=True
                     )
-                    print(f"✅ 가상 데이터 캐시 저장 완료")
+                    logger.info("가상 데이터 캐시 저장 완료")
                 except Exception as e:
-                    print(f"⚠️ 가상 데이터 캐시 저장 실패: {e}")
+                    logger.warning("가상 데이터 캐시 저장 실패: %s", e)
             
-            return JSONResponse(content=fallback_data)
+            return fallback_data
 
         # Close 컬럼 찾기
         close_col = None
@@ -888,12 +998,7 @@ def get_kospi_data():
         if close_col is None:
             return JSONResponse(content={"error": f"Close 컬럼이 없습니다. 컬럼 목록: {df.columns.tolist()}"}, status_code=400)
 
-        df = df[[close_col]].reset_index()
-        df.columns = ['Date', 'Close']
-        df['Date'] = df['Date'].astype(str)
-        df['Close'] = df['Close'].astype(float)
-
-        result_data = df.to_dict(orient="records")
+        result_data = close_records(df.index, df[close_col])
         
         # 3단계: 성공한 데이터를 MongoDB에 캐시 저장
         if kospi_cache is not None:
@@ -909,509 +1014,505 @@ def get_kospi_data():
                     cache_doc, 
                     upsert=True
                 )
-                print(f"✅ KOSPI 데이터 캐시 저장 완료: {len(result_data)}개")
+                logger.info("KOSPI 데이터 캐시 저장 완료: %s개", len(result_data))
             except Exception as e:
-                print(f"⚠️ 캐시 저장 실패: {e}")
+                logger.warning("캐시 저장 실패: %s", e)
 
-        return JSONResponse(content=result_data)
+        return result_data
 
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 
-# 0을 제외한 해당 기업 종목 재무제표 리스트
+@app.get("/kospi/")
+def get_kospi_data(points: int = Query(None, ge=3, description="차트 점 개수 (LTTB 다운샘플링)")):
+    result = load_kospi_series()
+    if isinstance(result, JSONResponse):
+        return result
+    return JSONResponse(content=downsample_records(result, points))
+
+
+# 해당 기업 사업부문별 매출 리스트 (종목명 또는 종목코드)
 @app.get("/sales/{name}")
 def get_sales_by_name(name: str):
-    df = pd.read_csv("NICE_내수수출_코스피.csv")
-    grouped = df.groupby(['종목명', '사업부문', '매출품목명', '구분'])[['2022_12 매출액', '2023_12 매출액', '2024_12 매출액']].sum()
+    import urllib.parse
+    decoded_name = urllib.parse.unquote(name)
 
-    if name not in grouped.index.get_level_values(0):
+    rows = sales_store.lookup(decoded_name)
+    if rows is None:
         raise HTTPException(status_code=404, detail="해당 기업 없음")
 
-    filtered = grouped.loc[name].reset_index()
-    return filtered.to_dict(orient="records")
+    return rows
 
 # 기업상세피이지 해당기업 기관, 외국인, 기관 매수,매도량 - 제거됨 (중복 엔드포인트)
 
 
+# 전체 산업 설명 목록 (names=IT 서비스,건설 처럼 일부만 선택 가능)
+@app.get("/industry")
+def get_industry_list(names: List[str] = Query(None, description="산업명 (여러 개면 names를 반복, 산업명에 쉼표가 있을 수 있음)")):
+    if not industry_store.available():
+        raise HTTPException(status_code=404, detail="산업별설명.json 파일 없음")
+
+    if not names:
+        return industry_store.all()
+
+    result = []
+    for name in names:
+        item = industry_store.lookup(name)
+        if item is not None and item not in result:
+            result.append(item)
+    return result
+
+
 # 메인페이지 산업별 재무지표 분석 정보 조회
 @app.get("/industry/{name}")
 def get_industry_analysis(name: str):
-    try:
-        # 파일 경로 확인 (프론트엔드 public 폴더에서 찾기)
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(current_dir)
-        
-        file_paths = [
-            os.path.join(project_root, "FRONTEND", "public", "산업별설명.json"),
-            os.path.join(current_dir, "산업별설명.json"),
-            os.path.join(current_dir, "public", "산업별설명.json"),
-            "../FRONTEND/public/산업별설명.json",
-            "산업별설명.json"
-        ]
-        
-        file_path = None
-        for path in file_paths:
-            if os.path.exists(path):
-                file_path = path
-                break
-        
-        if not file_path:
-            raise FileNotFoundError(f"산업별설명.json 파일을 찾을 수 없습니다: {file_paths}")
-        
-        with open(file_path, encoding="utf-8") as f:
-            data = json.load(f)
-        name = name.strip()
-        for item in data:
-            if item.get("industry") == name:
-                return item
-        raise HTTPException(status_code=404, detail="해당 산업 정보 없음")
-    except FileNotFoundError:
+    if not industry_store.available():
         raise HTTPException(status_code=404, detail="산업별설명.json 파일 없음")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")
+
+    item = industry_store.lookup(name)
+    if item is None:
+        raise HTTPException(status_code=404, detail="해당 산업 정보 없음")
+    return item
 
 
 # 기업 재무지표 MongoDB에서 직접 조회
+# 기업 비교 차트용 여러 기업 재무지표 (열 단위: 연도 축 + 지표별·기업별 값 배열)
+MAX_METRIC_COMPANIES = 50
+
+
+@app.get("/company_metrics")
+def get_company_metrics_columns(
+    names: str = Query(..., description="쉼표로 구분한 기업명 목록"),
+    metrics: str = Query(None, description="쉼표로 구분한 지표명 (기본: 주요 재무지표 전체)"),
+    years: str = Query(None, description="쉼표로 구분한 연도 (기본: 2022,2023,2024)"),
+):
+    requested = [n.strip() for n in names.split(",") if n.strip()]
+    if not requested:
+        raise HTTPException(status_code=400, detail="기업명을 하나 이상 입력하세요.")
+    if len(requested) > MAX_METRIC_COMPANIES:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {MAX_METRIC_COMPANIES}개 기업까지 조회할 수 있습니다.")
+
+    matrix = company_store.derived("metric_matrix", MetricMatrix)
+    if matrix is None:
+        return JSONResponse(content={"error": "데이터베이스 연결 실패"}, status_code=503)
+
+    index = company_name_index()
+    resolved, missing = [], []
+    for requested_name in requested:
+        company_name = requested_name if requested_name in matrix else index.best_match(requested_name)
+        if company_name in matrix:
+            resolved.append(company_name)
+        else:
+            missing.append(requested_name)
+
+    metric_list = [m.strip() for m in metrics.split(",") if m.strip()] if metrics else None
+    year_list = [y.strip() for y in years.split(",") if y.strip()] if years else None
+    result = matrix.columns(resolved, metric_list, year_list)
+    result["missing"] = missing
+    if metric_list:
+        result["unknown_metrics"] = [m for m in metric_list if m not in result["metrics"]]
+    return result
+
+
 @app.get("/company_metrics/{name}")
 def get_company_metrics(name: str):
     try:
         # URL 디코딩 처리
         import urllib.parse
         decoded_name = urllib.parse.unquote(name)
-        print(f"🔍 기업 재무지표 요청: {decoded_name}")
-        
-        if collection is None:
-            print("❌ MongoDB collection이 None입니다")
+        logger.debug("기업 재무지표 요청: %s", decoded_name)
+
+        # 기업 스냅샷에서 만든 공용 지표 행렬에서 잘라서 응답
+        matrix = company_store.derived("metric_matrix", MetricMatrix)
+        if matrix is None:
+            logger.error("MongoDB collection이 None입니다")
             return JSONResponse(content={"error": "데이터베이스 연결 실패"}, status_code=503)
-        
-        # MongoDB에서 기업 데이터 조회
-        doc = collection.find_one({"기업명": decoded_name}, {"_id": 0, "지표": 1})
-        
-        if not doc:
-            # 다른 방법으로 검색 시도
-            doc = collection.find_one({"기업명": {"$regex": decoded_name, "$options": "i"}}, {"_id": 0, "지표": 1})
-        
-        if not doc or "지표" not in doc:
-            print(f"❌ {decoded_name} 재무지표 데이터 없음")
+
+        company_name = decoded_name if decoded_name in matrix else company_name_index().best_match(decoded_name)
+        if company_name not in matrix:
+            logger.warning("%s 재무지표 데이터 없음", decoded_name)
             return JSONResponse(content={"error": "재무지표 데이터를 찾을 수 없습니다"}, status_code=404)
-        
-        지표 = doc["지표"]
-        years = ["2022", "2023", "2024"]
-        
-        # 재무지표 데이터 구조화
-        result = {}
-        
-        # PER, PBR, ROE, ROA, DPS, EPS, BPS 데이터 추출 (0 값 제외)
-        for metric in ["PER", "PBR", "ROE", "ROA", "DPS", "EPS", "BPS"]:
-            result[metric] = {}
-            for year in years:
-                key = f"{year}/12_{metric}"
-                value = 지표.get(key)
-                if value is not None and value != 0:  # 0 값 제외
-                    result[metric][year] = float(value)
-        
-        # 시가총액 데이터 추출
-        result["시가총액"] = {}
-        for year in years:
-            key = f"{year}/12_시가총액"
-            value = 지표.get(key)
-            if value is not None and value != 0:
-                result["시가총액"][year] = float(value)
-        
-        # 모든 재무지표 데이터 추출 (0 값 제외)
-        financial_metrics = [
-            "매출액", "당기순이익", "영업이익", "부채비율", "배당수익률", 
-            "매출원가", "판매비와관리비", "자산총계", "부채총계", "자본총계"
-        ]
-        
-        for metric in financial_metrics:
-            result[metric] = {}
-            for year in years:
-                key = f"{year}/12_{metric}"
-                value = 지표.get(key)
-                if value is not None and value != 0:  # 0 값 제외
-                    result[metric][year] = float(value)
-        
-        # 지배주주지분, 지배주주순이익, 총계 데이터 추출 (0 값 제외)
-        result["지배주주지분"] = {}
-        result["지배주주순이익"] = {}
-        result["총계"] = {}
-        for year in years:
-            equity_key = f"{year}/12_지배주주지분"
-            income_key = f"{year}/12_지배주주순이익"
-            total_key = f"{year}/12_총계"
-            
-            equity_value = 지표.get(equity_key)
-            income_value = 지표.get(income_key)
-            total_value = 지표.get(total_key)
-            
-            if equity_value is not None and equity_value != 0:  # 0 값 제외
-                result["지배주주지분"][year] = float(equity_value)
-            if income_value is not None and income_value != 0:  # 0 값 제외
-                result["지배주주순이익"][year] = float(income_value)
-            if total_value is not None and total_value != 0:  # 0 값 제외
-                result["총계"][year] = float(total_value)
-        
-        print(f"✅ {decoded_name} 재무지표 로드 성공")
+
+        # 0 값과 없는 연도는 제외
+        result = matrix.company(company_name)
+
+        logger.debug("%s 재무지표 로드 성공", decoded_name)
         return JSONResponse(content=result)
             
     except Exception as e:
-        print(f"❌ 기업 재무지표 오류: {e}")
-        import traceback
-        print(f"❌ 상세 오류: {traceback.format_exc()}")
+        logger.exception("기업 재무지표 오류: %s", e)
         return JSONResponse(content={"error": f"재무지표 조회 실패: {str(e)}"}, status_code=500)
 
 
 
 
+def compute_kospi_investor_value():
+    # 최근 10일(달력일) 투자자 구분별 매도/매수/순매수 합계 (저장된 일별 데이터에서 합산)
+    since = int((datetime.today() - timedelta(days=10)).strftime("%Y%m%d"))
+    return investor_flow_store.market_by_investor(since)
+
+
 # 메인페이지 투자자별 매수, 매도량 코스피 총 기준
 @app.get("/investor/value/")
 def get_kospi_investor_value():
     try:
-        # 최근 10일 날짜 계산
-        end_date = datetime.today()
-        start_date = end_date - timedelta(days=10)
-
-        start = start_date.strftime("%Y%m%d")
-        end = end_date.strftime("%Y%m%d")
+        snapshot = market_snapshots.get("investor_value")
+        if snapshot:
+            return snapshot
 
-        # pykrx 데이터
-        df = get_market_trading_value_by_investor(start, end, "KOSPI")
-
-        # 날짜 인덱스가 맞는지 확인하고 변환
-        try:
-            df.index = pd.to_datetime(df.index, format="%Y%m%d")
-            df.index = df.index.strftime('%Y-%m-%d')
-            df = df.reset_index(names="날짜")
-        except:
-            df = df.reset_index()  # fallback
-
-        return df.to_dict(orient="records")
+        return compute_kospi_investor_value()
 
     except Exception as e:
         return {"error": str(e)}
 
 
 
+# 기업 스냅샷과 순위 엔진 동기화 (지표가 바뀐 기업만 반영)
+def synced_rankings():
+    docs = company_store.docs()
+    if docs is None:
+        return None
+    version = company_store.version
+    if rankings_engine.synced_version != version:
+        rankings_engine.sync(docs, version)
+    return rankings_engine
+
+
 # 메인페이지 매출액, DPS, 영업이익률 상위 5개 리스트
 @app.get("/rankings/")
 def get_top_rankings():
     try:
-        # MongoDB에서 필요한 데이터만 조회
-        cursor = collection.find({
-            "지표.2024/12_매출액": {"$exists": True},
-            "지표.2024/12_DPS": {"$exists": True},
-            "지표.2024/12_영업이익률": {"$exists": True}
-
-        }, {
-            "기업명": 1,
-            "지표.2024/12_매출액": 1,
-            "지표.2024/12_DPS": 1,
-            "지표.2024/12_영업이익률": 1
+        engine = synced_rankings()
+        if engine is None:
+            return {"error": "데이터베이스 연결 실패"}
 
-        })
+        # 기존과 같이 세 지표 키가 모두 있는 기업만 순위 대상
+        metrics = ["매출액", "DPS", "영업이익률"]
+        required = [(metric, "2024") for metric in metrics]
+        result = {}
+        for metric in metrics:
+            top = engine.top_among(metric, "2024", 5, required)
+            result[f"{metric}_TOP5"] = [{"기업명": name, metric: value} for name, value in top]
 
-        df = pd.json_normalize(list(cursor)).rename(columns={
-            "기업명": "기업명",
-            "지표.2024/12_매출액": "매출액",
-            "지표.2024/12_DPS": "DPS",
-            "지표.2024/12_영업이익률": "영업이익률"
+        return result
 
-        })
+    except Exception as e:
+        return {"error": str(e)}
 
-        # 숫자 변환
-        for col in ["매출액", "DPS", "영업이익률"]:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
 
-        # 각각 상위 5개 추출
-        result = {
-            "매출액_TOP5": df.nlargest(5, "매출액")[["기업명", "매출액"]].to_dict(orient="records"),
-            "DPS_TOP5": df.nlargest(5, "DPS")[["기업명", "DPS"]].to_dict(orient="records"),
-            "영업이익률_TOP5": df.nlargest(5, "영업이익률")[["기업명", "영업이익률"]].to_dict(orient="records"),
+# 임의 지표/연도 상위 k개 (미리 계산된 순위에서 조회)
+@app.get("/rankings")
+def get_rankings(
+    metric: str = Query(..., description="지표명 (예: 매출액, ROE, DPS)"),
+    year: str = Query("2024", description="연도"),
+    k: int = Query(10, ge=1, description="반환 개수"),
+):
+    try:
+        engine = synced_rankings()
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+    if engine is None:
+        return JSONResponse(content={"error": "데이터베이스 연결 실패"}, status_code=503)
 
-        }
+    if k > engine.k_max:
+        raise HTTPException(status_code=400, detail=f"k는 최대 {engine.k_max}까지 가능합니다")
 
-        return result
+    top = engine.top(metric, year, k)
+    if top is None:
+        raise HTTPException(status_code=404, detail=f"{year}년 {metric} 순위 데이터가 없습니다")
+
+    return {
+        "metric": metric,
+        "year": year,
+        "k": k,
+        "items": [{"rank": i + 1, "기업명": name, metric: value} for i, (name, value) in enumerate(top)],
+    }
+
+
+# 순위를 조회할 수 있는 지표/연도 목록
+@app.get("/rankings/metrics")
+def get_ranking_metrics():
+    engine = synced_rankings()
+    if engine is None:
+        return JSONResponse(content={"error": "데이터베이스 연결 실패"}, status_code=503)
+    return engine.available()
+
+
+def compute_marketcap_top10(date: str = None):
+    # KOSPI 전체 종목 스냅샷에서 시가총액 상위 10개만 부분 선택
+    snapshot = market_snapshot_store.get(date)
+    if snapshot is None:
+        return None
+
+    rows = []
+    for i in snapshot.top_indices("marketcap", 10):
+        row = snapshot.row(i)
+        rows.append({
+            "기업명": ticker_index.name(row["종목코드"]),
+            "티커": row["종목코드"],
+            "시가총액": row["시가총액"],
+            "종가": row["종가"],
+        })
+
+    return {"시가총액_TOP10": rows}
+
+
+def marketcap_top_names():
+    """뉴스 인덱스가 추가로 추적할 시가총액 상위 기업명"""
+    snapshot = market_snapshots.get("marketcap") or {}
+    return [row["기업명"] for row in snapshot.get("시가총액_TOP10", []) if row.get("기업명")]
 
-    except Exception as e:
-        return {"error": str(e)}
 
 #시가총액 top 10
 @app.get("/marketcap/")
 def get_marketcap_top10():
     try:
-        today = datetime.today().strftime("%Y%m%d")
-
-        # KOSPI 시가총액 전체 종목 불러오기
-        df = stock.get_market_cap_by_ticker(today, market="KOSPI")
+        result = market_snapshots.get("marketcap") or compute_marketcap_top10()
+        return result or {"시가총액_TOP10": []}
 
-        # 필요한 컬럼만 선택
-        df = df.reset_index()[["티커", "시가총액", "종가"]]
-        df["기업명"] = df["티커"].apply(lambda x: stock.get_market_ticker_name(x))
+    except Exception as e:
+        return {"error": str(e)}
 
-        # 상위 10개 기업 정렬
-        df = df.sort_values(by="시가총액", ascending=False).head(10)
 
-        # 컬럼 순서 정리
-        df = df[["기업명", "티커", "시가총액", "종가"]]
+def compute_top_volume(date: str = None):
+    # KOSPI 전체 종목 스냅샷에서 거래량 상위 5개만 부분 선택
+    snapshot = market_snapshot_store.get(date)
+    if snapshot is None:
+        return None
 
-        return {"시가총액_TOP10": df.to_dict(orient="records")}
+    result = []
+    for i in snapshot.top_indices("volume", 5):
+        row = snapshot.row(i)
+        result.append({
+            "종목명": ticker_index.name(row["종목코드"]),
+            "종목코드": row["종목코드"],
+            "거래량": row["거래량"],
+        })
+    return result
 
-    except Exception as e:
-        return {"error": str(e)}
 
 # 거래량 top5
 @app.get("/top_volume")
 def get_top_volume():
     try:
-        today = datetime.today().strftime("%Y%m%d")
-
-        # KOSPI 종목 전체 OHLCV 데이터
-        df = stock.get_market_ohlcv(today, market="KOSPI")
-
-        # 거래량 상위 5개
-        top5 = df.sort_values(by="거래량", ascending=False).head(5)
-        top5["종목코드"] = top5.index
-        top5["종목명"] = top5["종목코드"].apply(lambda code: stock.get_market_ticker_name(code))
-        top5.reset_index(drop=True, inplace=True)
+        result = market_snapshots.get("top_volume") or compute_top_volume() or []
 
         # JSON 형태로 반환
-        result = top5[["종목명", "종목코드", "거래량"]].to_dict(orient="records")
         return JSONResponse(content=result)
 
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
+
+# 시장 전체 스냅샷 기반 범용 순위 (metric: close/volume/value/marketcap 또는 종가/거래량/거래대금/시가총액)
+@app.get("/market/top")
+def get_market_top(
+    metric: str = Query("marketcap", description="정렬 기준 지표"),
+    n: int = Query(10, ge=1, le=200, description="반환 개수"),
+    order: str = Query("desc", description="desc(상위) 또는 asc(하위)"),
+    date: str = Query(None, description="조회 일자 (YYYYMMDD, 기본: 최근 거래일)"),
+):
+    key = METRIC_ALIASES.get(metric)
+    if key is None:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 metric: {metric} (가능: {', '.join(METRIC_ALIASES)})")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order는 asc 또는 desc만 가능합니다")
+    if date is not None:
+        try:
+            if len(date) != 8 or not date.isdigit():
+                raise ValueError(date)
+            datetime.strptime(date, "%Y%m%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="date는 YYYYMMDD 형식이어야 합니다")
+        # 아직 확정되지 않은 날짜는 최근 거래일 스냅샷으로
+        if int(date) > last_closed_date():
+            date = None
+
+    try:
+        snapshot = market_snapshot_store.get(date)
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="해당 일자의 시장 데이터가 없습니다")
+
+    items = []
+    for i in snapshot.top_indices(key, n, order):
+        row = snapshot.row(i)
+        row["종목명"] = ticker_index.name(row["종목코드"])
+        items.append(row)
+
+    return {"date": snapshot.date, "metric": key, "order": order, "items": items}
+
 # 주린이들을 위한 보물찾기
 
 @app.get("/api/treasure")
 def get_treasure_data():
     # MongoDB 연결 확인
     if collection is None:
-        print("❌ MongoDB collection이 None입니다")
+        logger.error("MongoDB collection이 None입니다")
         return JSONResponse(content={"error": "MongoDB 연결이 필요합니다. 데이터베이스 연결을 확인해주세요."}, status_code=500)
-        
-        # 로컬 JSON 파일에서 데이터 로드
-        try:
-            import os
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            json_file_path = os.path.join(current_dir, "NICE_내수수출_코스피.csv")
-            
-            if not os.path.exists(json_file_path):
-                print(f"❌ 로컬 데이터 파일 없음: {json_file_path}")
-                return JSONResponse(content={"error": "데이터 파일을 찾을 수 없습니다"}, status_code=404)
-            
-            # CSV 파일을 읽어서 JSON으로 변환
-            import pandas as pd
-            df = pd.read_csv(json_file_path, encoding='utf-8')
-            
-            # 필요한 컬럼만 선택하고 변환
-            result = []
-            for _, row in df.iterrows():
-                기업명 = row.get("기업명", "알 수 없음")
-                업종명 = row.get("업종명", "알 수 없음")
-                
-                # 지표 데이터가 있는 경우에만 처리
-                if pd.notna(기업명) and 기업명 != "알 수 없음":
-                    result.append({
-                        "기업명": 기업명,
-                        "업종명": 업종명,
-                        "PER": {"2022": 10.0, "2023": 12.0, "2024": 15.0},
-                        "PBR": {"2022": 1.0, "2023": 1.2, "2024": 1.5},
-                        "ROE": {"2022": 8.0, "2023": 10.0, "2024": 12.0},
-                        "시가총액": {"2022": 1000000000000, "2023": 1200000000000, "2024": 1500000000000},
-                        "지배주주지분": {"2022": 100000000000, "2023": 120000000000, "2024": 150000000000},
-                        "지배주주순이익": {"2022": 50000000000, "2023": 60000000000, "2024": 80000000000}
-                    })
-            
-            print(f"✅ 로컬 JSON 파일에서 {len(result)}개 기업 데이터 로드 성공")
-            return JSONResponse(content=result)
-            
-        except Exception as e:
-            print(f"❌ 로컬 파일 로드 실패: {e}")
-            return JSONResponse(content={"error": f"로컬 파일 로드 실패: {str(e)}"}, status_code=500)
-    
+
     try:
-        docs = list(collection.find({}, {
-            "_id": 0,
-            "기업명": 1,
-            "업종명": 1,
-            "지표": 1
-        }))
+        # 스냅샷 version이 바뀔 때만 다시 만드는 전체 행
+        result = company_store.derived("treasure_rows", build_treasure_rows)
     except Exception as e:
-        print(f"❌ 데이터 조회 실패: {e}")
+        logger.error("데이터 조회 실패: %s", e)
         return JSONResponse(content={"error": f"데이터 조회 실패: {str(e)}"}, status_code=500)
 
-    years = ["2022", "2023", "2024"]
-    result = []
+    return JSONResponse(content=result)
 
-    for doc in docs:
-        기업명 = doc.get("기업명", "알 수 없음")
-        업종명 = doc.get("업종명", "알 수 없음")
-        지표 = doc.get("지표", {})
 
-        try:
-            per = {}
-            pbr = {}
-            roe = {}
-            mktcap = {}
-            equity = {}         # ✅ 지배주주지분 (신규)
-            owner_income = {}   # ✅ 지배주주순이익 (신규)
-
-            for year in years:
-                per[year] = 지표.get(f"{year}/12_PER")
-                pbr[year] = 지표.get(f"{year}/12_PBR")
-                roe[year] = 지표.get(f"{year}/12_ROE")
-                mktcap[year] = 지표.get(f"{year}/12_시가총액")
-                
-                # 지배주주지분 필드명 확인
-                equity_key = f"{year}/12_지배주주지분"
-                income_key = f"{year}/12_지배주주순이익"
-                
-                equity_value = 지표.get(equity_key)
-                income_value = 지표.get(income_key)
-                
-                # 디버깅을 위한 로그 (처음 5개 기업만)
-                if len(result) < 5:
-                    print(f"🔍 {기업명} {year}년 지배주주지분 키: {equity_key}, 값: {equity_value}")
-                    print(f"🔍 {기업명} {year}년 지배주주순이익 키: {income_key}, 값: {income_value}")
-                
-                # 실제 필드명이 다른 경우를 대비한 대안 검색
-                if equity_value is None:
-                    # 다른 가능한 필드명들 시도
-                    alt_keys = [f"{year}/12_지배주주", f"{year}/12_지배주주지분율", f"{year}/12_주주지분"]
-                    for alt_key in alt_keys:
-                        alt_value = 지표.get(alt_key)
-                        if alt_value is not None:
-                            print(f"🔍 {기업명} {year}년 대안 키 발견: {alt_key} = {alt_value}")
-                            equity_value = alt_value
-                            break
-                
-                if income_value is None:
-                    # 다른 가능한 필드명들 시도
-                    alt_keys = [f"{year}/12_지배주주순이익률", f"{year}/12_순이익", f"{year}/12_당기순이익"]
-                    for alt_key in alt_keys:
-                        alt_value = 지표.get(alt_key)
-                        if alt_value is not None:
-                            print(f"🔍 {기업명} {year}년 대안 키 발견: {alt_key} = {alt_value}")
-                            income_value = alt_value
-                            break
-                
-                equity[year] = equity_value
-                owner_income[year] = income_value
-
-            result.append({
-                "기업명": 기업명,
-                "업종명": 업종명,
-                "PER": per,
-                "PBR": pbr,
-                "ROE": roe,
-                "시가총액": mktcap,
-                "지배주주지분": equity,             # ✅ 추가됨
-                "지배주주순이익": owner_income       # ✅ 추가됨
-            })
-        except Exception as e:
-            print(f"❌ {기업명} 처리 중 오류:", e)
-    
-    return JSONResponse(content=result)
+# 보물찾기 서버 측 스크리너 (조건에 맞는 행만 페이지 단위로 반환)
+@app.get("/api/treasure/screen")
+def screen_treasure(
+    per_min: float = None, per_max: float = None,
+    pbr_min: float = None, pbr_max: float = None,
+    roe_min: float = None, roe_max: float = None,
+    mktcap_min: float = None, mktcap_max: float = None,
+    sector: List[str] = Query(None, description="업종명 (여러 개면 sector를 반복, 업종명에 쉼표가 있을 수 있음)"),
+    basis: str = Query("avg", description="avg(3개년 평균) 또는 연도 (2022/2023/2024)"),
+    require_valid: bool = Query(True, description="PER/PBR/ROE 기준값이 없거나 0인 기업 제외"),
+    allow_zero: bool = Query(False, description="require_valid에서 기준값이 0인 기업은 남김 (값이 하나라도 있으면 통과)"),
+    sort: str = Query(None, description="정렬 지표 (PER/PBR/ROE/시가총액/지배주주지분/지배주주순이익/기업명)"),
+    order: str = Query("asc", description="asc 또는 desc"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    if collection is None:
+        return JSONResponse(content={"error": "MongoDB 연결이 필요합니다. 데이터베이스 연결을 확인해주세요."}, status_code=500)
+    if basis != "avg" and basis not in SCREEN_YEARS:
+        raise HTTPException(status_code=400, detail=f"basis는 avg 또는 {', '.join(SCREEN_YEARS)} 중 하나입니다")
+    if sort is not None and sort != "기업명" and sort not in SCREEN_METRICS:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 정렬 기준: {sort}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order는 asc 또는 desc만 가능합니다")
+
+    try:
+        snapshot = company_store.derived(
+            "screener", lambda docs: ScreenerSnapshot(company_store.derived("treasure_rows", build_treasure_rows))
+        )
+    except Exception as e:
+        return JSONResponse(content={"error": f"데이터 조회 실패: {str(e)}"}, status_code=500)
+
+    ranges = {}
+    for metric, low, high in [("PER", per_min, per_max), ("PBR", pbr_min, pbr_max),
+                              ("ROE", roe_min, roe_max), ("시가총액", mktcap_min, mktcap_max)]:
+        if low is not None or high is not None:
+            ranges[metric] = (low, high)
+    sectors = [s.strip() for s in sector if s.strip()] if sector else None
+
+    total, items = snapshot.screen(
+        ranges, sectors=sectors, basis=basis, require_valid=require_valid, allow_zero=allow_zero,
+        sort=sort, order=order, offset=offset, limit=limit,
+    )
+    return JSONResponse(content={
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "industries": snapshot.industries,
+        "items": items,
+    })
+
+
+def known_ticker(value: str):
+    """6자리 종목코드 (형식이 아니거나 구축된 종목 인덱스에 없으면 400)"""
+    code = ticker_index.known_code(value)
+    if code is None:
+        raise HTTPException(status_code=400, detail=f"알 수 없는 종목: {value}")
+    return code
+
+
+# 종목별 최근 10거래일 투자자별 순매수 (로컬 저장소, 빠진 거래일만 증분 갱신)
+def load_investor_trading(ticker: str):
+    series = investor_flow_store.ticker(ticker)
+    rows = series.values[-10:]
+    columns = ["기관합계", "개인", "외국인합계"]
+    index = [series.columns.index(c) for c in columns if c in series.columns]
+    if len(index) != len(columns):
+        return []
+    return [
+        {"date": format_date(date), **dict(zip(columns, values))}
+        for date, values in zip(series.dates[-10:].tolist(), rows[:, index].tolist())
+    ]
 
 
 # 투자자별 매매 데이터
 @app.get("/investors/")
 def get_investor_data(ticker: str = Query(..., description="종목코드")):
+    ticker = known_ticker(ticker)
     try:
-        # 최근 10일 날짜 계산
-        end_date = datetime.today()
-        start_date = end_date - timedelta(days=10)
-
-        start = start_date.strftime("%Y%m%d")
-        end = end_date.strftime("%Y%m%d")
-
-        # pykrx로 투자자별 매매 데이터 가져오기
-        df = get_market_trading_value_by_investor(start, end, "KOSPI", ticker)
+        result = load_investor_trading(ticker)
 
         # 데이터가 없는 경우 처리
-        if df.empty:
-            print(f"⚠️ {ticker} 투자자 데이터 없음")
+        if not result:
+            logger.warning("%s 투자자 데이터 없음", ticker)
             return []
 
-        # 날짜 인덱스 변환
-        try:
-            df.index = pd.to_datetime(df.index, format="%Y%m%d")
-            df.index = df.index.strftime('%Y-%m-%d')
-            df = df.reset_index(names="date")
-        except:
-            df = df.reset_index()
-
-        # 컬럼명 정리
-        df.columns = ['date', '기관합계', '개인', '외국인합계']
-        
-        # 최근 10개 데이터만 반환
-        result = df.tail(10).to_dict(orient="records")
-        
-        print(f"✅ {ticker} 투자자 데이터 로드 성공: {len(result)}개")
+        logger.debug("%s 투자자 데이터 로드 성공: %s개", ticker, len(result))
         return result
 
     except Exception as e:
-        print(f"❌ {ticker} 투자자 데이터 오류: {e}")
+        logger.error("%s 투자자 데이터 오류: %s", ticker, e)
         return []
 
 
-# 매출 데이터 API
-@app.get("/sales/{name}")
-def get_sales_data(name: str):
+# 종목별 5/20/60거래일 누적 순매수
+@app.get("/investors/flow")
+def get_investor_flow(ticker: str = Query(..., description="종목코드 또는 종목명")):
+    code = known_ticker(ticker)
     try:
-        import urllib.parse
-        decoded_name = urllib.parse.unquote(name)
-        print(f"🔍 매출 데이터 요청: {decoded_name}")
-        
-        # 매출 데이터 JSON 파일에서 데이터 로드
-        import json
-        import os
-        
-        # 현재 스크립트의 디렉토리 기준으로 파일 경로 설정
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        sales_file_path = os.path.join(current_dir, "매출비중_chartjs_데이터.json")
-        
-        if not os.path.exists(sales_file_path):
-            print(f"❌ 매출 데이터 파일 없음: {sales_file_path}")
-            return []
-        
-        with open(sales_file_path, 'r', encoding='utf-8') as f:
-            sales_data = json.load(f)
-        
-        # 기업명으로 매출 데이터 찾기
-        company_sales = None
-        for item in sales_data:
-            if item.get('종목명') == decoded_name:
-                company_sales = item
-                break
-        
-        if not company_sales:
-            print(f"❌ {decoded_name} 매출 데이터 없음")
-            return []
-        
-        # 매출 데이터를 테이블 형태로 변환
-        result = []
-        if 'data' in company_sales and isinstance(company_sales['data'], list):
-            for data_item in company_sales['data']:
-                result.append({
-                    '사업부문': '매출',
-                    '매출품목명': data_item.get('label', ''),
-                    '구분': '매출액',
-                    '2022_12 매출액': data_item.get('value', 0),
-                    '2023_12 매출액': data_item.get('value', 0),
-                    '2024_12 매출액': data_item.get('value', 0)
-                })
-        
-        print(f"✅ {decoded_name} 매출 데이터 로드 성공: {len(result)}개")
-        return result
-        
+        series = investor_flow_store.ticker(code)
+        if not len(series):
+            return {"error": f"{ticker} 투자자 데이터 없음"}
+        return {
+            "ticker": code,
+            "name": ticker_index.name(code),
+            "as_of": format_date(series.last_date),
+            "periods": {str(n): sums for n, sums in series.trailing_sums(INVESTOR_PERIODS).items()},
+        }
     except Exception as e:
-        print(f"❌ {name} 매출 데이터 오류: {e}")
-        return []
+        logger.error("%s 누적 순매수 오류: %s", ticker, e)
+        return {"error": str(e)}
+
+
+# 시장 전체 외국인/기관 누적 순매수 상위(하위) 종목
+@app.get("/investor/rankings")
+def get_investor_rankings(
+    investor: str = Query("외국인", description="외국인 또는 기관합계"),
+    days: int = Query(5, description="누적 거래일 수 (5, 20, 60)"),
+    n: int = Query(20, ge=1, le=100, description="반환 개수"),
+    order: str = Query("desc", description="desc: 순매수 상위, asc: 순매도 상위"),
+):
+    if investor == "기관":
+        investor = "기관합계"
+    if investor not in RANK_INVESTORS:
+        raise HTTPException(status_code=400, detail=f"investor는 {', '.join(RANK_INVESTORS)} 중 하나")
+    if days not in INVESTOR_PERIODS:
+        raise HTTPException(status_code=400, detail=f"days는 {', '.join(map(str, INVESTOR_PERIODS))} 중 하나")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order는 asc 또는 desc")
+    try:
+        return {"investor": investor, "days": days, **investor_flow_store.rankings(investor, days, n, order)}
+    except Exception as e:
+        logger.error("투자자 순매수 순위 오류: %s", e)
+        return JSONResponse(content={"error": f"순매수 순위 조회 실패: {str(e)}"}, status_code=500)
+
+
+# 스케줄러 사전 갱신 작업 등록 (휴장일에도 가장 최근 거래일 기준으로 계산)
+def refresh_market_snapshot():
+    snapshot = market_snapshot_store.refresh()
+    return {"date": snapshot.date, "count": len(snapshot)} if snapshot is not None else None
+
+
+market_scheduler.register("ticker_index", ticker_index.refresh_if_stale)
+market_scheduler.register("market_snapshot", refresh_market_snapshot)
+market_scheduler.register("market_snapshot_backfill", market_snapshot_store.backfill)
+market_scheduler.register("kospi", load_kospi_from_pykrx)
+market_scheduler.register("marketcap", compute_marketcap_top10)
+market_scheduler.register("top_volume", compute_top_volume)
+market_scheduler.register("investor_flow", investor_flow_store.sync_market)
+market_scheduler.register("investor_value", compute_kospi_investor_value)
 
 
 # uvicorn main:app --reload
@@ -0,0 +1,139 @@
+"""KRX 장 운영 시간에 맞춘 시장 데이터 사전 갱신 스케줄러
+
+장중(09:00~15:30 KST)에는 일정 간격으로, 장 마감 후에는 한 번 더 등록된 작업을 실행해
+결과를 메모리 스냅샷에 저장한다. 요청 경로는 스냅샷만 읽으면 된다.
+"""
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, time, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+
+KST = timezone(timedelta(hours=9))
+MARKET_OPEN = time(9, 0)
+MARKET_CLOSE = time(15, 30)
+
+# 장중 갱신 간격, 장 마감 후 갱신까지의 지연 (초)
+INTRADAY_INTERVAL = int(os.getenv("MARKET_PREFETCH_INTERVAL", "300"))
+AFTER_CLOSE_DELAY = int(os.getenv("MARKET_PREFETCH_AFTER_CLOSE_DELAY", "600"))
+PREFETCH_ENABLED = os.getenv("MARKET_PREFETCH_ENABLED", "true").lower() == "true"
+
+
+class SnapshotStore:
+    """작업 이름별 최신 결과와 갱신 시각"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, name):
+        with self._lock:
+            item = self._data.get(name)
+        return item[0] if item else None
+
+    def set(self, name, data):
+        with self._lock:
+            self._data[name] = (data, datetime.now(KST))
+
+    def status(self):
+        with self._lock:
+            return {name: updated.isoformat() for name, (_, updated) in self._data.items()}
+
+
+def now_kst():
+    return datetime.now(KST)
+
+
+def is_trading_day(dt):
+    # 공휴일 정보는 없으므로 주말만 제외 (휴장일엔 작업 결과가 비어 기존 스냅샷 유지)
+    return dt.weekday() < 5
+
+
+def last_closed_date():
+    """확정된 일봉이 있는 마지막 날짜 YYYYMMDD int (장 마감 전이면 전날까지)"""
+    now = now_kst()
+    if now.time() < MARKET_CLOSE:
+        now -= timedelta(days=1)
+    return int(now.strftime("%Y%m%d"))
+
+
+def session_bounds(dt):
+    open_dt = datetime.combine(dt.date(), MARKET_OPEN, tzinfo=KST)
+    close_dt = datetime.combine(dt.date(), MARKET_CLOSE, tzinfo=KST)
+    return open_dt, close_dt
+
+
+class MarketDataScheduler:
+    def __init__(self, store: SnapshotStore, interval=INTRADAY_INTERVAL, after_close_delay=AFTER_CLOSE_DELAY):
+        self.store = store
+        self.interval = timedelta(seconds=interval)
+        self.after_close_delay = timedelta(seconds=after_close_delay)
+        self._jobs = {}
+        self._task = None
+        self.last_run = None
+
+    def register(self, name: str, fn):
+        """fn은 인자 없는 동기 함수. None/빈 결과를 반환하면 기존 스냅샷을 유지"""
+        self._jobs[name] = fn
+
+    def next_run(self, now):
+        """다음 갱신 시각 계산"""
+        if is_trading_day(now):
+            open_dt, close_dt = session_bounds(now)
+            post_close = close_dt + self.after_close_delay
+            if now < open_dt:
+                return open_dt
+            if now < close_dt:
+                return min(now + self.interval, post_close)
+            if self.last_run is None or self.last_run < post_close:
+                return max(now, post_close)
+
+        # 다음 거래일 장 시작
+        day = now + timedelta(days=1)
+        while not is_trading_day(day):
+            day += timedelta(days=1)
+        return session_bounds(day)[0]
+
+    async def refresh_all(self):
+        for name, fn in self._jobs.items():
+            try:
+                # pykrx 호출은 동기이므로 스레드에서 실행
+                data = await asyncio.to_thread(fn)
+                if data:
+                    self.store.set(name, data)
+                    logger.info("사전 갱신 완료: %s", name)
+                else:
+                    logger.warning("사전 갱신 결과 없음, 기존 스냅샷 유지: %s", name)
+            except Exception as e:
+                logger.warning("사전 갱신 실패 (%s): %s", name, e)
+        self.last_run = now_kst()
+
+    async def _loop(self):
+        # 시작 시 한 번 채워 두기
+        await self.refresh_all()
+        while True:
+            now = now_kst()
+            delay = (self.next_run(now) - now).total_seconds()
+            await asyncio.sleep(max(delay, 1))
+            await self.refresh_all()
+
+    def start(self):
+        if self._task is None and PREFETCH_ENABLED:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# 앱 전체에서 공유하는 스냅샷 저장소와 스케줄러
+market_snapshots = SnapshotStore()
+market_scheduler = MarketDataScheduler(market_snapshots)
@@ -0,0 +1,221 @@
+"""거래일별 시장 전체 스냅샷 (종목별 종가/거래량/거래대금/시가총액 컬럼 배열)
+
+pykrx get_market_cap_by_ticker 한 번으로 시장 전체 종목의 값을 받아 NumPy 배열로 보관한다.
+순위 계산은 전체 정렬 대신 argpartition으로 상위 n개만 골라낸다.
+장 마감으로 확정된 날짜의 스냅샷은 디스크(npz)에도 저장해 재시작 후 업스트림 호출 없이 다시 쓴다.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+from pykrx import stock
+
+from market_scheduler import last_closed_date
+from singleflight import upstream_flight
+from storage import data_path
+from upstream_health import upstream_health
+
+logger = logging.getLogger(__name__)
+
+
+# 외부 파라미터 이름 -> pykrx 컬럼명
+METRICS = {
+    "close": "종가",
+    "volume": "거래량",
+    "value": "거래대금",
+    "marketcap": "시가총액",
+}
+# 한글 이름으로도 조회 가능
+METRIC_ALIASES = {**{v: k for k, v in METRICS.items()}, **{k: k for k in METRICS}}
+
+MAX_SNAPSHOTS = 8
+BUSINESS_DAY_TTL = 600
+# 스케줄러 한 번에 채우는 과거 스냅샷 수
+BACKFILL_PER_RUN = int(os.getenv("MARKET_SNAPSHOT_BACKFILL_PER_RUN", "60"))
+
+
+class DailyMarketSnapshot:
+    def __init__(self, date: str, market: str, tickers, columns):
+        self.date = date
+        self.market = market
+        self.tickers = tickers
+        self.columns = columns
+        self._position = {code: i for i, code in enumerate(tickers)}
+
+    @classmethod
+    def load(cls, date: str, market: str = "KOSPI"):
+        df = upstream_health.call("pykrx", stock.get_market_cap_by_ticker, date, market=market)
+        if df is None or df.empty:
+            return None
+        tickers = np.asarray(df.index.astype(str))
+        columns = {key: df[col].to_numpy(dtype=np.float64) for key, col in METRICS.items()}
+        return cls(date, market, tickers, columns)
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, tickers=self.tickers.astype(str), **self.columns)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_file(cls, path: str, date: str, market: str):
+        try:
+            with np.load(path) as data:
+                return cls(date, market, data["tickers"], {key: data[key] for key in METRICS})
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def row(self, i: int):
+        return {
+            "종목코드": str(self.tickers[i]),
+            **{METRICS[key]: int(values[i]) for key, values in self.columns.items()},
+        }
+
+    def lookup(self, code: str):
+        i = self._position.get(code)
+        return None if i is None else self.row(i)
+
+    def values_for(self, codes, metric: str = "close"):
+        """종목코드 목록의 metric 값 배열 (없는 종목은 NaN)"""
+        values = self.columns[metric]
+        return np.array([values[i] if (i := self._position.get(code)) is not None else np.nan for code in codes])
+
+    def top_indices(self, metric: str, n: int, order: str = "desc"):
+        """metric 기준 상위(또는 하위) n개 위치를 정렬해서 반환 (부분 선택 O(N + n log n))"""
+        values = self.columns[metric]
+        if order == "desc":
+            values = -values
+        n = max(0, min(n, len(values)))
+        if n == 0:
+            return np.array([], dtype=np.int64)
+        if n < len(values):
+            part = np.argpartition(values, n - 1)[:n]
+        else:
+            part = np.arange(len(values))
+        return part[np.argsort(values[part], kind="stable")]
+
+
+class MarketSnapshotStore:
+    """거래일별 스냅샷을 최근 몇 개만 메모리에 보관"""
+
+    def __init__(self, max_snapshots=MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self._lock = threading.Lock()
+        self._snapshots = OrderedDict()
+        self._business_day = (None, 0.0)
+        # 요청 안에서 받지 못해 스케줄러가 채울 (날짜, 시장)
+        self._backfill = set()
+
+    def latest_trading_date(self):
+        """가장 최근 거래일 (10분 동안 재사용)"""
+        date, fetched_at = self._business_day
+        if date is None or time.monotonic() - fetched_at > BUSINESS_DAY_TTL:
+            today = datetime.today().strftime("%Y%m%d")
+            date = upstream_health.call("pykrx", stock.get_nearest_business_day_in_a_week, today)
+            self._business_day = (date, time.monotonic())
+        return date
+
+    def get(self, date: str = None, market: str = "KOSPI", remember: bool = True):
+        """remember=False면 메모리 LRU에 넣지 않음 (긴 구간 조회가 최근 스냅샷을 밀어내지 않게)"""
+        date = date or self.latest_trading_date()
+        key = (date, market)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+                return snapshot
+        # 같은 날짜를 동시에 요청하면 디스크/업스트림 조회는 한 번만
+        snapshot = upstream_flight.do(("market_snapshot", date, market), self._load, date, market)
+        if snapshot is not None and remember:
+            self.put(snapshot)
+        return snapshot
+
+    def stored(self, date: str, market: str = "KOSPI"):
+        """메모리나 디스크에 있는 스냅샷만 (업스트림 호출 없음, LRU 순서도 바꾸지 않음)"""
+        snapshot = self.peek(date, market)
+        if snapshot is not None or int(date) > last_closed_date():
+            return snapshot
+        path = self._path(date, market)
+        return DailyMarketSnapshot.load_file(path, date, market) if os.path.exists(path) else None
+
+    def _path(self, date: str, market: str):
+        return data_path("market_snapshots", f"{market}_{date}.npz")
+
+    def _load(self, date: str, market: str):
+        closed = int(date) <= last_closed_date()
+        path = self._path(date, market)
+        if closed and os.path.exists(path):
+            snapshot = DailyMarketSnapshot.load_file(path, date, market)
+            if snapshot is not None:
+                return snapshot
+        snapshot = DailyMarketSnapshot.load(date, market)
+        # 확정된 날짜만 디스크에 보관 (장중 값은 계속 바뀜)
+        if snapshot is not None and closed:
+            try:
+                snapshot.save(path)
+            except OSError as e:
+                logger.warning("시장 스냅샷 저장 실패 (%s %s): %s", market, date, e)
+        return snapshot
+
+    def peek(self, date: str, market: str = "KOSPI"):
+        """이미 받아 둔 스냅샷만 (없으면 업스트림 호출 없이 None)"""
+        with self._lock:
+            return self._snapshots.get((date, market))
+
+    def put(self, snapshot: DailyMarketSnapshot):
+        with self._lock:
+            self._snapshots[(snapshot.date, snapshot.market)] = snapshot
+            self._snapshots.move_to_end((snapshot.date, snapshot.market))
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+
+    def request_backfill(self, keys):
+        """[(날짜, 시장)]을 다음 스케줄러 실행 때 디스크에 채우도록 예약"""
+        closed = last_closed_date()
+        with self._lock:
+            self._backfill.update(key for key in keys if int(key[0]) <= closed)
+
+    def backfill(self, limit: int = BACKFILL_PER_RUN):
+        """예약된 과거 스냅샷을 최근 날짜부터 limit개까지 받아 디스크에만 저장 (스케줄러용)"""
+        with self._lock:
+            keys = sorted(self._backfill, reverse=True)[:limit]
+        done = 0
+        for date, market in keys:
+            if upstream_health.is_open("pykrx"):
+                break
+            try:
+                if self.stored(date, market) is None:
+                    upstream_flight.do(("market_snapshot", date, market), self._load, date, market)
+            except Exception as e:
+                logger.warning("시장 스냅샷 백필 실패 (%s %s): %s", market, date, e)
+                break
+            with self._lock:
+                self._backfill.discard((date, market))
+            done += 1
+        with self._lock:
+            pending = len(self._backfill)
+        return {"backfilled": done, "pending": pending}
+
+    def refresh(self, market: str = "KOSPI"):
+        """오늘(최근 거래일) 스냅샷을 강제로 다시 받아 교체 (장중 스케줄러용)"""
+        date = self.latest_trading_date()
+        snapshot = DailyMarketSnapshot.load(date, market)
+        if snapshot is not None:
+            self.put(snapshot)
+            # 장 마감 후 갱신분은 확정값이므로 디스크에도 저장
+            if int(date) <= last_closed_date():
+                try:
+                    snapshot.save(self._path(date, market))
+                except OSError as e:
+                    logger.warning("시장 스냅샷 저장 실패 (%s %s): %s", market, date, e)
+        return snapshot
+
+
+# 앱 전체에서 공유하는 시장 스냅샷 저장소
+market_snapshot_store = MarketSnapshotStore()
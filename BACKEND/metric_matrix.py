@@ -0,0 +1,97 @@
+"""기업 × 지표 × 연도 재무지표 행렬
+
+기업 스냅샷의 '지표'("YYYY/12_지표명") 전체를 (기업 수, 지표 수, 연도 수) float 배열 하나로 만들어 두고,
+기업 비교 차트용 열 단위 응답과 /company_metrics/{name} 응답을 모두 여기서 잘라 만든다.
+기존 응답과 같게 0과 값이 없는 칸은 NaN(응답에서는 null/생략)으로 둔다.
+"""
+import numpy as np
+
+from rankings import parse_metric_key
+
+
+# /company_metrics 기본 지표 (기존 단일 기업 응답과 같은 순서)
+DEFAULT_METRICS = [
+    "PER", "PBR", "ROE", "ROA", "DPS", "EPS", "BPS", "시가총액",
+    "매출액", "당기순이익", "영업이익", "부채비율", "배당수익률",
+    "매출원가", "판매비와관리비", "자산총계", "부채총계", "자본총계",
+    "지배주주지분", "지배주주순이익", "총계",
+]
+DEFAULT_YEARS = ["2022", "2023", "2024"]
+
+
+def _to_float(value):
+    if isinstance(value, bool):
+        return np.nan
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return np.nan if value == 0 else value
+
+
+class MetricMatrix:
+    def __init__(self, docs):
+        cells = []
+        metrics, years = set(), set()
+        for doc in docs:
+            for key, value in (doc.get("지표") or {}).items():
+                parsed = parse_metric_key(key)
+                if parsed is not None:
+                    metrics.add(parsed[0])
+                    years.add(parsed[1])
+                    cells.append((doc.get("기업명"), parsed, value))
+
+        self.names = list(dict.fromkeys(doc.get("기업명") for doc in docs if doc.get("기업명")))
+        self.metrics = sorted(metrics)
+        self.years = sorted(years)
+        self._name_pos = {name: i for i, name in enumerate(self.names)}
+        self._metric_pos = {metric: i for i, metric in enumerate(self.metrics)}
+        self._year_pos = {year: i for i, year in enumerate(self.years)}
+        self.values = np.full((len(self.names), len(self.metrics), len(self.years)), np.nan)
+        for name, (metric, year), value in cells:
+            i = self._name_pos.get(name)
+            if i is not None:
+                self.values[i, self._metric_pos[metric], self._year_pos[year]] = _to_float(value)
+
+    def __contains__(self, name):
+        return name in self._name_pos
+
+    def _slice(self, names, metrics, years):
+        rows = np.array([self._name_pos[n] for n in names], dtype=np.intp)
+        cols = np.array([self._metric_pos[m] for m in metrics], dtype=np.intp)
+        year_idx = np.array([self._year_pos[y] for y in years], dtype=np.intp)
+        return self.values[np.ix_(rows, cols, year_idx)]
+
+    def columns(self, names, metrics=None, years=None):
+        """열 단위 응답: years 축 + 지표별·기업별 값 배열 (없는 값은 null)"""
+        metrics = [m for m in (metrics or DEFAULT_METRICS) if m in self._metric_pos]
+        years = [y for y in (years or DEFAULT_YEARS) if y in self._year_pos]
+        names = [n for n in dict.fromkeys(names) if n in self._name_pos]
+        block = self._slice(names, metrics, years)
+        # NaN -> None 변환을 한 번에 (object 배열)
+        block = np.where(np.isnan(block), None, block)
+        return {
+            "years": years,
+            "companies": names,
+            "metrics": {
+                metric: {name: block[i, j].tolist() for i, name in enumerate(names)}
+                for j, metric in enumerate(metrics)
+            },
+        }
+
+    def company(self, name, metrics=None, years=None):
+        """{지표: {연도: 값}} (값이 있는 연도만, 기존 /company_metrics/{name} 모양)"""
+        metrics = metrics or DEFAULT_METRICS
+        years = [y for y in (years or DEFAULT_YEARS) if y in self._year_pos]
+        i = self._name_pos[name]
+        result = {}
+        for metric in metrics:
+            j = self._metric_pos.get(metric)
+            series = {}
+            if j is not None:
+                for year in years:
+                    value = self.values[i, j, self._year_pos[year]]
+                    if not np.isnan(value):
+                        series[year] = float(value)
+            result[metric] = series
+        return result
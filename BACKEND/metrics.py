@@ -0,0 +1,201 @@
+"""Prometheus 텍스트 형식 지표 (/metrics)
+
+요청 경로에서는 카운터 증가와 히스토그램 버킷 하나 증가만 하고(락 + bisect),
+캐시/서킷/single-flight 같은 기존 통계는 수집 시점에 collector가 읽어서 내보낸다.
+요청마다 업스트림(pykrx, yfinance, fnguide, daum, mongo)에서 쓴 시간을 contextvar에 모아
+경로별로 업스트림 시간과 나머지(계산 + 직렬화) 시간을 나눠 기록한다.
+"""
+import contextvars
+import logging
+import math
+import threading
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+
+# 초 단위 지연 버킷 (5ms ~ 30s)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_request_timings = contextvars.ContextVar("request_upstream_timings", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    render = Counter.render
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # [버킷별 개수..., +Inf 개수], 합계
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def render(self):
+        with self._lock:
+            items = [(k, list(counts), total) for k, (counts, total) in self._values.items()]
+        lines = self.header()
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """수집 시점에 [(이름, 종류, 도움말, [(라벨 dict, 값)])]을 돌려주는 함수 등록"""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for fn in self._collectors:
+            try:
+                families = fn()
+            except Exception as e:
+                logger.warning("지표 수집 실패 (%s): %s", getattr(fn, '__name__', fn), e)
+                continue
+            for name, kind, help_text, samples in families:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# 앱 전체에서 공유하는 지표 레지스트리와 기본 지표
+metrics = MetricsRegistry()
+
+http_requests = metrics.counter(
+    "http_requests_total", "HTTP 요청 수", ("method", "route", "status"))
+http_latency = metrics.histogram(
+    "http_request_duration_seconds", "경로별 응답 시간", ("method", "route"))
+http_time_breakdown = metrics.histogram(
+    "http_request_component_seconds", "경로별 응답 시간 중 업스트림별/나머지(app) 시간", ("route", "component"))
+http_in_flight = metrics.gauge(
+    "http_requests_in_flight", "처리 중인 요청 수")
+upstream_calls = metrics.counter(
+    "upstream_requests_total", "업스트림 호출 수", ("source", "outcome"))
+upstream_latency = metrics.histogram(
+    "upstream_request_duration_seconds", "업스트림 호출 시간", ("source",))
+
+
+# ---- 요청별 업스트림 시간 집계 ----
+def start_request():
+    return _request_timings.set({})
+
+
+def finish_request(token):
+    timings = _request_timings.get()
+    _request_timings.reset(token)
+    return timings or {}
+
+
+def observe_upstream(source: str, seconds: float, outcome: str = "success"):
+    """업스트림 호출 한 번 기록 (요청 안에서 호출됐으면 그 요청의 업스트림 시간에도 더함)"""
+    upstream_calls.inc(source, outcome)
+    upstream_latency.observe(seconds, source)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[source] = timings.get(source, 0.0) + seconds
+
+
+def observe_request(method: str, route: str, status: int, seconds: float, timings):
+    http_requests.inc(method, route, str(status))
+    http_latency.observe(seconds, method, route)
+    upstream_total = 0.0
+    for source, spent in timings.items():
+        http_time_breakdown.observe(spent, route, source)
+        upstream_total += spent
+    # 병렬 업스트림 호출이 겹치면 합이 전체보다 클 수 있어 0으로 자름
+    http_time_breakdown.observe(max(0.0, seconds - upstream_total), route, "app")
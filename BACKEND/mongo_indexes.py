@@ -0,0 +1,62 @@
+"""서버 시작 시 MongoDB 인덱스 보장
+
+main.py의 조회 형태마다 필요한 인덱스를 컬렉션 역할별로 정의해 두고 없으면 만든다.
+같은 키 패턴의 인덱스가 이름만 다르게 이미 있으면 그대로 사용한다.
+"""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# 컬렉션 역할 -> [(키, 옵션)]
+INDEX_SPECS = {
+    # /company/{name}, /company_metrics/{name}, /companies/batch($in)의 기업명 동등 조회
+    "companies": [
+        ([("기업명", 1)], {"name": "기업명_1"}),
+        ([("종목코드", 1)], {"name": "종목코드_1"}),
+    ],
+    # 기업 상세 $lookup (기업명)
+    "explain": [
+        ([("기업명", 1)], {"name": "기업명_1"}),
+    ],
+    # 기업 상세 $lookup (종목코드)
+    "outline": [
+        ([("종목코드", 1)], {"name": "종목코드_1"}),
+    ],
+    # KOSPI 캐시 find_one/replace_one({"type": ...})
+    "kospi_cache": [
+        ([("type", 1)], {"name": "type_1"}),
+    ],
+}
+
+
+def ensure_indexes(collections: dict, specs=INDEX_SPECS):
+    """collections: 역할 -> pymongo 컬렉션. 역할별 결과 목록을 반환"""
+    results = []
+    for role, index_list in specs.items():
+        coll = collections.get(role)
+        if coll is None:
+            continue
+        try:
+            existing = {tuple(info["key"]): name for name, info in coll.index_information().items()}
+        except Exception as e:
+            logger.warning("인덱스 정보 조회 실패 (%s): %s", role, e)
+            results.append({"collection": role, "status": "error", "error": str(e)})
+            continue
+        for keys, options in index_list:
+            entry = {"collection": role, "keys": [k for k, _ in keys]}
+            name = existing.get(tuple(keys))
+            if name is not None:
+                entry.update(status="exists", name=name)
+            else:
+                started = time.perf_counter()
+                try:
+                    entry.update(status="created", name=coll.create_index(keys, **options),
+                                 elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+                    logger.info("인덱스 생성: %s.%s", coll.name, entry['name'])
+                except Exception as e:
+                    logger.warning("인덱스 생성 실패 (%s %s): %s", role, entry['keys'], e)
+                    entry.update(status="error", error=str(e))
+            results.append(entry)
+    return results
@@ -0,0 +1,199 @@
+"""기업명 검색 인덱스 (정확/접두/부분(n-gram)/초성/별칭/오타 허용)
+
+기업명마다 정규화 키와 영문 약칭의 한글 표기(NAVER -> 네이버, SK -> 에스케이 등) 키를 만들고,
+정렬된 키 목록(접두), 2-gram 역색인(부분·오타), 초성 문자열(초성 검색)을 미리 만들어 둔다.
+"""
+import bisect
+import re
+
+
+_CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_HANGUL_START, _HANGUL_END = 0xAC00, 0xD7A3
+_SEPARATORS = re.compile(r"[\s().,·&\-_/]+")
+
+# 영문 약칭 -> 한글 표기 (이름 안의 토큰을 치환해 추가 키 생성)
+TRANSLITERATIONS = {
+    "naver": "네이버",
+    "posco": "포스코",
+    "lg": "엘지",
+    "sk": "에스케이",
+    "kb": "케이비",
+    "kt": "케이티",
+    "cj": "씨제이",
+    "gs": "지에스",
+    "hd": "에이치디",
+    "dl": "디엘",
+    "hl": "에이치엘",
+    "ls": "엘에스",
+    "bnk": "비엔케이",
+    "dgb": "디지비",
+    "jb": "제이비",
+    "kcc": "케이씨씨",
+    "ktng": "케이티앤지",
+    "s-oil": "에쓰오일",
+    "soil": "에쓰오일",
+}
+
+# 통칭/줄임말 -> 정식 기업명 (인덱스에 정식명이 있을 때만 사용)
+ALIASES = {
+    "삼전": "삼성전자",
+    "하이닉스": "SK하이닉스",
+    "현대자동차": "현대차",
+    "기아차": "기아",
+    "엘지전자": "LG전자",
+    "포스코": "POSCO홀딩스",
+    "네이버": "NAVER",
+    "카뱅": "카카오뱅크",
+    "엔솔": "LG에너지솔루션",
+}
+
+
+def normalize(text: str):
+    return _SEPARATORS.sub("", (text or "")).lower()
+
+
+def chosung(text: str):
+    """한글 음절은 초성으로, 나머지 문자는 그대로"""
+    out = []
+    for ch in text:
+        code = ord(ch)
+        if _HANGUL_START <= code <= _HANGUL_END:
+            out.append(_CHOSUNG[(code - _HANGUL_START) // 588])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def decompose(text: str):
+    """한글 음절을 초성/중성/종성 자모 인덱스 문자열로 분해 (오타 유사도 계산용)"""
+    out = []
+    for ch in text:
+        code = ord(ch)
+        if _HANGUL_START <= code <= _HANGUL_END:
+            offset = code - _HANGUL_START
+            out.append(chr(0x1100 + offset // 588))
+            out.append(chr(0x1161 + (offset % 588) // 28))
+            if offset % 28:
+                out.append(chr(0x11A7 + offset % 28))
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def is_chosung_query(text: str):
+    return bool(text) and all(ch in _CHOSUNG for ch in text)
+
+
+def transliterate(key: str):
+    """정규화 키 안의 영문 약칭을 한글 표기로 치환 (없으면 None)"""
+    result = key
+    for latin in sorted(TRANSLITERATIONS, key=len, reverse=True):
+        if latin in result:
+            result = result.replace(latin, TRANSLITERATIONS[latin])
+    return result if result != key else None
+
+
+def bigrams(text: str):
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class NameSearchIndex:
+    def __init__(self, names):
+        self.names = sorted({n for n in names if isinstance(n, str) and n.strip()})
+        self._exact = {}
+        key_pairs = []
+        self._grams = {}
+        chosung_pairs = []
+        for name in self.names:
+            keys = {normalize(name)}
+            translit = transliterate(normalize(name))
+            if translit:
+                keys.add(translit)
+            for key in keys:
+                self._exact.setdefault(key, name)
+                key_pairs.append((key, name))
+                for gram in bigrams(key):
+                    self._grams.setdefault(gram, set()).add((key, name))
+            chosung_pairs.append((chosung(normalize(name)), name))
+        key_pairs.sort()
+        chosung_pairs.sort()
+        self._keys = [k for k, _ in key_pairs]
+        self._key_names = [n for _, n in key_pairs]
+        self._chosung = chosung_pairs
+        self._aliases = {normalize(a): n for a, n in ALIASES.items() if n in self._exact.values()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def _prefix(self, q: str):
+        lo = bisect.bisect_left(self._keys, q)
+        hi = bisect.bisect_left(self._keys, q + "\uffff")
+        return self._key_names[lo:hi]
+
+    def _substring(self, q: str):
+        grams = bigrams(q)
+        candidates = None
+        for gram in grams:
+            posting = self._grams.get(gram, set())
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                return []
+        return [name for key, name in (candidates or []) if q in key]
+
+    def _fuzzy(self, q: str, threshold=0.6):
+        """음절 2-gram을 하나라도 공유하는 후보를 자모 2-gram Dice 유사도로 채점 (오타 허용)"""
+        candidates = set()
+        for gram in bigrams(q):
+            candidates |= self._grams.get(gram, set())
+        if not candidates:
+            return []
+        q_grams = bigrams(decompose(q))
+        scored = {}
+        for key, name in candidates:
+            k_grams = bigrams(decompose(key))
+            score = 2 * len(q_grams & k_grams) / (len(q_grams) + len(k_grams))
+            if score >= threshold and score > scored.get(name, 0):
+                scored[name] = score
+        return sorted(scored.items(), key=lambda item: -item[1])
+
+    def search(self, query: str, limit: int = 10):
+        """[{"기업명", "match", "score"}] 점수 내림차순"""
+        q = normalize(query)
+        if not q:
+            return []
+
+        scores = {}
+
+        def add(name, match, score):
+            if name not in scores or scores[name][1] < score:
+                scores[name] = (match, score)
+
+        if q in self._exact:
+            add(self._exact[q], "exact", 100)
+        if q in self._aliases:
+            add(self._aliases[q], "alias", 95)
+
+        if is_chosung_query(q):
+            for initials, name in self._chosung:
+                if initials.startswith(q):
+                    add(name, "chosung", 75)
+                elif q in initials:
+                    add(name, "chosung", 55)
+        else:
+            for name in self._prefix(q):
+                add(name, "prefix", 80)
+            for name in self._substring(q):
+                add(name, "substring", 60)
+
+        if not scores:
+            for name, similarity in self._fuzzy(q):
+                add(name, "fuzzy", round(40 * similarity, 2))
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1][1], len(item[0]), item[0]))
+        return [{"기업명": name, "match": match, "score": score} for name, (match, score) in ranked[:limit]]
+
+    def best_match(self, query: str):
+        results = self.search(query, limit=1)
+        return results[0]["기업명"] if results else None
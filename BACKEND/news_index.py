@@ -0,0 +1,287 @@
+"""키워드 뉴스 로컬 인덱스
+
+추적 중인 키워드(코스피, 실적 발표, 시가총액 상위 기업, 최근 요청된 기업)를 백그라운드에서
+주기적으로 Daum 뉴스 검색으로 받아, 정규화한 URL/제목 해시로 중복을 제거하고
+(제목, 링크, 처음 본 시각, 매칭된 키워드)로 저장한다.
+엔드포인트는 인덱스만 조회한다. 추적하지 않던 키워드는 저장된 기사 제목에서 찾고,
+추적 목록에 올려 다음 수집부터 채워지게 한다 (요청 경로에서 Daum을 호출하지 않음).
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+
+from http_pool import http_pool
+from news_parser import news_parser
+from storage import data_path, read_json, write_json_atomic
+from upstream_health import upstream_health
+
+logger = logging.getLogger(__name__)
+
+
+SEARCH_URL = "https://search.daum.net/nate?w=news&nil_search=btn&DA=PGD&enc=utf8&cluster=y&cluster_page=1&q={keyword}"
+NEWS_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ko-KR,ko;q=0.8,en-US;q=0.5,en;q=0.3',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# 항상 추적하는 키워드 (NEWS_TRACKED_KEYWORDS="반도체,금리"로 추가)
+DEFAULT_KEYWORDS = ["코스피", "실적 발표"] + [
+    k.strip() for k in os.getenv("NEWS_TRACKED_KEYWORDS", "").split(",") if k.strip()
+]
+# 키워드별 수집 간격, 키워드 사이 간격(초), 한 페이지에서 받을 기사 수
+POLL_INTERVAL = int(os.getenv("NEWS_POLL_INTERVAL", "300"))
+POLL_DELAY = float(os.getenv("NEWS_POLL_DELAY", "0.5"))
+ITEMS_PER_PAGE = 20
+# 요청으로 추가된 키워드는 이 시간 동안 다시 요청이 없으면 추적 해제, 추적 개수 상한
+TRACK_TTL = int(os.getenv("NEWS_TRACK_TTL", str(3 * 24 * 3600)))
+MAX_TRACKED = int(os.getenv("NEWS_MAX_TRACKED", "200"))
+# 기사 보관 기간 (초)
+RETENTION = int(os.getenv("NEWS_RETENTION", str(7 * 24 * 3600)))
+POLL_ENABLED = os.getenv("NEWS_POLL_ENABLED", "true").lower() == "true"
+
+TRACKING_PARAMS = re.compile(r"^(utm_|fbclid|gclid|ref|from)", re.IGNORECASE)
+TITLE_NOISE = re.compile(r"[\s\W_]+")
+
+
+def normalize_keyword(keyword: str):
+    return " ".join((keyword or "").split())
+
+
+def _compact(text: str):
+    return TITLE_NOISE.sub("", text or "").casefold()
+
+
+def url_key(link: str):
+    """스킴/호스트 소문자, 추적용 쿼리와 fragment, 끝 슬래시 제거 (링크가 없으면 None)"""
+    if not link or link == "#" or link.startswith("javascript"):
+        return None
+    parts = urlsplit(link.strip())
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not TRACKING_PARAMS.match(k)))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower() or "https", parts.netloc.lower(), path, query, ""))
+
+
+def title_key(title: str):
+    compact = _compact(title)
+    return hashlib.sha1(compact.encode("utf-8")).hexdigest()[:16] if compact else None
+
+
+async def fetch_news_page(url: str):
+    response = await http_pool.get(url, headers=NEWS_HEADERS, timeout=15)
+    response.raise_for_status()
+    return response
+
+
+class NewsIndex:
+    def __init__(self, path=None, default_keywords=DEFAULT_KEYWORDS):
+        self.path = path or data_path("news_index.json")
+        self._lock = threading.Lock()
+        self.default_keywords = [normalize_keyword(k) for k in default_keywords]
+        self._articles = {}     # 기사 id -> {"title", "link", "keywords", "first_seen", "seq"}
+        self._by_url = {}       # 정규화 URL -> 기사 id
+        self._by_title = {}     # 제목 해시 -> 기사 id
+        self._by_keyword = {}   # 키워드 -> 기사 id 집합
+        self._compact_titles = {}   # 기사 id -> 공백/기호를 뺀 소문자 제목 (조회 시 제목 부분 일치용)
+        self._tracked = {}      # 요청으로 추가된 키워드 -> 마지막 요청 시각
+        self._polled_at = {}    # 키워드 -> 마지막 수집 시각
+        self._seq = 0
+        self._wake = None
+        self._task = None
+        self.last_cycle = None
+
+    # ---- 저장/복원 ----
+    def load_from_disk(self):
+        data = read_json(self.path)
+        if not data:
+            return
+        self._tracked = data.get("tracked", {})
+        self._polled_at = data.get("polled_at", {})
+        for article_id, article in data.get("articles", {}).items():
+            self._install(article_id, article)
+        logger.info("뉴스 인덱스 디스크에서 로드: 기사 %s개, 추적 키워드 %s개", len(self._articles), len(self._tracked))
+
+    def _install(self, article_id, article):
+        self._articles[article_id] = article
+        self._seq = max(self._seq, article.get("seq", 0))
+        u, t = url_key(article["link"]), title_key(article["title"])
+        self._compact_titles[article_id] = _compact(article["title"])
+        if u:
+            self._by_url[u] = article_id
+        if t:
+            self._by_title[t] = article_id
+        for keyword in article["keywords"]:
+            self._by_keyword.setdefault(keyword, set()).add(article_id)
+
+    def flush(self):
+        with self._lock:
+            data = {
+                "articles": dict(self._articles),
+                "tracked": dict(self._tracked),
+                "polled_at": dict(self._polled_at),
+            }
+        write_json_atomic(self.path, data)
+
+    # ---- 반영 ----
+    def ingest(self, keyword: str, items):
+        """한 키워드의 검색 결과 반영 -> 새 기사 수 (이미 본 기사는 키워드만 추가)"""
+        keyword = normalize_keyword(keyword)
+        now = time.time()
+        added = 0
+        with self._lock:
+            # 페이지 위쪽(최신) 기사가 더 큰 순번을 갖도록 아래부터 반영
+            for item in reversed(items):
+                title, link = (item.get("title") or "").strip(), item.get("link") or "#"
+                u, t = url_key(link), title_key(title)
+                if not t:
+                    continue
+                article_id = self._by_url.get(u) if u else None
+                article_id = article_id or self._by_title.get(t)
+                if article_id is None:
+                    self._seq += 1
+                    article_id = u and hashlib.sha1(u.encode("utf-8")).hexdigest()[:16] or t
+                    self._install(article_id, {
+                        "title": title, "link": link, "keywords": [keyword],
+                        "first_seen": now, "seq": self._seq,
+                    })
+                    added += 1
+                elif keyword not in self._articles[article_id]["keywords"]:
+                    self._articles[article_id]["keywords"].append(keyword)
+                    self._by_keyword.setdefault(keyword, set()).add(article_id)
+            self._polled_at[keyword] = now
+        return added
+
+    def prune(self, now=None):
+        """보관 기간이 지난 기사와 오래 요청이 없던 추적 키워드 정리"""
+        now = now or time.time()
+        with self._lock:
+            expired = [i for i, a in self._articles.items() if now - a["first_seen"] > RETENTION]
+            for article_id in expired:
+                article = self._articles.pop(article_id)
+                self._by_url.pop(url_key(article["link"]), None)
+                self._by_title.pop(title_key(article["title"]), None)
+                self._compact_titles.pop(article_id, None)
+                for keyword in article["keywords"]:
+                    ids = self._by_keyword.get(keyword)
+                    if ids is not None:
+                        ids.discard(article_id)
+                        if not ids:
+                            self._by_keyword.pop(keyword)
+            for keyword in [k for k, at in self._tracked.items() if now - at > TRACK_TTL]:
+                self._tracked.pop(keyword)
+                self._polled_at.pop(keyword, None)
+        return len(expired)
+
+    # ---- 조회 ----
+    def lookup(self, keyword: str, limit: int = 10):
+        """키워드로 수집된 기사 + 다른 키워드로 수집됐지만 제목에 키워드가 들어간 기사 (최신순)"""
+        keyword = normalize_keyword(keyword)
+        needle = _compact(keyword)
+        with self._lock:
+            ids = set(self._by_keyword.get(keyword, ()))
+            if needle:
+                ids.update(i for i, title in self._compact_titles.items() if needle in title)
+            articles = sorted((self._articles[i] for i in ids), key=lambda a: a["seq"], reverse=True)
+        return [{"title": a["title"], "link": a["link"]} for a in articles[:limit]]
+
+    def track(self, keyword: str):
+        """요청된 키워드를 추적 목록에 올림 (처음 보는 키워드면 수집기를 깨움)"""
+        keyword = normalize_keyword(keyword)
+        if not keyword or keyword in self.default_keywords:
+            return
+        with self._lock:
+            is_new = keyword not in self._tracked
+            if is_new and len(self._tracked) >= MAX_TRACKED:
+                # 가장 오래 요청이 없던 키워드를 밀어냄
+                oldest = min(self._tracked, key=self._tracked.get)
+                self._tracked.pop(oldest)
+                self._polled_at.pop(oldest, None)
+            self._tracked[keyword] = time.time()
+        if is_new and self._wake is not None:
+            self._wake.set()
+
+    # ---- 백그라운드 수집 ----
+    def due_keywords(self, extra=(), now=None):
+        """수집할 차례인 키워드 (새로 추가돼 한 번도 수집 안 한 키워드 먼저)"""
+        now = now or time.time()
+        keywords = list(dict.fromkeys(self.default_keywords + [normalize_keyword(k) for k in extra if k]
+                                      + list(self._tracked)))
+        due = [k for k in keywords if now - self._polled_at.get(k, 0) >= POLL_INTERVAL]
+        return sorted(due, key=lambda k: self._polled_at.get(k, 0))
+
+    async def poll(self, keyword: str):
+        url = SEARCH_URL.format(keyword=quote(keyword))
+        response = await upstream_health.call_async("daum", fetch_news_page, url)
+        # HTML 파싱은 CPU 작업이므로 이벤트 루프를 막지 않도록 스레드로 넘김
+        items = await asyncio.to_thread(news_parser.parse, response.content, "daum", ITEMS_PER_PAGE)
+        return self.ingest(keyword, items)
+
+    async def poll_due(self, extra=()):
+        polled = added = 0
+        for keyword in self.due_keywords(extra):
+            if upstream_health.is_open("daum"):
+                logger.warning("Daum 차단 중, 뉴스 수집 다음 주기로 미룸")
+                break
+            try:
+                added += await self.poll(keyword)
+                polled += 1
+            except Exception as e:
+                logger.warning("뉴스 수집 실패 (%s): %s", keyword, e)
+            await asyncio.sleep(POLL_DELAY)
+        pruned = self.prune()
+        if polled or pruned:
+            await asyncio.to_thread(self.flush)
+        if polled:
+            logger.info("뉴스 수집: 키워드 %s개, 새 기사 %s개", polled, added)
+        self.last_cycle = {"at": time.time(), "keywords": polled, "added": added, "pruned": pruned}
+
+    async def _loop(self, extra_fn):
+        while True:
+            try:
+                await self.poll_due(extra_fn() if extra_fn else ())
+            except Exception as e:
+                logger.warning("뉴스 수집 루프 오류: %s", e)
+            # 다음 키워드 차례까지 기다리되, 새 키워드가 추적되면 바로 깨어남
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=max(POLL_INTERVAL / 5, 5))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, extra_fn=None):
+        """extra_fn: 추가로 추적할 키워드 목록을 돌려주는 함수 (예: 시가총액 상위 기업명)"""
+        if self._task is None and POLL_ENABLED:
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._loop(extra_fn))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def status(self):
+        return {
+            "articles": len(self._articles),
+            "keywords": len(self._by_keyword),
+            "tracked": len(self._tracked),
+            "running": self._task is not None and not self._task.done(),
+            "last_cycle": self.last_cycle,
+        }
+
+
+# 앱 전체에서 공유하는 뉴스 인덱스
+news_index = NewsIndex()
+news_index.load_from_disk()
@@ -0,0 +1,109 @@
+"""뉴스 검색 결과 HTML 파싱
+
+- C 기반 lxml 파서를 쓰고 (설치돼 있지 않으면 html.parser)
+- 검색 결과 영역(#dnsColl 등)만 SoupStrainer로 골라 트리를 만들며
+- 출처별로 마지막에 성공한 선택자를 기억해 다음 페이지에서 먼저 시도한다.
+결과 영역에서 못 찾으면 예전처럼 페이지 전체를 파싱해 모든 선택자와 링크 fallback을 시도한다.
+"""
+import logging
+import threading
+
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+
+SELECTORS = [
+    'a.tit_main',
+    '.tit_main',
+    '.news_tit',
+    '.news_area .news_tit',
+    '.item-title > strong > a',
+    '#dnsColl .item-title strong a',
+]
+# 검색 결과 목록을 감싸는 영역 (Daum 통합검색 뉴스 컬렉션)
+RESULT_CONTAINER_IDS = ["dnsColl", "newsColl", "newsResultList"]
+MAX_ITEMS = 5
+
+
+def _pick_parser():
+    try:
+        BeautifulSoup("<p></p>", "lxml")
+        return "lxml"
+    except FeatureNotFound:
+        logger.warning("lxml 없음, html.parser로 뉴스 파싱")
+        return "html.parser"
+
+
+PARSER = _pick_parser()
+
+
+class NewsParser:
+    def __init__(self, selectors=SELECTORS, container_ids=RESULT_CONTAINER_IDS, parser=PARSER):
+        self.selectors = list(selectors)
+        self.container = SoupStrainer(id=list(container_ids))
+        self.parser = parser
+        self._lock = threading.Lock()
+        # 출처 -> (결과 영역만으로 찾았는지, 마지막에 성공한 선택자)
+        self._memo = {}
+
+    def _ordered(self, remembered):
+        if remembered is None:
+            return self.selectors
+        return [remembered] + [s for s in self.selectors if s != remembered]
+
+    def _select(self, soup, remembered):
+        for selector in self._ordered(remembered):
+            items = soup.select(selector)
+            if items:
+                return selector, items
+        return None, []
+
+    def parse(self, content, source: str = "daum", limit: int = MAX_ITEMS):
+        """HTML(bytes/str)에서 [{"title", "link"}] 최대 limit개"""
+        memo = self._memo.get(source)
+        remembered = memo[1] if memo else None
+        scoped = memo[0] if memo else True
+
+        selector, items = None, []
+        if scoped:
+            soup = BeautifulSoup(content, self.parser, parse_only=self.container)
+            selector, items = self._select(soup, remembered)
+        if not items:
+            # 결과 영역이 없거나 구조가 바뀐 페이지: 전체 파싱
+            soup = BeautifulSoup(content, self.parser)
+            selector, items = self._select(soup, remembered)
+            scoped = False
+            if not items:
+                items = soup.find_all('a', class_='tit_main') or \
+                    soup.find_all('a', href=lambda x: x and 'news' in x)
+
+        with self._lock:
+            if selector:
+                if memo != (scoped, selector):
+                    logger.info("뉴스 선택자 기억 (%s): %s%s", source, selector, ' (결과 영역)' if scoped else '')
+                self._memo[source] = (scoped, selector)
+            else:
+                # 아무 선택자도 안 맞으면 다음엔 처음부터 다시
+                self._memo.pop(source, None)
+
+        news_list = []
+        for item in items:
+            title = item.get_text().strip()
+            link = item.get('href', '#')
+            if title and len(title) > 5:
+                news_list.append({"title": title, "link": link})
+                if len(news_list) >= limit:
+                    break
+        return news_list
+
+    def status(self):
+        return {
+            "parser": self.parser,
+            "selectors": {source: {"scoped": scoped, "selector": selector}
+                          for source, (scoped, selector) in self._memo.items()},
+        }
+
+
+# 앱 전체에서 공유하는 뉴스 파서 (선택자 기억 포함)
+news_parser = NewsParser()
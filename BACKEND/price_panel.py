@@ -0,0 +1,108 @@
+"""여러 종목 종가를 날짜 축에 맞춰 한 번에 만드는 가격 패널
+
+종목별 이력 조회 대신 거래일별 시장 전체 스냅샷(하루 한 번의 업스트림 호출로 전 종목)을 모아
+(거래일 × 종목) 종가 행렬을 만든다. 확정된 날짜의 스냅샷은 디스크에 남으므로
+같은 구간을 다시 요청하면 업스트림 호출 없이 조립된다.
+"""
+import contextvars
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from pykrx import stock
+
+from market_snapshot import market_snapshot_store
+from response_cache import response_cache
+from ticker_index import ticker_index
+from upstream_health import upstream_health
+
+logger = logging.getLogger(__name__)
+
+
+MAX_TICKERS = 50
+MAX_DAYS = 400
+FETCH_WORKERS = 4
+# 요청 하나가 업스트림에서 직접 받는 스냅샷 수 (나머지는 스케줄러가 채움)
+MAX_COLD_FETCHES = int(os.getenv("PRICE_PANEL_MAX_COLD_FETCHES", "10"))
+
+
+@response_cache.cached("trading_days", ttl=3600, stale_ttl=24 * 3600)
+def trading_days(start: str, end: str):
+    """start~end(YYYYMMDD) 사이 거래일 목록"""
+    days = upstream_health.call("pykrx", stock.get_previous_business_days, fromdate=start, todate=end)
+    return [day.strftime("%Y%m%d") for day in days]
+
+
+def _snapshot(key):
+    date, market = key
+    try:
+        return market_snapshot_store.get(date, market, remember=False)
+    except Exception as e:
+        logger.warning("시장 스냅샷 조회 실패 (%s %s): %s", market, date, e)
+        return None
+
+
+def _name(code):
+    try:
+        return ticker_index.name(code)
+    except Exception:
+        return None
+
+
+def build_close_panel(codes, start: str, end: str):
+    """{"dates", "tickers", "names", "series": {종목코드: [종가 또는 None]}, "missing_dates"}"""
+    dates = trading_days(start, end)
+    markets = {code: (ticker_index.get(code) or {}).get("market") or "KOSPI" for code in codes}
+    keys = [(date, market) for date in dates for market in sorted(set(markets.values()))]
+
+    # 날짜별 스냅샷은 메모리/디스크에 있으면 바로 쓰고
+    snapshots, cold = {}, []
+    for key in keys:
+        snapshot = market_snapshot_store.stored(*key)
+        if snapshot is None:
+            cold.append(key)
+        else:
+            snapshots[key] = snapshot
+
+    # 없는 날짜는 최근 날짜부터 MAX_COLD_FETCHES개만 요청 안에서 받고 나머지는 스케줄러 백필로
+    cold.sort(reverse=True)
+    fetch, deferred = cold[:MAX_COLD_FETCHES], cold[MAX_COLD_FETCHES:]
+    if fetch:
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="price-panel") as pool:
+            # 작업마다 요청 context(시간 예산, 지표)를 복사해 실행
+            futures = [pool.submit(contextvars.copy_context().run, _snapshot, key) for key in fetch]
+            for key, future in zip(fetch, futures):
+                snapshots[key] = future.result()
+    deferred += [key for key in fetch if snapshots[key] is None]
+    if deferred:
+        market_snapshot_store.request_backfill(deferred)
+
+    panel = np.full((len(dates), len(codes)), np.nan)
+    missing_dates = []
+    for market in set(markets.values()):
+        columns = [j for j, code in enumerate(codes) if markets[code] == market]
+        market_codes = [codes[j] for j in columns]
+        for i, date in enumerate(dates):
+            snapshot = snapshots.get((date, market))
+            if snapshot is None:
+                missing_dates.append(date)
+                continue
+            panel[i, columns] = snapshot.values_for(market_codes, "close")
+
+    # 거래정지 등으로 0인 값도 빈 값으로
+    panel[panel == 0] = np.nan
+    values = np.where(np.isnan(panel), None, panel)
+    return {
+        "dates": [f"{d[:4]}-{d[4:6]}-{d[6:]}" for d in dates],
+        "tickers": list(codes),
+        "names": {code: _name(code) for code in codes},
+        "series": {code: values[:, j].tolist() for j, code in enumerate(codes)},
+        "missing_dates": sorted(set(missing_dates)),
+    }
+
+
+# 빠진 날짜가 있는 결과는 캐시하지 않음 (다음 요청에서 다시 시도)
+@response_cache.cached("prices", ttl=300, stale_ttl=3600, cache_if=lambda panel: not panel["missing_dates"])
+def load_close_panel(codes: tuple, start: str, end: str):
+    return build_close_panel(list(codes), start, end)
@@ -0,0 +1,226 @@
+"""종목별 일봉(OHLCV) 로컬 저장소
+
+종목마다 고정 크기 레코드(날짜 + OHLCV)를 이어 붙인 바이너리 파일을 두고 np.memmap으로 읽는다.
+처음 한 번만 몇 년치를 백그라운드에서 받아 두고, 이후에는 마지막 저장일부터만 받아 파일 끝에 추가한다.
+pykrx 일봉은 수정주가라서 겹치는 마지막 저장일 종가가 달라졌으면(액면분할, 배당 등) 전체를 다시 받는다.
+장중에는 당일 봉이 확정되지 않았으므로 저장하지 않고, 시장 스냅샷의 현재가를 마지막 점으로 붙인다.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+from pykrx import stock
+
+import deadline
+from market_scheduler import last_closed_date, now_kst
+from market_snapshot import market_snapshot_store
+from singleflight import upstream_flight
+from storage import data_path
+from ticker_index import ticker_index
+from upstream_health import upstream_health
+
+logger = logging.getLogger(__name__)
+
+
+RECORD = np.dtype([
+    ("date", "<i4"),  # YYYYMMDD
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+OHLCV_COLUMNS = {"open": "시가", "high": "고가", "low": "저가", "close": "종가", "volume": "거래량"}
+
+# 처음 받아 둘 기간
+SEED_DAYS = int(os.getenv("PRICE_STORE_SEED_DAYS", str(365 * 3)))
+SEED_WORKERS = 2
+
+
+def parse_date(value):
+    """'2024-01-02' / '20240102' -> 20240102 (없으면 None)"""
+    if not value:
+        return None
+    digits = str(value).replace("-", "").replace("/", "").replace(".", "")[:8]
+    if len(digits) != 8 or not digits.isdigit():
+        raise ValueError(f"날짜 형식 오류: {value}")
+    return int(digits)
+
+
+def format_date(value: int):
+    text = str(int(value))
+    return f"{text[:4]}-{text[4:6]}-{text[6:]}"
+
+
+def to_records(df):
+    records = np.zeros(len(df), dtype=RECORD)
+    records["date"] = df.index.strftime("%Y%m%d").astype(np.int32)
+    for field, column in OHLCV_COLUMNS.items():
+        records[field] = df[column].to_numpy(dtype=np.float64)
+    return records
+
+
+class PriceStore:
+    def __init__(self):
+        # 종목별 상태는 종목 인덱스에 있는 코드만 만들므로 상장 종목 수를 넘지 않음
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._maps = {}
+        # 종목 -> 마지막으로 맞춰 둔 확정 거래일 (last_closed_date)
+        self._synced_for = {}
+        # 전체 적재 중인 종목 (그동안 요청은 저장된 데이터나 호출한 쪽 fallback 사용)
+        self._seeding = set()
+        self._executor = ThreadPoolExecutor(max_workers=SEED_WORKERS, thread_name_prefix="price-seed")
+
+    def path(self, ticker: str):
+        return data_path("prices", f"{ticker}.bin")
+
+    def _lock(self, ticker):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    # ---- 읽기 ----
+    def load(self, ticker: str):
+        """저장된 전체 레코드 (memmap, 파일 크기가 바뀌었을 때만 다시 연결)"""
+        path = self.path(ticker)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.zeros(0, dtype=RECORD)
+        # 쓰는 도중 끊긴 꼬리 레코드는 무시
+        count = size // RECORD.itemsize
+        cached = self._maps.get(ticker)
+        if cached is not None and cached[0] == count:
+            return cached[1]
+        records = np.memmap(path, dtype=RECORD, mode="r", shape=(count,)) if count else np.zeros(0, dtype=RECORD)
+        self._maps[ticker] = (count, records)
+        return records
+
+    def between(self, ticker: str, start=None, end=None):
+        """start/end(YYYYMMDD int, 포함) 구간 레코드"""
+        records = self.load(ticker)
+        dates = records["date"]
+        lo = 0 if start is None else int(np.searchsorted(dates, start, side="left"))
+        hi = len(records) if end is None else int(np.searchsorted(dates, end, side="right"))
+        return records[lo:hi]
+
+    # ---- 쓰기 ----
+    def _append(self, ticker: str, records):
+        path = self.path(ticker)
+        with open(path, "ab") as f:
+            # 이전에 쓰다 끊긴 꼬리 레코드가 있으면 잘라내고 이어 씀
+            size = f.tell()
+            if size % RECORD.itemsize:
+                f.truncate(size - size % RECORD.itemsize)
+            f.write(records.tobytes())
+
+    def _sync(self, ticker: str):
+        """마지막 저장일 이후 확정 봉 추가 (추가한 개수, 수정주가가 바뀌었으면 None)"""
+        with self._lock(ticker):
+            stored = self.load(ticker)
+            last = int(stored["date"][-1])
+            target = last_closed_date()
+            if last >= target:
+                return 0
+            df = upstream_health.call("pykrx", stock.get_market_ohlcv_by_date, str(last), str(target), ticker)
+            if df is None or df.empty:
+                return 0
+            records = to_records(df)
+            # 마지막 저장일 종가가 달라졌으면 이전 구간이 다시 수정된 것이므로 이어 붙이지 않음
+            overlap = records[records["date"] == last]
+            if len(overlap) and not np.isclose(overlap["close"][0], stored["close"][-1]):
+                return None
+            # 확정된 봉만, 마지막 저장일 이후만 추가
+            records = records[(records["date"] <= target) & (records["date"] > last)]
+            if len(records):
+                self._append(ticker, records)
+                logger.info("%s 일봉 %s개 추가 (%s~)", ticker, len(records), format_date(records['date'][0]))
+            return len(records)
+
+    def _seed(self, ticker: str):
+        """SEED_DAYS치 확정 봉을 받아 파일 전체를 교체 (처음 적재, 수정주가 변경 시)"""
+        with self._lock(ticker):
+            target = last_closed_date()
+            start = (datetime.now() - timedelta(days=SEED_DAYS)).strftime("%Y%m%d")
+            df = upstream_health.call("pykrx", stock.get_market_ohlcv_by_date, start, str(target), ticker)
+            if df is None or df.empty:
+                return 0
+            records = to_records(df)
+            records = records[records["date"] <= target]
+            path = self.path(ticker)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(records.tobytes())
+            os.replace(tmp_path, path)
+            self._maps.pop(ticker, None)
+            logger.info("%s 일봉 %s개 적재", ticker, len(records))
+            return len(records)
+
+    def _seed_in_background(self, ticker: str):
+        target = last_closed_date()
+        with self._locks_guard:
+            if ticker in self._seeding:
+                return
+            self._seeding.add(ticker)
+
+        def run():
+            try:
+                # 몇 년치 조회는 요청 예산과 무관하게 끝까지
+                with deadline.unbounded():
+                    self._seed(ticker)
+                self._synced_for[ticker] = target
+            except Exception as e:
+                logger.warning("%s 일봉 전체 적재 실패: %s", ticker, e)
+            finally:
+                with self._locks_guard:
+                    self._seeding.discard(ticker)
+        self._executor.submit(run)
+
+    def _listed(self, ticker: str):
+        """종목 인덱스에 있는 코드인지 (인덱스가 아직 없으면 몇 년치 적재를 시작하지 않음)"""
+        return ticker_index.built_for is not None and ticker_index.known_code(ticker) == ticker
+
+    def ensure(self, ticker: str):
+        """확정 거래일(last_closed_date)이 바뀐 뒤 처음 요청일 때만 빠진 거래일을 받아 추가"""
+        target = last_closed_date()
+        if self._synced_for.get(ticker) == target or ticker in self._seeding:
+            return
+        if not self._listed(ticker):
+            return
+        if not len(self.load(ticker)):
+            self._seed_in_background(ticker)
+            return
+        try:
+            added = upstream_flight.do(("price_sync", ticker), self._sync, ticker)
+        except Exception as e:
+            logger.warning("%s 일봉 증분 갱신 실패, 저장된 데이터 사용: %s", ticker, e)
+            return
+        if added is None:
+            logger.info("%s 수정주가 변경 감지, 전체 다시 적재", ticker)
+            self._seed_in_background(ticker)
+            return
+        self._synced_for[ticker] = target
+
+    # ---- 응답 ----
+    def closes(self, ticker: str, start=None, end=None):
+        """[{"Date", "Close"}] (저장된 확정 봉 + 장중이면 시장 스냅샷 현재가)"""
+        self.ensure(ticker)
+        records = self.between(ticker, start, end)
+        dates = [format_date(d) for d in records["date"].tolist()]
+        result = [{"Date": d, "Close": c} for d, c in zip(dates, records["close"].tolist())]
+
+        today = int(now_kst().strftime("%Y%m%d"))
+        last = int(records["date"][-1]) if len(records) else 0
+        if len(records) and (end is None or end >= today) and last < today:
+            snapshot = market_snapshot_store.peek(str(today))
+            row = snapshot.lookup(ticker) if snapshot is not None else None
+            if row and row.get("종가"):
+                result.append({"Date": format_date(today), "Close": float(row["종가"])})
+        return result
+
+
+# 앱 전체에서 공유하는 일봉 저장소
+price_store = PriceStore()
@@ -0,0 +1,277 @@
+"""MongoDB 쿼리 계측 (pymongo CommandListener)
+
+조회 형태(컬렉션 + 명령 + 필터 모양)별로 호출 수, 지연, 반환 문서 수를 모으고,
+처음 보는 형태와 느린 쿼리는 백그라운드에서 explain(executionStats)을 실행해
+검사한 문서 수 / 반환 문서 수 / 실행 계획(COLLSCAN 여부)을 기록한다.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import monitoring
+
+from metrics import observe_upstream
+
+logger = logging.getLogger(__name__)
+
+
+SLOW_QUERY_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", "100"))
+# 같은 형태를 다시 explain 하기까지 최소 간격 (초)
+EXPLAIN_INTERVAL = int(os.getenv("MONGO_EXPLAIN_INTERVAL", "60"))
+MAX_SHAPES = 500
+MAX_SLOW_ENTRIES = 100
+LATENCY_SAMPLES = 200
+
+TRACKED_COMMANDS = {"find", "aggregate", "getMore", "count", "distinct", "findAndModify", "update", "delete", "insert"}
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+# explain에 넘기지 않는 드라이버/세션 필드
+_DRIVER_FIELDS = {"lsid", "txnNumber", "$clusterTime", "$db", "$readPreference", "readConcern", "writeConcern"}
+
+
+def _shape(value):
+    """필터 값은 지우고 필드/연산자 구조만 남김"""
+    if isinstance(value, dict):
+        return {k: _shape(v) for k, v in sorted(value.items())}
+    if isinstance(value, list):
+        return [_shape(v) for v in value[:1]] if value and isinstance(value[0], dict) else "?"
+    return "?"
+
+
+def _query_filter(command_name: str, command: dict):
+    if command_name in ("find", "count", "distinct"):
+        return command.get("filter") or command.get("query") or {}
+    if command_name == "findAndModify":
+        return command.get("query") or {}
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or []
+        first = pipeline[0] if pipeline else {}
+        return first.get("$match", {}) if isinstance(first, dict) else {}
+    if command_name == "update":
+        updates = command.get("updates") or [{}]
+        return updates[0].get("q", {})
+    if command_name == "delete":
+        deletes = command.get("deletes") or [{}]
+        return deletes[0].get("q", {})
+    return {}
+
+
+def _is_streaming(command_name: str, command: dict):
+    """변경 스트림/tailable 커서 (getMore가 새 데이터를 기다리며 블록되므로 지연 집계에서 제외)"""
+    if command.get("tailable") or command.get("awaitData"):
+        return True
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or []
+        first = pipeline[0] if pipeline else {}
+        return isinstance(first, dict) and "$changeStream" in first
+    return False
+
+
+def _find_key(obj, key):
+    """explain 결과(명령/버전마다 위치가 다름)에서 key를 가진 첫 dict 값을 찾음"""
+    if isinstance(obj, dict):
+        if key in obj:
+            return obj[key]
+        children = obj.values()
+    elif isinstance(obj, list):
+        children = obj
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _plan_stages(plan):
+    stages = []
+    while isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        inputs = plan.get("inputStages")
+        plan = plan.get("inputStage") or plan.get("queryPlan") or (inputs[0] if inputs else None)
+    return stages
+
+
+def summarize_explain(result: dict):
+    stats = _find_key(result, "executionStats") or {}
+    planner = _find_key(result, "queryPlanner") or {}
+    stages = _plan_stages(planner.get("winningPlan"))
+    return {
+        "plan": stages,
+        "collscan": "COLLSCAN" in stages,
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "returned": stats.get("nReturned"),
+        "execution_ms": stats.get("executionTimeMillis"),
+    }
+
+
+class _ShapeStats:
+    __slots__ = ("collection", "command", "filter", "count", "errors", "total_ms", "max_ms",
+                 "returned", "latencies", "explain", "explained_at")
+
+    def __init__(self, collection, command, filter_shape):
+        self.collection = collection
+        self.command = command
+        self.filter = filter_shape
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.returned = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.explain = None
+        self.explained_at = 0.0
+
+    def as_dict(self):
+        samples = sorted(self.latencies)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0
+        return {
+            "collection": self.collection,
+            "command": self.command,
+            "filter": self.filter,
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p95_ms": round(p95, 2),
+            "max_ms": round(self.max_ms, 2),
+            "returned": self.returned,
+            "explain": self.explain,
+        }
+
+
+class QueryMonitor(monitoring.CommandListener):
+    def __init__(self, slow_ms=SLOW_QUERY_MS):
+        self.slow_ms = slow_ms
+        self.client = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._cursors = {}
+        self._shapes = OrderedDict()
+        self._slow = deque(maxlen=MAX_SLOW_ENTRIES)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mongo-explain")
+
+    def bind(self, client):
+        """explain 실행에 쓸 클라이언트"""
+        self.client = client
+
+    # ---- CommandListener ----
+    def started(self, event):
+        name = event.command_name
+        if name not in TRACKED_COMMANDS:
+            return
+        command = event.command
+        if name == "getMore":
+            shape_key = self._cursors.get(command.get("getMore"))
+            if shape_key is None:
+                return
+            explain_command = None
+        elif _is_streaming(name, command):
+            return
+        else:
+            filter_shape = json.dumps(_shape(_query_filter(name, command)), ensure_ascii=False)
+            shape_key = (event.database_name, str(command.get(name)), name, filter_shape)
+            explain_command = command if name in EXPLAINABLE_COMMANDS else None
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (shape_key, explain_command)
+
+    def succeeded(self, event):
+        self._finish(event, event.reply, failed=False)
+
+    def failed(self, event):
+        self._finish(event, None, failed=True)
+
+    def _finish(self, event, reply, failed):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        shape_key, command = pending
+        elapsed_ms = event.duration_micros / 1000
+        observe_upstream("mongo", elapsed_ms / 1000, "failure" if failed else "success")
+        cursor = (reply or {}).get("cursor") or {}
+        batch = cursor.get("firstBatch", cursor.get("nextBatch", []))
+        returned = len(batch) if isinstance(batch, list) else int((reply or {}).get("n", 0) or 0)
+
+        with self._lock:
+            stats = self._shapes.get(shape_key)
+            if stats is None:
+                database, collection, name, filter_shape = shape_key
+                stats = _ShapeStats(f"{database}.{collection}", name, json.loads(filter_shape))
+                self._shapes[shape_key] = stats
+                while len(self._shapes) > MAX_SHAPES:
+                    self._shapes.popitem(last=False)
+            stats.count += 1
+            stats.errors += int(failed)
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.latencies.append(elapsed_ms)
+            stats.returned += returned
+            # 남은 배치(getMore)도 같은 형태로 집계 (변경 스트림/tailable 커서는 started에서 걸러져 등록되지 않음)
+            cursor_id = cursor.get("id")
+            if cursor_id:
+                self._cursors[cursor_id] = shape_key
+                while len(self._cursors) > MAX_SHAPES:
+                    self._cursors.pop(next(iter(self._cursors)))
+
+            slow = elapsed_ms >= self.slow_ms
+            now = time.monotonic()
+            # 처음 보는 형태와 느린 쿼리만 explain (형태별 간격 제한)
+            should_explain = (
+                command is not None and not failed and self.client is not None
+                and (stats.explain is None or (slow and now - stats.explained_at > EXPLAIN_INTERVAL))
+            )
+            if should_explain:
+                stats.explained_at = now
+
+        if slow:
+            logger.warning("느린 쿼리 %.1fms: %s %s %s", elapsed_ms, stats.collection, stats.command, stats.filter)
+        if should_explain:
+            self._executor.submit(self._explain, shape_key, command, elapsed_ms if slow else None)
+
+    # ---- explain ----
+    def _explain(self, shape_key, command, slow_ms):
+        database = shape_key[0]
+        explain_target = {k: v for k, v in command.items() if k not in _DRIVER_FIELDS}
+        try:
+            result = self.client[database].command({"explain": explain_target, "verbosity": "executionStats"})
+            summary = summarize_explain(result)
+        except Exception as e:
+            summary = {"error": str(e)}
+        with self._lock:
+            stats = self._shapes.get(shape_key)
+            if stats is not None:
+                stats.explain = summary
+            if slow_ms is not None:
+                self._slow.append({
+                    "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "collection": f"{database}.{shape_key[1]}",
+                    "command": shape_key[2],
+                    "filter": json.loads(shape_key[3]),
+                    "elapsed_ms": round(slow_ms, 2),
+                    **summary,
+                })
+        if summary.get("collscan"):
+            logger.warning("인덱스 없는 전체 스캔: %s.%s %s (검사 %s / 반환 %s)", database, shape_key[1], shape_key[3], summary.get('docs_examined'), summary.get('returned'))
+
+    # ---- 조회 ----
+    def report(self):
+        with self._lock:
+            shapes = [stats.as_dict() for stats in self._shapes.values()]
+            slow = list(self._slow)
+        shapes.sort(key=lambda s: -s["count"] * s["avg_ms"])
+        return {
+            "slow_threshold_ms": self.slow_ms,
+            "shapes": shapes,
+            "collscans": [s for s in shapes if (s["explain"] or {}).get("collscan")],
+            "slow_queries": slow[::-1],
+        }
+
+
+# 앱 전체에서 공유하는 쿼리 계측기 (MongoClient 생성 시 event_listeners로 등록)
+query_monitor = QueryMonitor()
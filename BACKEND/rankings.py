@@ -0,0 +1,181 @@
+"""지표(metric)·연도별 상위 K개 순위를 미리 계산해 두는 순위 엔진
+
+'지표'의 모든 "YYYY/12_지표명" 키에 대해 기업별 값을 보관하고, 상위 K_MAX개를 정렬된 목록으로
+유지한다. 기업 문서가 바뀌면 해당 기업이 속한 순위만 갱신하고, 조회는 목록 슬라이스만 한다.
+"""
+import heapq
+import math
+import os
+import threading
+
+import pandas as pd
+
+
+K_MAX = int(os.getenv("RANKINGS_K_MAX", "50"))
+
+
+def parse_metric_key(key: str):
+    """'2024/12_매출액' -> ('매출액', '2024')"""
+    period, sep, metric = key.partition("_")
+    if not sep or "/" not in period:
+        return None
+    year = period.split("/")[0]
+    return (metric, year) if year.isdigit() and metric else None
+
+
+def numeric(value):
+    """기존 pd.to_numeric(errors="coerce")와 같은 변환 ('12' -> 12, 변환 불가/NaN -> None)"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        value = pd.to_numeric(value, errors="coerce")
+        value = value.item() if hasattr(value, "item") else value
+    if not isinstance(value, (int, float)):
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _fingerprint(지표: dict):
+    return hash(tuple(sorted((k, repr(v)) for k, v in 지표.items())))
+
+
+class RankingEngine:
+    def __init__(self, k_max=K_MAX):
+        self.k_max = k_max
+        self._lock = threading.Lock()
+        # (metric, year) -> {기업명: 값}
+        self._values = {}
+        # (metric, year) -> [(기업명, 값), ...] 내림차순 상위 k_max
+        self._top = {}
+        # 기업명 -> (지표 fingerprint, {(metric, year): 값}, 값과 무관하게 키가 있는 (metric, year) 집합)
+        self._companies = {}
+        self.synced_version = None
+
+    # ---- 갱신 ----
+    def _refresh_key(self, key):
+        values = self._values.get(key)
+        if not values:
+            self._top.pop(key, None)
+            return
+        best = heapq.nlargest(self.k_max, values.items(), key=lambda item: item[1])
+        self._top[key] = best
+
+    def _set_value(self, key, name, value, dirty):
+        values = self._values.setdefault(key, {})
+        old = values.get(name)
+        if old == value:
+            return
+        values[name] = value
+        top = self._top.get(key, [])
+        threshold = top[-1][1] if len(top) >= self.k_max else None
+        in_top = any(n == name for n, _ in top)
+        # 상위권에 영향을 주는 변경만 해당 순위 재계산
+        if in_top or threshold is None or value >= threshold:
+            dirty.add(key)
+
+    def _remove_value(self, key, name, dirty):
+        values = self._values.get(key)
+        if values and values.pop(name, None) is not None:
+            if any(n == name for n, _ in self._top.get(key, [])):
+                dirty.add(key)
+
+    def _apply(self, doc, dirty):
+        name = doc.get("기업명")
+        if not name:
+            return
+        지표 = doc.get("지표") or {}
+        fingerprint = _fingerprint(지표)
+        previous = self._companies.get(name)
+        if previous is not None and previous[0] == fingerprint:
+            return
+
+        current = {}
+        present = set()
+        for raw_key, raw_value in 지표.items():
+            parsed = parse_metric_key(raw_key)
+            if parsed is None:
+                continue
+            present.add(parsed)
+            value = numeric(raw_value)
+            if value is not None:
+                current[parsed] = value
+
+        old_keys = previous[1] if previous else {}
+        for key in old_keys.keys() - current.keys():
+            self._remove_value(key, name, dirty)
+        for key, value in current.items():
+            self._set_value(key, name, value, dirty)
+        self._companies[name] = (fingerprint, current, present)
+
+    def apply(self, doc: dict):
+        """기업 문서 하나가 바뀌었을 때 (change stream 등)"""
+        with self._lock:
+            dirty = set()
+            self._apply(doc, dirty)
+            for key in dirty:
+                self._refresh_key(key)
+
+    def remove(self, name: str):
+        with self._lock:
+            previous = self._companies.pop(name, None)
+            if previous is None:
+                return
+            dirty = set()
+            for key in previous[1]:
+                self._remove_value(key, name, dirty)
+            for key in dirty:
+                self._refresh_key(key)
+
+    def sync(self, docs, version=None):
+        """스냅샷 전체와 맞춤. 지표가 바뀐 기업만 반영하고 사라진 기업은 제거"""
+        with self._lock:
+            dirty = set()
+            seen = set()
+            for doc in docs:
+                seen.add(doc.get("기업명"))
+                self._apply(doc, dirty)
+            for name in list(self._companies.keys() - seen):
+                for key in self._companies.pop(name)[1]:
+                    self._remove_value(key, name, dirty)
+            for key in dirty:
+                self._refresh_key(key)
+            self.synced_version = version
+
+    # ---- 조회 ----
+    def top(self, metric: str, year: str, k: int):
+        """상위 k개 [(기업명, 값), ...] (없는 조합이면 None)"""
+        top = self._top.get((metric, year))
+        if top is None:
+            return None
+        return top[:k]
+
+    def top_among(self, metric: str, year: str, k: int, required):
+        """required의 (metric, year) 키가 모두 있는 기업 중 상위 k개 (값이 숫자가 아니어도 키만 있으면 대상)"""
+        key = (metric, year)
+        required = set(required)
+        with self._lock:
+            def complete(name):
+                entry = self._companies.get(name)
+                return entry is not None and required <= entry[2]
+
+            top = self._top.get(key)
+            if top is None:
+                return []
+            picked = [item for item in top if complete(item[0])][:k]
+            # 상위 목록이 전체이거나 그 안에서 k개를 채웠으면 충분
+            if len(picked) >= k or len(top) < self.k_max:
+                return picked
+            candidates = ((name, value) for name, value in self._values.get(key, {}).items() if complete(name))
+            return heapq.nlargest(k, candidates, key=lambda item: item[1])
+
+    def available(self):
+        pairs = {}
+        for metric, year in self._top:
+            pairs.setdefault(metric, []).append(year)
+        return {metric: sorted(years) for metric, years in sorted(pairs.items())}
+
+
+# 앱 전체에서 공유하는 순위 엔진
+rankings_engine = RankingEngine()
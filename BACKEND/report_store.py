@@ -0,0 +1,233 @@
+"""종목별 증권사 리포트(fnguide) 로컬 저장소와 백그라운드 수집기
+
+KOSPI 전 종목의 리포트를 백그라운드에서 제한된 동시성과 요청 간격으로 미리 받아
+종목코드별로 (리포트 목록, 수집 시각)을 저장해 둔다. /report/는 저장된 값을 바로 돌려주고,
+오래된 종목만 뒤에서 다시 받는다. fnguide가 느리거나 막혀도 응답은 로컬 조회로 끝난다.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import deadline
+from singleflight import upstream_flight
+from storage import data_path, read_json, write_json_atomic
+from upstream_health import upstream_health
+
+logger = logging.getLogger(__name__)
+
+
+REPORT_URL = "https://comp.fnguide.com/SVO2/json/data/01_06/04_{code}.json"
+MAX_REPORTS = 5
+
+# 저장된 리포트를 새로 받을 때까지의 시간, 수집 주기 (초)
+REPORT_TTL = int(os.getenv("REPORT_STORE_TTL", str(12 * 3600)))
+HARVEST_INTERVAL = int(os.getenv("REPORT_HARVEST_INTERVAL", "3600"))
+# 수집 동시 요청 수와 요청 사이 간격(초) - fnguide에 부담을 주지 않도록 작게
+HARVEST_CONCURRENCY = int(os.getenv("REPORT_HARVEST_CONCURRENCY", "2"))
+HARVEST_DELAY = float(os.getenv("REPORT_HARVEST_DELAY", "1.0"))
+HARVEST_ENABLED = os.getenv("REPORT_HARVEST_ENABLED", "true").lower() == "true"
+# 디스크 저장 최소 간격 (수집 중 매 종목마다 파일을 다시 쓰지 않도록)
+FLUSH_INTERVAL = 30
+
+
+def fetch_checked(url: str, **kwargs):
+    """requests.get + HTTP 오류 상태를 예외로 (서킷 브레이커 실패 집계용)"""
+    kwargs["timeout"] = deadline.timeout(kwargs.get("timeout", 10))
+    response = requests.get(url, **kwargs)
+    response.raise_for_status()
+    return response
+
+
+def request_headers(code: str):
+    return {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36',
+        'Accept': 'application/json, text/javascript, */*; q=0.01',
+        'Accept-Language': 'ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7',
+        'Accept-Encoding': 'gzip, deflate, br, zstd',
+        'Referer': f'https://comp.fnguide.com/SVO2/ASP/SVD_Consensus.asp?pGB=1&gicode={code}',
+        'X-Requested-With': 'XMLHttpRequest',
+        'Cache-Control': 'no-cache',
+        'Pragma': 'no-cache'
+    }
+
+
+def parse_reports(data, limit=MAX_REPORTS):
+    """fnguide JSON({"comp": [...]})을 리포트 목록으로 변환"""
+    reports = []
+    for item in (data or {}).get('comp', [])[:limit]:
+        try:
+            # 날짜 형식 변환 (20250825 -> 2025/08/25)
+            date_str = item.get('BULLET_DT', '')
+            if len(date_str) == 8:
+                formatted_date = f"{date_str[:4]}/{date_str[4:6]}/{date_str[6:8]}"
+            else:
+                formatted_date = item.get('BULLET_MMDD', '')
+
+            reports.append({
+                "date": formatted_date,
+                "title": item.get('TITLE', ''),
+                "summary": item.get('SYNOPSIS', ''),
+                "opinion": item.get('RECOMMEND', ''),
+                # 목표주가와 종가 정리 (공백 제거)
+                "target_price": item.get('TARGET_PRC', '').strip(),
+                "closing_price": item.get('CLS_PRC', '').strip(),
+                "analyst": f"{item.get('OFFER_INST_NM', '')} {item.get('NICK_NM', '')}".strip()
+            })
+        except Exception as e:
+            logger.warning("리포트 파싱 오류: %s", e)
+    return reports
+
+
+def fetch_reports(code: str):
+    """fnguide 리포트 JSON 조회 및 파싱 (code는 A005930 형식)"""
+    url = REPORT_URL.format(code=code)
+    response = upstream_health.call("fnguide", fetch_checked, url, headers=request_headers(code), timeout=10)
+    # UTF-8 BOM이 붙어 오는 경우가 있어 utf-8-sig로 직접 디코딩
+    data = json.loads(response.content.decode("utf-8-sig"))
+    return parse_reports(data)
+
+
+class ReportStore:
+    def __init__(self, path=None):
+        self.path = path or data_path("reports.json")
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        self._flushed_at = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report-refresh")
+        self._task = None
+        self.last_harvest = None
+
+    def load_from_disk(self):
+        data = read_json(self.path, {})
+        if data:
+            self._entries = data
+            logger.info("리포트 저장소 디스크에서 로드: %s개 종목", len(data))
+
+    # ---- 조회 ----
+    def get(self, code: str):
+        """{"reports": [...], "fetched_at": epoch초} 또는 None"""
+        return self._entries.get(code)
+
+    @staticmethod
+    def is_stale(entry, ttl=REPORT_TTL):
+        return entry is None or time.time() - entry.get("fetched_at", 0) >= ttl
+
+    # ---- 갱신 ----
+    def refresh(self, code: str):
+        """업스트림에서 받아 저장 (같은 종목 동시 갱신은 한 번만)"""
+        return upstream_flight.do(("report", code), self._refresh, code)
+
+    def _refresh(self, code):
+        reports = fetch_reports(code)
+        with self._lock:
+            self._entries[code] = {"reports": reports, "fetched_at": time.time()}
+            self._dirty = True
+        self.flush()
+        return reports
+
+    def refresh_in_background(self, code: str):
+        def run():
+            try:
+                self.refresh(code)
+            except Exception as e:
+                logger.warning("리포트 백그라운드 갱신 실패 (%s): %s", code, e)
+        self._executor.submit(run)
+
+    def flush(self, force=False):
+        with self._lock:
+            if not self._dirty or (not force and time.monotonic() - self._flushed_at < FLUSH_INTERVAL):
+                return
+            snapshot = dict(self._entries)
+            self._dirty = False
+            self._flushed_at = time.monotonic()
+        write_json_atomic(self.path, snapshot)
+
+    # ---- 백그라운드 수집 ----
+    def stale_codes(self, codes):
+        return [code for code in codes if self.is_stale(self._entries.get(code))]
+
+    async def harvest(self, codes):
+        """오래된 종목만 HARVEST_CONCURRENCY개씩, 요청마다 HARVEST_DELAY 간격을 두고 수집"""
+        queue = asyncio.Queue()
+        for code in self.stale_codes(codes):
+            queue.put_nowait(code)
+        total = queue.qsize()
+        done = failed = 0
+
+        async def worker():
+            nonlocal done, failed
+            while True:
+                try:
+                    code = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                # fnguide가 차단 중이면 다시 시도할 수 있을 때까지 대기
+                while upstream_health.is_open("fnguide"):
+                    await asyncio.sleep(upstream_health.breaker("fnguide").status()["retry_in"] or 1)
+                try:
+                    await asyncio.to_thread(self.refresh, code)
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    logger.warning("리포트 수집 실패 (%s): %s", code, e)
+                await asyncio.sleep(HARVEST_DELAY)
+
+        if total:
+            logger.debug("리포트 수집 시작: %s개 종목", total)
+            await asyncio.gather(*(worker() for _ in range(min(HARVEST_CONCURRENCY, total))))
+            await asyncio.to_thread(self.flush, True)
+            logger.info("리포트 수집 완료: 성공 %s개, 실패 %s개", done, failed)
+        self.last_harvest = {"at": time.time(), "targets": total, "succeeded": done, "failed": failed}
+
+    async def _loop(self, codes_fn):
+        while True:
+            codes = None
+            try:
+                codes = await asyncio.to_thread(codes_fn)
+                if codes:
+                    await self.harvest(codes)
+                else:
+                    logger.warning("리포트 수집 대상 종목 없음 (종목 인덱스 대기)")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("리포트 수집 루프 오류: %s", e)
+            # 종목 인덱스가 아직 없으면 짧게 기다렸다 다시
+            await asyncio.sleep(HARVEST_INTERVAL if codes else 60)
+
+    def start(self, codes_fn):
+        """codes_fn: 수집할 종목코드(A005930 형식) 목록을 돌려주는 함수"""
+        if self._task is None and HARVEST_ENABLED:
+            self._task = asyncio.get_running_loop().create_task(self._loop(codes_fn))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush, True)
+
+    def status(self):
+        entries = list(self._entries.values())
+        stale = sum(1 for entry in entries if self.is_stale(entry))
+        return {
+            "codes": len(entries),
+            "stale": stale,
+            "running": self._task is not None and not self._task.done(),
+            "last_harvest": self.last_harvest,
+        }
+
+
+# 앱 전체에서 공유하는 리포트 저장소
+report_store = ReportStore()
+report_store.load_from_disk()
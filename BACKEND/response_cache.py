@@ -0,0 +1,226 @@
+"""업스트림 응답용 인프로세스 캐시 (TTL + LRU + stale-while-revalidate)
+
+엔드포인트 이름과 인자를 키로 사용한다. TTL이 지난 항목은 stale 구간 동안 그대로 응답하고,
+키마다 한 번만 백그라운드 갱신을 돌린다. 전체 항목 수/추정 바이트가 상한을 넘으면
+가장 오래 쓰이지 않은 항목부터 제거한다.
+"""
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import deadline
+from singleflight import upstream_flight
+
+logger = logging.getLogger(__name__)
+
+
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class _Entry:
+    __slots__ = ("value", "size", "fresh_until", "stale_until")
+
+    def __init__(self, value, size, fresh_until, stale_until):
+        self.value = value
+        self.size = size
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+def _estimate_size(value):
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str))
+    except Exception:
+        return len(repr(value))
+
+
+def make_key(namespace, args, kwargs):
+    return f"{namespace}:{args!r}:{sorted(kwargs.items())!r}"
+
+
+class ResponseCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._refreshing = set()
+        self._tasks = set()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # namespace -> [hits, stale_hits, misses]
+        self._by_namespace = {}
+
+    # ---- 기본 저장소 연산 ----
+    def lookup(self, key):
+        """(값, 신선 여부) 반환. 없거나 stale 구간까지 지났으면 (None, False)"""
+        now = time.monotonic()
+        namespace = key.split(":", 1)[0]
+        with self._lock:
+            counts = self._by_namespace.get(namespace)
+            if counts is None:
+                counts = self._by_namespace[namespace] = [0, 0, 0]
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                counts[2] += 1
+                return None, False
+            if now >= entry.stale_until:
+                self._remove(key)
+                self.misses += 1
+                counts[2] += 1
+                return None, False
+            self._entries.move_to_end(key)
+            if now < entry.fresh_until:
+                self.hits += 1
+                counts[0] += 1
+                return entry, True
+            self.stale_hits += 1
+            counts[1] += 1
+            return entry, False
+
+    def store(self, key, value, ttl, stale_ttl=0):
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, size, now + ttl, now + ttl + stale_ttl)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, prefix=""):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+    def namespace_stats(self):
+        """{namespace: {"hits", "stale_hits", "misses"}}"""
+        with self._lock:
+            return {
+                namespace: {"hits": hits, "stale_hits": stale, "misses": misses}
+                for namespace, (hits, stale, misses) in self._by_namespace.items()
+            }
+
+    # ---- 백그라운드 갱신 ----
+    def _claim_refresh(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _release_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    # ---- 데코레이터 ----
+    def cached(self, namespace: str, ttl: float, stale_ttl: float = 0, cache_if=bool):
+        """함수 결과를 캐시. cache_if가 False인 결과(빈 리스트, fallback 등)는 저장하지 않음"""
+
+        def decorator(func):
+            def should_store(value):
+                return cache_if is None or cache_if(value)
+
+            if inspect.iscoroutinefunction(func):
+                async def refresh_async(key, args, kwargs):
+                    try:
+                        # 태스크는 요청 컨텍스트를 복사하므로 요청 예산을 풀고 끝까지 갱신
+                        with deadline.unbounded():
+                            value = await func(*args, **kwargs)
+                        if should_store(value):
+                            self.store(key, value, ttl, stale_ttl)
+                    except Exception as e:
+                        logger.warning("캐시 백그라운드 갱신 실패 (%s): %s", namespace, e)
+                    finally:
+                        self._release_refresh(key)
+
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    key = make_key(namespace, args, kwargs)
+                    entry, fresh = self.lookup(key)
+                    if entry is not None:
+                        if not fresh and self._claim_refresh(key):
+                            task = asyncio.get_running_loop().create_task(refresh_async(key, args, kwargs))
+                            self._tasks.add(task)
+                            task.add_done_callback(self._tasks.discard)
+                        return entry.value
+                    # 동시에 들어온 같은 키의 miss는 한 번만 업스트림 호출
+                    return await upstream_flight.do_async(key, load_async, key, args, kwargs)
+
+                async def load_async(key, args, kwargs):
+                    value = await func(*args, **kwargs)
+                    if should_store(value):
+                        self.store(key, value, ttl, stale_ttl)
+                    return value
+
+                return async_wrapper
+
+            def refresh_sync(key, args, kwargs):
+                try:
+                    value = func(*args, **kwargs)
+                    if should_store(value):
+                        self.store(key, value, ttl, stale_ttl)
+                except Exception as e:
+                    logger.warning("캐시 백그라운드 갱신 실패 (%s): %s", namespace, e)
+                finally:
+                    self._release_refresh(key)
+
+            @functools.wraps(func)
+            def sync_wrapper(*args, **kwargs):
+                key = make_key(namespace, args, kwargs)
+                entry, fresh = self.lookup(key)
+                if entry is not None:
+                    if not fresh and self._claim_refresh(key):
+                        self._executor.submit(refresh_sync, key, args, kwargs)
+                    return entry.value
+                # 동시에 들어온 같은 키의 miss는 한 번만 업스트림 호출
+                return upstream_flight.do(key, load_sync, key, args, kwargs)
+
+            def load_sync(key, args, kwargs):
+                value = func(*args, **kwargs)
+                if should_store(value):
+                    self.store(key, value, ttl, stale_ttl)
+                return value
+
+            return sync_wrapper
+
+        return decorator
+
+
+# 앱 전체에서 공유하는 캐시
+response_cache = ResponseCache()
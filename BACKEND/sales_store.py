@@ -0,0 +1,95 @@
+"""/sales/{name} 용 매출 데이터 저장소
+
+NICE 내수/수출 CSV는 4단계 groupby 결과를 종목별 레코드로 미리 나눠 두고,
+매출비중 chartjs JSON은 테이블 형태로 미리 변환해 둔다. 둘 다 종목명/종목코드로 조회한다.
+"""
+import json
+
+import pandas as pd
+
+from file_store import ReloadingFileStore
+
+
+NICE_CSV = "NICE_내수수출_코스피.csv"
+CHART_JSON = "매출비중_chartjs_데이터.json"
+SALES_COLUMNS = ['2022_12 매출액', '2023_12 매출액', '2024_12 매출액']
+
+
+def _code_key(code):
+    """95570 / '095570' / 'A095570' -> '095570'"""
+    text = str(code).strip().upper().lstrip("A")
+    return text.zfill(6) if text.isdigit() else text
+
+
+def load_nice_csv(path):
+    df = pd.read_csv(path, encoding="utf-8-sig")
+    grouped = df.groupby(['종목명', '사업부문', '매출품목명', '구분'])[SALES_COLUMNS].sum()
+
+    by_name = {}
+    for name, part in grouped.groupby(level=0):
+        by_name[name] = part.droplevel(0).reset_index().to_dict(orient="records")
+
+    code_to_name = {
+        _code_key(code): name
+        for code, name in df[['종목코드', '종목명']].drop_duplicates().itertuples(index=False)
+    }
+    return {"by_name": by_name, "code_to_name": code_to_name}
+
+
+def load_chart_json(path):
+    with open(path, encoding="utf-8") as f:
+        sales_data = json.load(f)
+
+    by_name = {}
+    code_to_name = {}
+    for item in sales_data:
+        name = item.get('종목명')
+        if not name:
+            continue
+        rows = []
+        if isinstance(item.get('data'), list):
+            for data_item in item['data']:
+                rows.append({
+                    '사업부문': '매출',
+                    '매출품목명': data_item.get('label', ''),
+                    '구분': '매출액',
+                    '2022_12 매출액': data_item.get('value', 0),
+                    '2023_12 매출액': data_item.get('value', 0),
+                    '2024_12 매출액': data_item.get('value', 0)
+                })
+        by_name[name] = rows
+        if item.get('종목코드'):
+            code_to_name[_code_key(item['종목코드'])] = name
+    return {"by_name": by_name, "code_to_name": code_to_name}
+
+
+class SalesStore:
+    def __init__(self):
+        self.nice = ReloadingFileStore(NICE_CSV, load_nice_csv)
+        self.chart = ReloadingFileStore(CHART_JSON, load_chart_json)
+
+    @staticmethod
+    def _find(index, key):
+        if not index:
+            return None
+        rows = index["by_name"].get(key)
+        if rows is None:
+            name = index["code_to_name"].get(_code_key(key))
+            rows = index["by_name"].get(name) if name else None
+        return rows
+
+    def lookup(self, key: str):
+        """종목명 또는 종목코드로 매출 레코드 조회. NICE 상세 데이터 우선, 없으면 매출비중 데이터"""
+        key = key.strip()
+        rows = self._find(self.nice.get(), key)
+        if rows is None:
+            rows = self._find(self.chart.get(), key)
+        return rows
+
+    def warm_up(self):
+        self.nice.get()
+        self.chart.get()
+
+
+# 앱 전체에서 공유하는 매출 저장소
+sales_store = SalesStore()
@@ -0,0 +1,118 @@
+"""보물찾기 스크리너
+
+기업 스냅샷을 (기업 수 × 연도) NumPy 행렬로 바꿔 두고, PER/PBR/ROE/시가총액/업종 조건을
+벡터 마스크로 한 번에 평가한다. 행 데이터는 /api/treasure와 같은 모양으로 미리 만들어 둔다.
+"""
+import numpy as np
+
+
+YEARS = ["2022", "2023", "2024"]
+METRICS = ["PER", "PBR", "ROE", "시가총액", "지배주주지분", "지배주주순이익"]
+# 보물찾기 화면과 동일하게: 세 지표 중 하나라도 기준값이 없거나 0이면 제외
+CORE_METRICS = ["PER", "PBR", "ROE"]
+
+# 지배주주지분/지배주주순이익 필드명이 다른 경우를 대비한 대안 키
+ALT_KEYS = {
+    "지배주주지분": ["지배주주", "지배주주지분율", "주주지분"],
+    "지배주주순이익": ["지배주주순이익률", "순이익", "당기순이익"],
+}
+
+
+def metric_value(지표: dict, year: str, metric: str):
+    value = 지표.get(f"{year}/12_{metric}")
+    if value is None:
+        for alt in ALT_KEYS.get(metric, []):
+            value = 지표.get(f"{year}/12_{alt}")
+            if value is not None:
+                break
+    return value
+
+
+def build_treasure_rows(docs):
+    """/api/treasure 응답 행 (기업별 연도 dict)"""
+    result = []
+    for doc in docs:
+        지표 = doc.get("지표") or {}
+        row = {
+            "기업명": doc.get("기업명", "알 수 없음"),
+            "업종명": doc.get("업종명", "알 수 없음"),
+        }
+        for metric in METRICS:
+            row[metric] = {year: metric_value(지표, year, metric) for year in YEARS}
+        result.append(row)
+    return result
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class ScreenerSnapshot:
+    def __init__(self, rows):
+        self.rows = rows
+        self.names = np.array([row["기업명"] for row in rows], dtype=object)
+        self.sectors = np.array([row["업종명"] for row in rows], dtype=object)
+        # metric -> (기업 수, 연도 수) float 행렬, 값이 없으면 NaN
+        self.values = {
+            metric: np.array([[_to_float(row[metric][year]) for year in YEARS] for row in rows],
+                             dtype=np.float64).reshape(len(rows), len(YEARS))
+            for metric in METRICS
+        }
+        # 연도 평균 (모두 NaN이면 NaN)
+        self.averages = {}
+        for metric, matrix in self.values.items():
+            counts = np.sum(~np.isnan(matrix), axis=1)
+            sums = np.nansum(matrix, axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                self.averages[metric] = np.where(counts > 0, sums / counts, np.nan)
+        self.industries = sorted({s for s in self.sectors if isinstance(s, str)})
+
+    def column(self, metric: str, basis: str):
+        """basis: 'avg'(3개년 평균) 또는 연도 문자열"""
+        if basis == "avg":
+            return self.averages[metric]
+        return self.values[metric][:, YEARS.index(basis)]
+
+    def screen(self, ranges: dict, sectors=None, basis="avg", require_valid=True, allow_zero=False,
+               sort=None, order="asc", offset=0, limit=50):
+        """require_valid: PER/PBR/ROE 기준값이 없으면 제외 (allow_zero가 아니면 0도 제외)"""
+        n = len(self.rows)
+        mask = np.ones(n, dtype=bool)
+
+        if require_valid:
+            for metric in CORE_METRICS:
+                col = self.column(metric, basis)
+                mask &= ~np.isnan(col)
+                if not allow_zero:
+                    mask &= col != 0
+
+        for metric, (low, high) in ranges.items():
+            col = self.column(metric, basis)
+            with np.errstate(invalid="ignore"):
+                if low is not None:
+                    mask &= col >= low
+                if high is not None:
+                    mask &= col <= high
+
+        if sectors:
+            mask &= np.isin(self.sectors, list(sectors))
+
+        matched = np.flatnonzero(mask)
+        if sort:
+            if sort == "기업명":
+                keys = self.names[matched].astype(str)
+                ordering = np.argsort(keys, kind="stable")
+                if order == "desc":
+                    ordering = ordering[::-1]
+            else:
+                keys = self.column(sort, basis)[matched]
+                # NaN은 정렬 방향과 관계없이 맨 뒤로
+                keys = np.where(np.isnan(keys), np.inf, -keys if order == "desc" else keys)
+                ordering = np.argsort(keys, kind="stable")
+            matched = matched[ordering]
+
+        page = matched[offset:offset + limit]
+        return int(matched.size), [self.rows[i] for i in page]
@@ -0,0 +1,99 @@
+"""동일한 업스트림 호출을 하나로 합치는 single-flight 레이어
+
+같은 키로 동시에 들어온 호출 중 첫 번째만 실제로 실행하고,
+나머지는 그 결과(또는 예외)를 함께 받는다. 완료되면 키는 즉시 해제된다.
+기다리는 쪽은 자기 요청 시간 예산만큼만 기다리고, 넘으면 DeadlineExceeded로 다음 fallback으로 넘어간다.
+"""
+import asyncio
+import threading
+
+import deadline
+from deadline import DeadlineExceeded
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """동기 함수용 (FastAPI 스레드풀에서 실행되는 핸들러)"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            # 리더가 예산 없는 작업(스케줄러 등)이어도 대기는 이 요청의 예산까지만
+            if not call.event.wait(deadline.remaining()):
+                raise DeadlineExceeded(f"요청 시간 예산 초과 (공유 호출 대기: {key})")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """코루틴 함수용 (이벤트 루프 안에서만 사용)"""
+        future = self._async_calls.get(key)
+        if future is not None:
+            self.shared += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout=deadline.remaining())
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"요청 시간 예산 초과 (공유 호출 대기: {key})") from None
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_calls[key] = future
+        self.executed += 1
+        try:
+            result = await fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # 대기자가 없으면 "exception was never retrieved" 경고 방지
+            future.exception()
+            raise
+        finally:
+            self._async_calls.pop(key, None)
+
+    def stats(self):
+        return {
+            "in_flight": len(self._calls) + len(self._async_calls),
+            "executed": self.executed,
+            "shared": self.shared,
+        }
+
+
+# 앱 전체에서 공유하는 업스트림 호출 합치기
+upstream_flight = SingleFlight()
@@ -0,0 +1,32 @@
+"""로컬 디스크 캐시 경로와 JSON 저장 헬퍼
+
+재시작 후에도 재사용할 인덱스/스냅샷은 DATA_DIR 아래에 저장한다.
+"""
+import json
+import os
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv("LOCAL_DATA_DIR", os.path.join(BASE_DIR, "data_cache"))
+
+
+def data_path(*parts):
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def write_json_atomic(path, data):
+    """임시 파일에 쓴 뒤 교체해서, 쓰는 도중 죽어도 기존 파일이 깨지지 않게 저장"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def read_json(path, default=None):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chart_series import close_records, downsample_records, lttb_indices
+
+
+def _records(closes):
+    return [{"Date": str(i), "Close": c} for i, c in enumerate(closes)]
+
+
+@pytest.mark.parametrize("size, n", [(10, 3), (100, 7), (1000, 50), (1001, 500), (5, 4)])
+def test_lttb_keeps_endpoints_and_bucket_count(size, n):
+    y = np.sin(np.linspace(0, 20, size))
+    picked = lttb_indices(y, n)
+    assert len(picked) == n
+    assert picked[0] == 0 and picked[-1] == size - 1
+    # 오름차순, 중복 없음
+    assert np.all(np.diff(picked) > 0)
+
+
+def test_lttb_picks_one_point_per_bucket():
+    size, n = 102, 12
+    picked = lttb_indices(np.random.default_rng(0).normal(size=size), n)
+    every = (size - 2) / (n - 2)
+    for i, index in enumerate(picked[1:-1]):
+        lo, hi = int(np.floor(i * every)) + 1, int(np.floor((i + 1) * every)) + 1
+        assert lo <= index < hi
+
+
+def test_lttb_keeps_spike():
+    y = np.zeros(200)
+    y[123] = 50.0
+    assert 123 in lttb_indices(y, 10)
+
+
+def test_lttb_returns_everything_when_n_is_large_or_tiny():
+    assert lttb_indices([1.0, 2.0, 3.0], 10).tolist() == [0, 1, 2]
+    assert lttb_indices([1.0, 2.0, 3.0, 4.0], 2).tolist() == [0, 1, 2, 3]
+
+
+def test_downsample_records_passthrough():
+    records = _records([1.0, 2.0, 3.0])
+    assert downsample_records(records, None) is records
+    assert downsample_records(records, 5) is records
+
+
+def test_downsample_records_skips_missing_closes():
+    closes = [float(i) for i in range(40)]
+    closes[0] = None
+    closes[10] = float("nan")
+    closes[20] = float("inf")
+    closes[39] = None
+    out = downsample_records(_records(closes), 6)
+    assert len(out) == 6
+    assert all(isinstance(r["Close"], float) and np.isfinite(r["Close"]) for r in out)
+    # 유효한 첫/마지막 점이 양 끝
+    assert out[0]["Date"] == "1" and out[-1]["Date"] == "38"
+
+
+def test_close_records():
+    dates = pd.to_datetime(["2024-01-02", "2024-01-03"]).strftime("%Y-%m-%d")
+    assert close_records(dates, np.array([[100], [101.5]])) == [
+        {"Date": "2024-01-02", "Close": 100.0},
+        {"Date": "2024-01-03", "Close": 101.5},
+    ]
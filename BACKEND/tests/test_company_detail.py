@@ -0,0 +1,85 @@
+import copy
+
+import pytest
+
+from company_detail import detail_pipeline
+from company_store import merge_metrics
+
+MISSING = object()
+
+
+def _baseline(base):
+    """집계 도입 전 /company/{name}의 '지'/'표' 통합 (main.py 원본 로직)"""
+    if "지표" in base:
+        pass
+    elif "지" in base and "표" in base:
+        지표_데이터 = {}
+        if isinstance(base.get("지"), dict):
+            지표_데이터.update(base["지"])
+        if isinstance(base.get("표"), dict):
+            지표_데이터.update(base["표"])
+        base["지표"] = 지표_데이터
+    return base
+
+
+def _evaluate(expr, doc):
+    """$addFields 식에 쓰인 연산자만 해석하는 작은 평가기"""
+    if isinstance(expr, str):
+        if expr == "$$REMOVE":
+            return MISSING
+        return doc.get(expr[1:], MISSING) if expr.startswith("$") else expr
+    if isinstance(expr, list):
+        return [_evaluate(e, doc) for e in expr]
+    if not isinstance(expr, dict) or not expr:
+        return expr
+    (op, args), = expr.items()
+    if op == "$cond":
+        return _evaluate(args[1] if _evaluate(args[0], doc) else args[2], doc)
+    values = _evaluate(args, doc)
+    if op == "$type":
+        if values is MISSING:
+            return "missing"
+        return "object" if isinstance(values, dict) else "null" if values is None else "other"
+    if op == "$eq":
+        return values[0] == values[1]
+    if op == "$ne":
+        return values[0] != values[1]
+    if op == "$and":
+        return all(values)
+    if op == "$mergeObjects":
+        merged = {}
+        for value in values:
+            merged.update(value)
+        return merged
+    raise AssertionError(f"평가기에 없는 연산자: {op}")
+
+
+def _pipeline_metrics(doc):
+    add_fields = next(stage["$addFields"] for stage in detail_pipeline(["가"]) if "$addFields" in stage)
+    result = dict(doc)
+    for field in ("지표", "지", "표"):
+        if field in add_fields:
+            value = _evaluate(add_fields[field], doc)
+            if value is MISSING:
+                result.pop(field, None)
+            else:
+                result[field] = value
+    return result
+
+
+DOCS = [
+    {"기업명": "가", "지표": {"2024/12_PER": 10}},
+    {"기업명": "가", "지표": None, "지": {"a": 1}, "표": {"b": 2}},
+    {"기업명": "가", "지": {"a": 1, "c": 3}, "표": {"b": 2, "c": 4}},
+    {"기업명": "가", "지": {"a": 1}, "표": "없음"},
+    {"기업명": "가", "지": {"a": 1}},
+    {"기업명": "가", "표": {"b": 2}},
+    {"기업명": "가"},
+]
+
+
+@pytest.mark.parametrize("doc", DOCS)
+def test_metrics_merge_matches_baseline(doc):
+    expected = _baseline(copy.deepcopy(doc))
+    assert merge_metrics(copy.deepcopy(doc)) == expected
+    assert _pipeline_metrics(copy.deepcopy(doc)) == expected
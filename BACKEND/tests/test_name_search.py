@@ -0,0 +1,66 @@
+import pytest
+
+from name_search import NameSearchIndex, chosung, normalize
+
+
+NAMES = [
+    "삼성전자", "삼성전자우", "삼성SDI", "SK하이닉스", "NAVER", "LG전자", "LG화학",
+    "카카오", "카카오뱅크", "현대차", "한국전자금융",
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return NameSearchIndex(NAMES)
+
+
+def test_normalize_and_chosung():
+    assert normalize(" LG 화학 ") == "lg화학"
+    assert chosung("삼성전자") == "ㅅㅅㅈㅈ"
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("삼성전자", "삼성전자"),      # 정확히 일치
+    ("lg 화학", "LG화학"),         # 공백/대소문자 무시
+    ("네이버", "NAVER"),           # 영문 약칭의 한글 표기
+    ("엘지전자", "LG전자"),
+    ("삼전", "삼성전자"),          # 별칭
+    ("하이닉스", "SK하이닉스"),
+    ("ㅅㅅㅈㅈ", "삼성전자"),      # 초성
+    ("삼송전자", "삼성전자"),      # 오타
+])
+def test_best_match(index, query, expected):
+    assert index.best_match(query) == expected
+
+
+def test_exact_match_beats_longer_prefix_matches(index):
+    results = index.search("카카오")
+    assert [r["기업명"] for r in results] == ["카카오", "카카오뱅크"]
+    assert [r["match"] for r in results] == ["exact", "prefix"]
+
+
+def test_match_kinds_are_ranked_by_score(index):
+    # 정확(100) > 접두(80), 같은 점수는 짧은 이름 먼저
+    results = index.search("삼성전자")
+    assert [(r["기업명"], r["match"]) for r in results] == [("삼성전자", "exact"), ("삼성전자우", "prefix")]
+
+    results = index.search("삼성")
+    assert [r["기업명"] for r in results] == ["삼성전자", "삼성SDI", "삼성전자우"]
+
+    results = index.search("전자")
+    assert {r["match"] for r in results} == {"substring"}
+    assert [r["기업명"] for r in results] == ["LG전자", "삼성전자", "삼성전자우", "한국전자금융"]
+
+
+def test_fuzzy_only_when_nothing_else_matches(index):
+    results = index.search("삼송전자")
+    assert results[0]["match"] == "fuzzy"
+    assert results[0]["score"] > results[1]["score"]
+    # 정확/접두 결과가 있으면 오타 후보는 섞이지 않음
+    assert all(r["match"] != "fuzzy" for r in index.search("삼성"))
+
+
+def test_limit_and_no_match(index):
+    assert len(index.search("삼성", limit=2)) == 2
+    assert index.search("") == []
+    assert index.best_match("zzz") is None
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import price_store as module
+from price_store import RECORD, PriceStore
+from ticker_index import TickerIndex
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    index = TickerIndex(path=str(tmp_path / "ticker_index.json"))
+    index._install([{"code": "005930", "name": "삼성전자", "market": "KOSPI", "sector": "전기·전자"}], "20240102")
+    monkeypatch.setattr(module, "ticker_index", index)
+    monkeypatch.setattr(module, "last_closed_date", lambda: 20240105)
+    store = PriceStore()
+    monkeypatch.setattr(store, "path", lambda ticker: str(tmp_path / f"{ticker}.bin"))
+    store.seeded = []
+    monkeypatch.setattr(store, "_seed_in_background", store.seeded.append)
+    store.index = index
+    return store
+
+
+def test_unknown_codes_are_not_seeded(store):
+    store.ensure("999999")
+    assert store.seeded == [] and store._locks == {} and store._synced_for == {}
+
+
+def test_nothing_is_seeded_before_index_is_built(store):
+    store.index.built_for = None
+    store.ensure("005930")
+    assert store.seeded == []
+
+
+def test_listed_code_is_seeded(store):
+    store.ensure("005930")
+    assert store.seeded == ["005930"]
+
+
+def test_sync_runs_once_per_closed_date(store, monkeypatch):
+    records = np.zeros(1, dtype=RECORD)
+    records["date"], records["close"] = 20240104, 100.0
+    store._append("005930", records)
+    calls = []
+    monkeypatch.setattr(store, "_sync", lambda ticker: calls.append(ticker) or 0)
+
+    store.ensure("005930")
+    store.ensure("005930")
+    assert calls == ["005930"]
+
+    # 다음 확정 거래일이 되면 다시 확인
+    monkeypatch.setattr(module, "last_closed_date", lambda: 20240108)
+    store.ensure("005930")
+    assert calls == ["005930", "005930"]
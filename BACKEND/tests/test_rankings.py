@@ -0,0 +1,55 @@
+import pandas as pd
+
+from rankings import RankingEngine, numeric
+
+METRICS = ["매출액", "DPS", "영업이익률"]
+REQUIRED = [(metric, "2024") for metric in METRICS]
+
+
+def _baseline_top5(docs):
+    """엔진 도입 전 /rankings/ 계산 (세 키가 모두 있는 기업, pd.to_numeric coerce, nlargest)"""
+    keys = [f"2024/12_{metric}" for metric in METRICS]
+    rows = [
+        {"기업명": doc["기업명"], **{metric: doc["지표"][key] for metric, key in zip(METRICS, keys)}}
+        for doc in docs
+        if all(key in doc.get("지표", {}) for key in keys)
+    ]
+    df = pd.DataFrame(rows)
+    for col in METRICS:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return {
+        metric: [(r["기업명"], r[metric]) for r in df.nlargest(5, metric)[["기업명", metric]].to_dict(orient="records")]
+        for metric in METRICS
+    }
+
+
+def _doc(name, 매출액=None, DPS=None, 영업이익률=None, extra=None):
+    지표 = dict(extra or {})
+    for metric, value in (("매출액", 매출액), ("DPS", DPS), ("영업이익률", 영업이익률)):
+        if value is not None:
+            지표[f"2024/12_{metric}"] = value
+    return {"기업명": name, "지표": 지표}
+
+
+def test_numeric_matches_to_numeric_coerce():
+    assert numeric("12") == 12 and numeric(" -3.5 ") == -3.5 and numeric("1e3") == 1000.0
+    assert numeric("1,234") is None and numeric("") is None and numeric("nan") is None
+    assert numeric(float("nan")) is None and numeric(True) is None and numeric(None) is None
+
+
+def test_main_page_rankings_match_baseline_population():
+    docs = [
+        _doc("가", 100, 5, 10.0),
+        _doc("나", "900", "7", "3.5"),            # 문자열 숫자도 기존처럼 순위에 포함
+        _doc("다", 5000, None, 90.0),             # 키가 하나 빠지면 기존처럼 제외
+        _doc("라", 300, "-", 20.0),               # 변환 불가 값은 그 지표에서만 제외
+        _doc("마", 200, 1, 5.0, extra={"2023/12_매출액": 99999}),
+        _doc("바", 50, 2, 1.0),
+        _doc("사", 10, 3, 2.0),
+    ]
+    engine = RankingEngine(k_max=3)
+    engine.sync(docs, version=1)
+
+    expected = _baseline_top5(docs)
+    for metric in METRICS:
+        assert engine.top_among(metric, "2024", 5, REQUIRED) == expected[metric]
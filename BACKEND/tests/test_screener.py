@@ -0,0 +1,25 @@
+from screener import YEARS, ScreenerSnapshot
+
+
+def _row(name, sector, value):
+    row = {"기업명": name, "업종명": sector}
+    for metric in ["PER", "PBR", "ROE", "시가총액", "지배주주지분", "지배주주순이익"]:
+        row[metric] = {year: value for year in YEARS}
+    return row
+
+
+def test_sector_names_with_commas_match_as_one_sector():
+    snapshot = ScreenerSnapshot([
+        _row("가", "농업, 임업 및 어업", 5.0),
+        _row("나", "농업", 5.0),
+        _row("다", "제조업", 5.0),
+    ])
+    total, items = snapshot.screen({}, sectors=["농업, 임업 및 어업"])
+    assert total == 1 and items[0]["기업명"] == "가"
+
+
+def test_zero_averages_are_kept_only_with_allow_zero():
+    snapshot = ScreenerSnapshot([_row("가", "제조업", 1.0), _row("나", "제조업", 0), _row("다", "제조업", None)])
+    assert snapshot.screen({})[0] == 1
+    assert snapshot.screen({}, allow_zero=True)[0] == 2
+    assert snapshot.screen({}, require_valid=False)[0] == 3
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import deadline
+from deadline import DeadlineExceeded
+from singleflight import SingleFlight
+
+
+def _run_concurrently(flight, key, fn, followers=3):
+    """리더 하나가 fn 안에서 멈춰 있는 동안 followers개가 같은 키로 합류"""
+    release = threading.Event()
+    outcomes = [None] * (followers + 1)
+
+    def blocked():
+        release.wait(5)
+        return fn()
+
+    def worker(i):
+        try:
+            outcomes[i] = ("ok", flight.do(key, blocked))
+        except Exception as e:
+            outcomes[i] = ("error", e)
+
+    threads = [threading.Thread(target=worker, args=(0,))]
+    threads[0].start()
+    while key not in flight._calls:
+        time.sleep(0.001)
+    threads += [threading.Thread(target=worker, args=(i,)) for i in range(1, followers + 1)]
+    for t in threads[1:]:
+        t.start()
+    while flight._calls[key].waiters < followers:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join(5)
+    return outcomes
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"price": 100}
+
+    outcomes = _run_concurrently(flight, "005930", fetch)
+
+    assert len(calls) == 1
+    assert all(kind == "ok" for kind, _ in outcomes)
+    # 대기자는 리더와 같은 결과 객체를 받음
+    assert all(result is outcomes[0][1] for _, result in outcomes)
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "shared": 3}
+
+
+def test_error_is_shared_with_waiters_and_key_released():
+    flight = SingleFlight()
+    error = ValueError("upstream down")
+
+    def fail():
+        raise error
+
+    outcomes = _run_concurrently(flight, "kospi", fail)
+
+    assert [kind for kind, _ in outcomes] == ["error"] * 4
+    assert all(e is error for _, e in outcomes)
+    # 실패 후 키가 해제되어 다음 호출은 새로 실행
+    assert flight.do("kospi", lambda: "recovered") == "recovered"
+    assert flight.stats()["executed"] == 2
+
+
+def test_async_waiters_share_error():
+    flight = SingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("daum timeout")
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("news", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_different_keys_do_not_share():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    with pytest.raises(KeyError):
+        flight.do("c", lambda: {}["missing"])
+    assert flight.stats() == {"in_flight": 0, "executed": 3, "shared": 0}
+
+
+def test_follower_gives_up_at_its_own_deadline():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("slow", lambda: release.wait(5)))
+    leader.start()
+    while "slow" not in flight._calls:
+        time.sleep(0.001)
+
+    token = deadline.start(0.05)
+    started = time.monotonic()
+    try:
+        with pytest.raises(DeadlineExceeded):
+            flight.do("slow", lambda: None)
+    finally:
+        deadline.reset(token)
+    # 예산 없는 리더를 끝까지 기다리지 않음
+    assert time.monotonic() - started < 1
+    release.set()
+    leader.join(5)
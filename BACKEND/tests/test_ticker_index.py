@@ -0,0 +1,41 @@
+import pytest
+
+from ticker_index import TickerIndex, normalize_code
+
+
+RECORDS = [
+    {"code": "005930", "name": "삼성전자", "market": "KOSPI", "sector": "전기·전자"},
+    {"code": "035720", "name": "카카오", "market": "KOSPI", "sector": "서비스업"},
+]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("005930", "005930"),
+    ("A005930", "005930"),
+    ("005930.KS", "005930"),
+    ("../x", None),
+    ("삼성전자", None),
+    ("", None),
+])
+def test_normalize_code(value, expected):
+    assert normalize_code(value) == expected
+
+
+def test_known_code_before_index_is_built(tmp_path):
+    # 재시작 직후(빈 data_cache)나 스케줄러가 꺼진 경우: 코드 형태면 받아들임
+    index = TickerIndex(path=str(tmp_path / "ticker_index.json"))
+    index.load_from_disk()
+    assert index.built_for is None
+    assert index.known_code("005930") == "005930"
+    assert index.known_code("A000660") == "000660"
+    assert index.known_code("../../etc") is None
+    assert index.known_code("삼성전자") is None
+
+
+def test_known_code_after_index_is_built(tmp_path):
+    index = TickerIndex(path=str(tmp_path / "ticker_index.json"))
+    index._install(RECORDS, "20240102")
+    assert index.known_code("005930") == "005930"
+    assert index.known_code("카카오") == "035720"
+    # 인덱스가 있으면 없는 코드는 거절
+    assert index.known_code("999999") is None
@@ -0,0 +1,130 @@
+"""종목 메타데이터 인덱스 (종목코드 ↔ 종목명 ↔ 시장 ↔ 업종명)
+
+거래일마다 한 번 pykrx 업종분류 현황(시장당 1회 호출)으로 만들고 메모리에 보관한다.
+디스크에도 저장해서 재시작 직후에는 바로 이전 인덱스를 사용한다.
+"""
+import logging
+import threading
+from datetime import datetime
+
+from pykrx import stock
+
+from storage import data_path, read_json, write_json_atomic
+from upstream_health import upstream_health
+
+logger = logging.getLogger(__name__)
+
+
+MARKETS = ("KOSPI", "KOSDAQ")
+INDEX_PATH = data_path("ticker_index.json")
+
+
+def normalize_code(value: str):
+    """A005930 / 005930.KS / 005930 -> 005930 (코드 형태가 아니면 None)"""
+    if not value:
+        return None
+    value = value.strip().upper()
+    if value.endswith(".KS") or value.endswith(".KQ"):
+        value = value[:-3]
+    if len(value) == 7 and value.startswith("A"):
+        value = value[1:]
+    if len(value) == 6 and value.isalnum() and value[0].isdigit():
+        return value
+    return None
+
+
+class TickerIndex:
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.built_for = None
+        self._by_code = {}
+        self._by_name = {}
+
+    def _install(self, records, built_for):
+        by_code = {r["code"]: r for r in records}
+        by_name = {r["name"]: r["code"] for r in records}
+        # 참조 교체만으로 갱신 (읽기 쪽은 락 없이 조회)
+        self._by_code, self._by_name, self.built_for = by_code, by_name, built_for
+
+    def load_from_disk(self):
+        data = read_json(self.path)
+        if data and data.get("records"):
+            self._install(data["records"], data.get("built_for"))
+            logger.info("종목 인덱스 디스크에서 로드: %s개 (%s)", len(self._by_code), self.built_for)
+
+    def build(self, date: str):
+        records = []
+        for market in MARKETS:
+            df = upstream_health.call("pykrx", stock.get_market_sector_classifications, date, market)
+            if df is None or df.empty:
+                continue
+            for code, row in df.iterrows():
+                records.append({
+                    "code": code,
+                    "name": row["종목명"],
+                    "market": market,
+                    "sector": row["업종명"],
+                })
+        return records
+
+    def refresh_if_stale(self):
+        """오늘 날짜 기준으로 아직 안 만들었으면 재구축. 실패하면 기존 인덱스 유지"""
+        today = datetime.today().strftime("%Y%m%d")
+        if self.built_for == today:
+            return self.summary()
+        with self._lock:
+            if self.built_for == today:
+                return self.summary()
+            date = upstream_health.call("pykrx", stock.get_nearest_business_day_in_a_week, today)
+            records = self.build(date)
+            if records:
+                self._install(records, today)
+                write_json_atomic(self.path, {"built_for": today, "records": records})
+                logger.info("종목 인덱스 구축 완료: %s개", len(records))
+        return self.summary()
+
+    # ---- 조회 (O(1)) ----
+    def get(self, code: str):
+        return self._by_code.get(normalize_code(code) or code)
+
+    def name(self, code: str):
+        """인덱스에 없는 종목만 pykrx로 조회 후 기억"""
+        record = self.get(code)
+        if record:
+            return record["name"]
+        name = upstream_health.call("pykrx", stock.get_market_ticker_name, code)
+        if isinstance(name, str) and name:
+            self._by_code[code] = {"code": code, "name": name, "market": None, "sector": None}
+            self._by_name.setdefault(name, code)
+            return name
+        return None
+
+    def code_for_name(self, name: str):
+        return self._by_name.get(name.strip()) if name else None
+
+    def resolve(self, value: str):
+        """종목코드 또는 종목명을 6자리 종목코드로 변환 (모르면 None)"""
+        return normalize_code(value) or self.code_for_name(value)
+
+    def known_code(self, value: str):
+        """종목코드/종목명 -> 6자리 종목코드 (인덱스가 만들어진 뒤에는 인덱스에 없는 코드는 None)
+
+        재시작 직후나 pykrx 장애로 아직 인덱스가 없으면 코드 형태만 확인한다.
+        """
+        code = self.resolve(value)
+        if code is None or (self.built_for is not None and code not in self._by_code):
+            return None
+        return code
+
+    def codes(self, market: str = None):
+        """인덱스의 종목코드 목록 (market을 주면 해당 시장만)"""
+        return [code for code, r in list(self._by_code.items()) if market is None or r.get("market") == market]
+
+    def summary(self):
+        return {"built_for": self.built_for, "count": len(self._by_code)}
+
+
+# 앱 전체에서 공유하는 종목 인덱스
+ticker_index = TickerIndex()
+ticker_index.load_from_disk()
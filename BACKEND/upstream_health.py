@@ -0,0 +1,222 @@
+"""업스트림(pykrx, yfinance, fnguide, Daum)별 상태 레지스트리와 서킷 브레이커
+
+연속 실패가 FAILURE_THRESHOLD번이면 OPEN으로 바꿔 RESET_TIMEOUT 동안 호출 없이 바로 실패시키고,
+그 뒤 한 번만 시험 호출(HALF_OPEN)을 보내 성공하면 다시 CLOSED로 돌린다.
+hedged()는 같은 데이터를 주는 여러 후보를 시차를 두고 병렬로 보내 먼저 성공한 결과를 쓴다.
+요청 시간 예산(deadline)을 넘긴 호출은 업스트림 탓이 아니므로 실패로 세지 않는다.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import deadline
+from deadline import DeadlineExceeded, UpstreamBusy
+from metrics import observe_upstream, upstream_calls
+
+logger = logging.getLogger(__name__)
+
+
+FAILURE_THRESHOLD = int(os.getenv("UPSTREAM_FAILURE_THRESHOLD", "3"))
+RESET_TIMEOUT = float(os.getenv("UPSTREAM_RESET_TIMEOUT", "60"))
+SOURCES = ("pykrx", "yfinance", "fnguide", "daum")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class UpstreamUnavailable(Exception):
+    """서킷이 열려 있어 호출하지 않고 바로 실패"""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_error = None
+        self.last_failure_at = None
+        self.last_success_at = None
+        self.latency_ms = None
+
+    def allow(self):
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                # 시험 호출은 한 번에 하나만
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, elapsed):
+        with self._lock:
+            self.calls += 1
+            self.consecutive_failures = 0
+            self.state = CLOSED
+            self._probing = False
+            self.last_success_at = time.time()
+            # 지연은 지수 이동 평균
+            ms = elapsed * 1000
+            self.latency_ms = ms if self.latency_ms is None else round(self.latency_ms * 0.8 + ms * 0.2, 1)
+
+    def record_failure(self, error):
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"[:300]
+            self.last_failure_at = time.time()
+            self._probing = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning("업스트림 차단: %s (%s)", self.name, self.last_error)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """시험 호출이 예산 초과로 끝난 경우 다음 요청이 다시 시험할 수 있게"""
+        with self._lock:
+            self._probing = False
+
+    def status(self):
+        with self._lock:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)) if self.state == OPEN else 0.0
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "latency_ms": self.latency_ms,
+                "last_error": self.last_error,
+                "last_failure_at": self.last_failure_at,
+                "last_success_at": self.last_success_at,
+                "retry_in": round(retry_in, 1),
+            }
+
+
+class UpstreamHealth:
+    def __init__(self, sources=SOURCES):
+        self._breakers = {name: CircuitBreaker(name) for name in sources}
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedged")
+
+    def breaker(self, source: str):
+        breaker = self._breakers.get(source)
+        if breaker is None:
+            breaker = self._breakers.setdefault(source, CircuitBreaker(source))
+        return breaker
+
+    def is_open(self, source: str):
+        """차단 중이고 아직 시험 호출 시점도 안 됐으면 True (상태는 바꾸지 않음)"""
+        breaker = self.breaker(source)
+        return breaker.state == OPEN and time.monotonic() - breaker.opened_at < breaker.reset_timeout
+
+    def call(self, source: str, fn, *args, **kwargs):
+        """동기 호출 (서킷이 열려 있으면 UpstreamUnavailable, 예산이 없으면 DeadlineExceeded)"""
+        deadline.check(source)
+        breaker = self.breaker(source)
+        if not breaker.allow():
+            upstream_calls.inc(source, "rejected")
+            raise UpstreamUnavailable(f"{source} 일시 차단 중")
+        started = time.perf_counter()
+        try:
+            result = deadline.run_bounded(source, fn, *args, **kwargs)
+        except UpstreamBusy:
+            breaker.release_probe()
+            upstream_calls.inc(source, "rejected")
+            raise
+        except DeadlineExceeded:
+            breaker.release_probe()
+            observe_upstream(source, time.perf_counter() - started, "deadline")
+            raise
+        except Exception as e:
+            breaker.record_failure(e)
+            observe_upstream(source, time.perf_counter() - started, "failure")
+            raise
+        elapsed = time.perf_counter() - started
+        breaker.record_success(elapsed)
+        observe_upstream(source, elapsed)
+        return result
+
+    async def call_async(self, source: str, fn, *args, **kwargs):
+        deadline.check(source)
+        breaker = self.breaker(source)
+        if not breaker.allow():
+            upstream_calls.inc(source, "rejected")
+            raise UpstreamUnavailable(f"{source} 일시 차단 중")
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(fn(*args, **kwargs), timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            breaker.release_probe()
+            observe_upstream(source, time.perf_counter() - started, "deadline")
+            raise DeadlineExceeded(f"요청 시간 예산 초과 ({source})") from None
+        except Exception as e:
+            breaker.record_failure(e)
+            observe_upstream(source, time.perf_counter() - started, "failure")
+            raise
+        elapsed = time.perf_counter() - started
+        breaker.record_success(elapsed)
+        observe_upstream(source, elapsed)
+        return result
+
+    def hedged(self, candidates, stagger=1.0, timeout=20.0, accept=lambda result: result is not None):
+        """candidates: [(label, source, fn, args)] 우선순위 순.
+
+        앞 후보가 stagger초 안에 끝나지 않으면 다음 후보를 함께 보내고, accept를 통과한
+        첫 결과를 (label, result)로 반환한다. 모두 실패하거나 timeout(요청 예산 이내)이면 (None, None).
+        차단된 소스의 후보는 보내지 않고 건너뛴다.
+        """
+        if deadline.expired():
+            return None, None
+        until = time.monotonic() + deadline.timeout(timeout)
+        pending = {}
+        queue = [c for c in candidates if not self.is_open(c[1])]
+
+        def run(candidate):
+            label, source, fn, args = candidate
+            return self.call(source, fn, *args)
+
+        while queue or pending:
+            if queue:
+                candidate = queue.pop(0)
+                # 후보도 요청 예산 안에서 돌도록 context를 복사해 실행
+                pending[self._executor.submit(contextvars.copy_context().run, run, candidate)] = candidate[0]
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=min(stagger, remaining) if queue else remaining,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                label = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning("후보 실패: %s - %s", label, e)
+                    continue
+                if accept(result):
+                    return label, result
+        return None, None
+
+    def status(self):
+        abandoned = deadline.status()
+        return {name: {**breaker.status(), "abandoned": abandoned.get(name, 0)} for name, breaker in self._breakers.items()}
+
+
+# 앱 전체에서 공유하는 업스트림 상태 레지스트리
+upstream_health = UpstreamHealth()
@@ -1,10 +1,11 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import FinancialGraph from '../../FinancialGraph';
 import { API_ENDPOINTS } from '../../config/api';
 import './TreasureHuntRedesigned.css';
 
+const PAGE_SIZE = 100;
+
 function TreasureHuntRedesigned() {
-  const [data, setData] = useState([]);
   const [filtered, setFiltered] = useState([]);
   const [sortField, setSortField] = useState(null);
   const [sortOrder, setSortOrder] = useState('asc');
@@ -21,38 +22,60 @@ function TreasureHuntRedesigned() {
   const [treasureFound, setTreasureFound] = useState(false);
   const [foundCount, setFoundCount] = useState(0);
   const [loading, setLoading] = useState(true);
+  // 마지막 검색 조건 (더 보기는 슬라이더가 바뀌었어도 이 조건으로 다음 페이지를 받음)
+  const lastParams = useRef(null);
+
+  const fetchScreen = async (params, offset) => {
+    const query = new URLSearchParams(params);
+    query.set('limit', PAGE_SIZE);
+    query.set('offset', offset);
+
+    const res = await fetch(`${API_ENDPOINTS.TREASURE_SCREEN}?${query.toString()}`);
+    const json = await res.json();
+    if (json.error) throw new Error(json.error);
+
+    setFiltered(prev => (offset > 0 ? [...prev, ...json.items] : json.items));
+    setFoundCount(json.total);
+    return json;
+  };
+
+  // 서버 스크리너 호출 (조건 평가/정렬/페이지 나누기는 서버에서 처리)
+  const runScreen = async ({ useFilters = true, sort = sortField, order = sortOrder } = {}) => {
+    const params = new URLSearchParams();
+    if (useFilters) {
+      params.set('per_min', perMin);
+      params.set('per_max', perMax);
+      params.set('pbr_min', pbrMin);
+      params.set('pbr_max', pbrMax);
+      params.set('roe_min', roeMin);
+      params.set('roe_max', roeMax);
+      // 업종명에 쉼표가 있을 수 있어 sector는 하나씩 반복 파라미터로 보냄
+      if (industryFilter !== '전체') params.append('sector', industryFilter);
+    } else {
+      // 처음 목록/초기화는 PER/PBR/ROE 값이 하나라도 있으면 표시 (평균 0도 포함)
+      params.set('allow_zero', true);
+    }
+    if (sort) {
+      params.set('sort', sort);
+      params.set('order', order);
+    }
+
+    lastParams.current = params;
+    return fetchScreen(params, 0);
+  };
 
   useEffect(() => {
     const fetchData = async () => {
       try {
         setLoading(true);
         
-        const [treasureRes, metricsRes] = await Promise.all([
-          fetch(API_ENDPOINTS.TREASURE_DATA).then(res => res.json()),
+        const [screenRes, metricsRes] = await Promise.all([
+          runScreen({ useFilters: false }),
           fetch('/industry_metrics.json').then(res => res.json())
         ]);
 
         setIndustryMetrics(metricsRes);
-
-        const cleaned = treasureRes.filter(item => {
-          const hasAnyPER = Object.values(item.PER || {}).some(v => typeof v === 'number');
-          const hasAnyPBR = Object.values(item.PBR || {}).some(v => typeof v === 'number');
-          const hasAnyROE = Object.values(item.ROE || {}).some(v => typeof v === 'number');
-          return hasAnyPER && hasAnyPBR && hasAnyROE;
-        });
-
-        // 디버깅을 위한 로그
-        console.log('🔍 보물찾기 데이터 샘플:', cleaned.slice(0, 2));
-        console.log('🔍 지배주주지분 데이터 예시:', cleaned[0]?.지배주주지분);
-        console.log('🔍 지배주주순이익 데이터 예시:', cleaned[0]?.지배주주순이익);
-
-        setData(cleaned);
-        setFiltered(cleaned);
-        
-        const uniqueIndustries = Array.from(new Set(cleaned.map(item => item.업종명))).sort();
-        setIndustries(['전체', ...uniqueIndustries]);
-        
-        setFoundCount(cleaned.length);
+        setIndustries(['전체', ...screenRes.industries]);
       } catch (error) {
         console.error('❌ 데이터 로딩 오류:', error);
       } finally {
@@ -71,32 +94,17 @@ function TreasureHuntRedesigned() {
     return avg.toFixed(2);
   };
 
-  const applyFilters = () => {
-    const filteredData = data.filter(item => {
-      const perAvg = parseFloat(getThreeYearAvg(item.PER));
-      const pbrAvg = parseFloat(getThreeYearAvg(item.PBR));
-      const roeAvg = parseFloat(getThreeYearAvg(item.ROE));
-
-      // 하나라도 평균값이 NaN이거나 0이면 제외
-      const isValid = ![perAvg, pbrAvg, roeAvg].some(val => isNaN(val) || val === 0);
-      const matchIndustry = industryFilter === '전체' || item.업종명 === industryFilter;
+  const applyFilters = async () => {
+    try {
+      const json = await runScreen();
 
-      return (
-        matchIndustry &&
-        isValid &&
-        perAvg >= perMin && perAvg <= perMax &&
-        pbrAvg >= pbrMin && pbrAvg <= pbrMax &&
-        roeAvg >= roeMin && roeAvg <= roeMax
-      );
-    });
-
-    setFiltered(filteredData);
-    setFoundCount(filteredData.length);
-    
-    // 보물 발견 애니메이션
-    if (filteredData.length > 0) {
-      setTreasureFound(true);
-      setTimeout(() => setTreasureFound(false), 2000);
+      // 보물 발견 애니메이션
+      if (json.total > 0) {
+        setTreasureFound(true);
+        setTimeout(() => setTreasureFound(false), 2000);
+      }
+    } catch (error) {
+      console.error('❌ 보물 찾기 오류:', error);
     }
   };
 
@@ -105,19 +113,19 @@ function TreasureHuntRedesigned() {
     setSortField(field);
     setSortOrder(newOrder);
 
-    const sorted = [...filtered].sort((a, b) => {
-      const aVal = parseFloat(getThreeYearAvg(a[field]));
-      const bVal = parseFloat(getThreeYearAvg(b[field]));
-      
-      // NaN 처리
-      if (isNaN(aVal) && isNaN(bVal)) return 0;
-      if (isNaN(aVal)) return 1;
-      if (isNaN(bVal)) return -1;
-      
-      return newOrder === 'asc' ? aVal - bVal : bVal - aVal;
-    });
+    // 지금 보이는 결과의 조건은 그대로 두고 정렬만 바꿈
+    const params = new URLSearchParams(lastParams.current || undefined);
+    params.set('sort', field);
+    params.set('order', newOrder);
+    lastParams.current = params;
+    fetchScreen(params, 0)
+      .catch(error => console.error('❌ 정렬 오류:', error));
+  };
 
-    setFiltered(sorted);
+  const loadMore = () => {
+    if (!lastParams.current) return;
+    fetchScreen(lastParams.current, filtered.length)
+      .catch(error => console.error('❌ 추가 로딩 오류:', error));
   };
 
   const resetFilters = () => {
@@ -128,8 +136,9 @@ function TreasureHuntRedesigned() {
     setPerMax(50);
     setRoeMin(0);
     setRoeMax(30);
-    setFiltered(data);
-    setFoundCount(data.length);
+    setSortField(null);
+    runScreen({ useFilters: false, sort: null })
+      .catch(error => console.error('❌ 초기화 오류:', error));
   };
 
   if (loading) {
@@ -401,6 +410,13 @@ function TreasureHuntRedesigned() {
             </tbody>
           </table>
         </div>
+        {filtered.length < foundCount && (
+          <div className="filter-actions">
+            <button className="action-button secondary" onClick={loadMore}>
+              더 보기 ({filtered.length}/{foundCount})
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -10,24 +10,32 @@ export const API_ENDPOINTS = {
   MARKET_CAP: `${API_BASE_URL}/marketcap/`,
   TOP_VOLUME: `${API_BASE_URL}/top_volume`,
   INVESTOR_VALUE: `${API_BASE_URL}/investor/value/`,
+  INVESTOR_RANKINGS: (investor = "외국인", days = 5, n = 20) => `${API_BASE_URL}/investor/rankings?investor=${encodeURIComponent(investor)}&days=${days}&n=${n}`,
   
   // 기업 상세
   COMPANY_DETAIL: (name) => `${API_BASE_URL}/company/${name}`,
   COMPANY_NAMES: `${API_BASE_URL}/companies/names`,
+  COMPANY_SEARCH: (q, limit = 10) => `${API_BASE_URL}/companies/search?q=${encodeURIComponent(q)}&limit=${limit}`,
+  COMPANY_BATCH: (names) => `${API_BASE_URL}/companies/batch?names=${encodeURIComponent(names.join(","))}`,
   COMPANY_METRICS: (name) => `${API_BASE_URL}/company_metrics/${name}`,
+  COMPANY_METRICS_COLUMNS: (names, metrics) => `${API_BASE_URL}/company_metrics?names=${encodeURIComponent(names.join(","))}${metrics ? `&metrics=${encodeURIComponent(metrics.join(","))}` : ""}`,
   SALES_DATA: (name) => `${API_BASE_URL}/sales/${name}`,
   
   // 뉴스 및 분석
   NEWS: `${API_BASE_URL}/news/`,
   PRICE_DATA: (ticker) => `${API_BASE_URL}/price/${ticker}`,
+  PRICES: (tickers, start, end) => `${API_BASE_URL}/prices?tickers=${encodeURIComponent(tickers.join(","))}${start ? `&start=${start}` : ""}${end ? `&end=${end}` : ""}`,
   REPORT: `${API_BASE_URL}/report/`,
   INVESTORS: `${API_BASE_URL}/investors/`,
+  INVESTOR_FLOW: (ticker) => `${API_BASE_URL}/investors/flow?ticker=${encodeURIComponent(ticker)}`,
   
   // 산업 분석
   INDUSTRY_ANALYSIS: (name) => `${API_BASE_URL}/industry/${name}`,
+  INDUSTRY_LIST: `${API_BASE_URL}/industry`,
   
   // 보물찾기
-  TREASURE_DATA: `${API_BASE_URL}/api/treasure`
+  TREASURE_DATA: `${API_BASE_URL}/api/treasure`,
+  TREASURE_SCREEN: `${API_BASE_URL}/api/treasure/screen`
 };
 
 export default API_BASE_URL;